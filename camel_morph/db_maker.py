@@ -26,15 +26,21 @@ import os
 from tqdm import tqdm
 import argparse
 import itertools
-from time import strftime, gmtime, process_time
-from functools import partial
+from time import strftime, gmtime, process_time, perf_counter
+from functools import partial, lru_cache
 import cProfile, pstats
 import sys
 from typing import Dict, Tuple, List, Optional
 import importlib
+import inspect
 import pickle
+import multiprocessing
+import hashlib
+import shutil
+import tempfile
 
 import pandas as pd
+import numpy as np
 
 try:
     # Needed for when db_maker() needs to be imported by another script
@@ -62,6 +68,22 @@ parser.add_argument("-run_profiling", default=False,
                     action='store_true', help="Run execution time profiling for the make_db().")
 parser.add_argument("-camel_tools", default='local', choices=['local', 'official'],
                     type=str, help="Path of the directory containing the camel_tools modules.")
+parser.add_argument("-workers", default=1,
+                    type=int, help="Number of processes to compile the order lines with.")
+parser.add_argument("-build_cache", default=False,
+                    action='store_true', help="Only recompile the order lines affected by changes in the sheets since the last build (which used this option).")
+parser.add_argument("-stream_stems", default=False,
+                    action='store_true', help="Write stem entries to disk after each order line instead of keeping them in memory until the end (cannot be used with reindexing).")
+parser.add_argument("-compile_db", default=False,
+                    action='store_true', help="Also output a compiled (binary) version of the DB next to it, which is loaded by MorphologyDB instead of the text DB (requires the camel_tools of official_releases/lrec-coling2024_release).")
+parser.add_argument("-batched_validation", default=False,
+                    action='store_true', help="Validate the complex morpheme combinations of each order line using NumPy array operations instead of Python loops (same output).")
+parser.add_argument("-build_report", default=False,
+                    action='store_true', help="Output a JSON report next to the DB with the time spent in each build phase and statistics of the compilation of each order line.")
+parser.add_argument("-compare_reports", default=None, nargs=2, metavar=('OLD', 'NEW'),
+                    type=str, help="Compare two build reports instead of building a DB, and exit with status 1 if some phase or order line got slower by more than -report_threshold.")
+parser.add_argument("-report_threshold", default=0.1,
+                    type=float, help="Relative slowdown above which -compare_reports reports a regression.")
 args, _ = parser.parse_known_args()
 
 config = Config(args.config_file, args.config_name)
@@ -73,7 +95,12 @@ from camel_tools.utils.normalize import normalize_alef_bw, normalize_alef_maksur
 from camel_tools.utils.charmap import CharMapper
 from camel_tools.utils.dediac import dediac_bw
 from camel_tools.morphology.utils import strip_lex
+from camel_tools.morphology.database import MorphologyDB
 
+if args.compile_db and not hasattr(MorphologyDB, 'compile'):
+    sys.exit('-compile_db requires the camel_tools of official_releases/lrec-coling2024_release/'
+             'camel_morph/camel_tools (set `camel_tools` in the global section of the config '
+             'file to it), since the loaded camel_tools cannot compile DBs.')
 
 normalize_map = CharMapper({
     '<': 'A',
@@ -97,6 +124,16 @@ HAMZA_WASL_RE = re.compile(r'\{')
 CAPHI_UNDERSCORE_RE_1 = re.compile(r'_+')
 CAPHI_UNDERSCORE_RE_2 = re.compile(r'^_|_$')
 SEG_TOK_SCHEMES = ['D3SEG', 'D3TOK', 'ATBSEG', 'ATBTOK']
+# Should be incremented each time the compilation of order lines changes (such that
+# DB sections cached by previous builds are not reused)
+BUILD_CACHE_VERSION = 1
+# Buffer size and number of lines per write used while writing the DB file
+DB_WRITE_BUFFER_SIZE = 1 << 20
+DB_WRITE_CHUNK_SIZE = 10000
+# Maximum number of inputs memoized by each of the string transforms used to generate
+# the DB entries (cleared at the beginning of each build)
+ENTRY_MEMO_SIZE = 1 << 18
+UNDERSCORE_AR = re.compile('ـ')
 
 """
 Useful terms to know for a better understanding of the comments:
@@ -167,36 +204,73 @@ def make_db(config:Config, output_path:Optional[str]=None):
     elif logprob == 'return_all':
         logprob = None
     
-    c0 = process_time()
+    c0, w0 = process_time(), perf_counter()
+    _clear_entry_memos()
+
+    report = None
+    if args.build_report:
+        report = db_maker_utils.BuildReport(dict(
+            config_file=args.config_file, config_name=args.config_name,
+            date=strftime('%Y-%m-%d %H:%M:%S'), workers=args.workers,
+            build_cache=args.build_cache, stream_stems=args.stream_stems,
+            batched_validation=args.batched_validation, pruning=config.pruning))
     
     print("\nLoading and processing sheets... [1/4]")
-    SHEETS, cond2class = db_maker_utils.read_morph_specs(config)
+    with db_maker_utils.report_phase(report, 'load_sheets'):
+        SHEETS, cond2class = db_maker_utils.read_morph_specs(config, report=report)
 
-    if args.debug_lemma or config.restrict_db_to_lemma:
-        lemma = args.debug_lemma if args.debug_lemma else config.restrict_db_to_lemma
-        SHEETS['lexicon'] = SHEETS['lexicon'][
-            SHEETS['lexicon']['LEMMA'] == f'lex:{lemma}']
+        if args.debug_lemma or config.restrict_db_to_lemma:
+            lemma = args.debug_lemma if args.debug_lemma else config.restrict_db_to_lemma
+            SHEETS['lexicon'] = SHEETS['lexicon'][
+                SHEETS['lexicon']['LEMMA'] == f'lex:{lemma}']
     
     print("\nValidating combinations... [2/4]")
     cat2id: bool = config.cat2id if config.cat2id is not None else False
     defaults: bool = config.defaults if config.defaults is not None else True
     
-    db = construct_almor_db(SHEETS, config.pruning,
-        cond2class, cat2id, defaults, morph2caphi, logprob)
+    reindex: bool = config.reindex if config.reindex is not None else False
+    if output_path is None:
+        output_path = config.get_db_path()
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    
+    # Stem entries can only be written as soon as they are compiled if their
+    # categories do not get reindexed afterwards
+    stems_spool_dir = None
+    if args.stream_stems:
+        if reindex:
+            print('WARNING: -stream_stems cannot be used with category reindexing; ignoring it.')
+        else:
+            stems_spool_dir = os.path.dirname(os.path.abspath(output_path))
+    
+    build_cache_path = config.get_build_cache_path() if args.build_cache else None
+    with db_maker_utils.report_phase(report, 'validation'):
+        db = construct_almor_db(SHEETS, config.pruning,
+            cond2class, cat2id, defaults, morph2caphi, logprob,
+            args.batched_validation, args.workers, build_cache_path, stems_spool_dir,
+            report)
 
     print("\nCollapsing categories and reindexing... [3/4]")
-    reindex: bool = config.reindex if config.reindex is not None else False
     if reindex:
-        db, _ = collapse_and_reindex_categories(db, collapse_morphemes=False)
+        with db_maker_utils.report_phase(report, 'reindexing'):
+            db, _ = collapse_and_reindex_categories(db, collapse_morphemes=False)
     
     print("\nGenerating DB file... [4/4]")
-    if output_path is None:
-        output_path = config.get_db_path()
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    print_almor_db(output_path, db)
+    with db_maker_utils.report_phase(report, 'writing'):
+        print_almor_db(output_path, db)
+    if args.compile_db:
+        print("\nCompiling DB file...")
+        with db_maker_utils.report_phase(report, 'compiling'):
+            MorphologyDB.compile(output_path)
     
-    c1 = process_time()
+    c1, w1 = process_time(), perf_counter()
     print(f"\nTotal time required: {strftime('%M:%S', gmtime(c1 - c0))}")
+    if report is not None:
+        report.phases['total'] = dict(wall=w1 - w0, cpu=c1 - c0, calls=1)
+        report.counters['entry_memos'] = _get_entry_memo_stats()
+        report.counters['db_sections'] = {section: len(contents) for section, contents in db.items()}
+        report_path = f'{output_path}.report.json'
+        report.dump(report_path)
+        print(f'Build report written to {report_path}')
     return SHEETS
 
 
@@ -206,7 +280,12 @@ def construct_almor_db(SHEETS:Dict[str, pd.DataFrame],
                        cat2id:bool=False,
                        defaults:Optional[bool]=None,
                        morph2caphi:Optional[Dict]=None,
-                       logprob:Optional[Dict]=None) -> Dict:
+                       logprob:Optional[Dict]=None,
+                       batched_validation:bool=False,
+                       workers:int=1,
+                       build_cache_path:Optional[str]=None,
+                       stems_spool_dir:Optional[str]=None,
+                       report:Optional[db_maker_utils.BuildReport]=None) -> Dict:
     """
     Function which takes care of the condition validation process, i.e., deciding which
     (complex) morphemes are compatible, and prints them and their computed categories in
@@ -227,6 +306,18 @@ def construct_almor_db(SHEETS:Dict[str, pd.DataFrame],
         on the complex morpheme type. Defaults to None.
         logprob (Dict): dictionary containing the log probablities of different features, extracted
         from a corpus. Defaults to None.
+        batched_validation (bool): whether to validate the complex morpheme combinations
+        of each order line using NumPy array operations. Defaults to False.
+        workers (int): number of processes to distribute the order lines over. Order lines
+        are processed serially if 1. Defaults to 1.
+        build_cache_path (str): path of the incremental build cache. If specified, only the
+        order lines (or the sheet rows they refer to) which changed since the last build are
+        compiled, and the DB sections of the others are taken from the cache. Defaults to None.
+        stems_spool_dir (str): if specified, the STEMS section of the returned DB is a `StemsSpool`
+        (with its spool file in this directory) to which stem entries are written after each order
+        line instead of being kept in memory. Defaults to None.
+        report (BuildReport): build report in which to record the statistics of each order
+        line. Defaults to None.
 
     Returns:
         Dict: Database which contains entries (values) for each section (keys).
@@ -261,51 +352,28 @@ def construct_almor_db(SHEETS:Dict[str, pd.DataFrame],
     
     header_, defaults_ = _read_header_file(HEADER)
     db['OUT:###HEADER###'] = header_
+    if stems_spool_dir is not None:
+        db['OUT:###STEMS###'] = StemsSpool(stems_spool_dir)
 
     defaults_ = defaults_ if defaults else None
     cat2id = {} if cat2id else None
+    # Conditions are compiled into bitmasks once for all the sheets, such that validation
+    # of complex morpheme combinations only consists of bitwise operations.
+    conditions = db_maker_utils.Conditions.from_specs(
+        cond2class, [MORPH, LEXICON, BACKOFF, SMART_BACKOFF])
     
-    def construct_process(lexicon: pd.DataFrame,
-                          order_sequence: pd.Series,
-                          cmplx_stem_memoize: Dict[str, str],
-                          stems_section_title: str):
-        """ Process which is ran for each ORDER line, in which plausible complex morphemes
-        are generated and then tested (validated) against each other across the prefix/stem/suffix
-        boundary. Complex prefixes/stems/suffixes which are compatible with each other are added as
-        entries in the DB. 
-        """
-        # Complex morphemes generation (within the prefix/stem/suffix boundary)
-        cmplx_prefix_classes = gen_cmplx_morph_combs(
-            order_sequence['PREFIX'], MORPH, lexicon, cond2class,
-            pruning_cond_s_f=pruning, pruning_same_class_incompat=pruning)
-        cmplx_suffix_classes = gen_cmplx_morph_combs(
-            order_sequence['SUFFIX'], MORPH, lexicon, cond2class,
-            pruning_cond_s_f=pruning, pruning_same_class_incompat=pruning)
-        cmplx_stem_classes = gen_cmplx_morph_combs(
-            order_sequence['STEM'], MORPH, lexicon, cond2class,
-            cmplx_morph_memoize=cmplx_stem_memoize,
-            pruning_cond_s_f=pruning, pruning_same_class_incompat=pruning)
-        
-        cmplx_type_empty = set()
-        if not cmplx_stem_classes: cmplx_type_empty.add('Stem')
-        if not cmplx_suffix_classes: cmplx_type_empty.add('Suffix')
-        if not cmplx_prefix_classes: cmplx_type_empty.add('Prefix')
-        if cmplx_type_empty:
-            cmplx_type_empty = '/'.join(cmplx_type_empty)
-            order_key = 'SUFFIX-SHORT' if 'SUFFIX-SHORT' in ORDER.columns else 'SUFFIX'
-            tqdm.write((f"WARNING: {order_sequence[order_key]}: {cmplx_type_empty} class " 
-                        'is empty; proceeding to process next order line.'))
-            return db
-        
-        cmplx_morph_classes = dict(
-            cmplx_prefix_classes=(cmplx_prefix_classes, order_sequence['PREFIX'] if order_sequence['PREFIX'] else '[EMPTY]'),
-            cmplx_suffix_classes=(cmplx_suffix_classes, order_sequence['SUFFIX'] if order_sequence['SUFFIX'] else '[EMPTY]'),
-            cmplx_stem_classes=(cmplx_stem_classes, order_sequence['STEM']))
-        
-        # Complex morphemes validation or word generation (across the prefix/stem/suffix boundary)
-        db_ = cross_cmplx_morph_validation(
-            cmplx_morph_classes, order_sequence['CLASS'].lower(), short_cat_maps, defaults_,
-            stems_section_title, cat2id, morph2caphi, logprob)
+    # Morphemes are indexed by class once for all order lines
+    morph_classes = db_maker_utils.MorphemeClassIndex(MORPH, cond2class)
+    build_info = dict(MORPH=MORPH, morph_classes=morph_classes, cond2class=cond2class, pruning=pruning,
+                      short_cat_maps=short_cat_maps, defaults=defaults_, cat2id=cat2id,
+                      morph2caphi=morph2caphi, logprob=logprob, conditions=conditions,
+                      batched_validation=batched_validation, order_line_stats=report is not None)
+    
+    build_cache = None
+    if build_cache_path is not None:
+        build_cache = _load_build_cache(build_cache_path, build_info)
+    
+    def merge_order_line_db(db_: Dict):
         for section, contents in db_.items():
             # if 'BACKOFF' in stems_section_title and section != stems_section_title:
             #     assert set(contents) <= set(db[section])
@@ -322,17 +390,29 @@ def construct_almor_db(SHEETS:Dict[str, pd.DataFrame],
     for name, SHEET in [('Backoff', BACKOFF)]:
         if SHEET is not None:
             print(f'\n{name} lexicon')
+            if workers > 1 or build_cache is not None:
+                for db_ in _construct_order_lines(
+                        SHEET, ORDER, 'OUT:###STEMS###', build_info, workers,
+                        build_cache=build_cache, report=report):
+                    merge_order_line_db(db_)
+                continue
+            lexicon_classes = _get_lexicon_classes(SHEET, build_info)
             pbar = tqdm(total=len(list(ORDER.iterrows())))
             cmplx_stem_memoize = {}
             order_stem_prev = ''
-            for _, order_sequence in ORDER.iterrows():
+            for index, (_, order_sequence) in enumerate(ORDER.iterrows()):
                 col = 'SUFFIX-SHORT' if 'SUFFIX-SHORT' in ORDER.columns else 'SUFFIX'
                 pbar.set_description(order_sequence[col])
                 if order_sequence['STEM'] != order_stem_prev:
                     cmplx_stem_memoize = {}
                     order_stem_prev = order_sequence['STEM']
-                construct_process(SHEET, order_sequence, cmplx_stem_memoize,
-                                stems_section_title='OUT:###STEMS###')
+                stats = {} if report is not None else None
+                db_ = _construct_order_line(lexicon_classes, order_sequence, cmplx_stem_memoize,
+                                            'OUT:###STEMS###', build_info, stats)
+                if report is not None:
+                    report.add_order_line('OUT:###STEMS###', index, order_sequence, stats)
+                if db_ is not None:
+                    merge_order_line_db(db_)
                 pbar.update(1)
             pbar.close()
 
@@ -345,16 +425,299 @@ def construct_almor_db(SHEETS:Dict[str, pd.DataFrame],
     #TODO: maybe this should also be included in the above loop, but more study is needed
     if SMART_BACKOFF is not None:
         print('Smart Backoff lexicon')
-        pbar = tqdm(total=len(list(ORDER.iterrows())))
-        for _, order in ORDER.iterrows():
-            pbar.set_description(order['SUFFIX-SHORT'])
-            construct_process(SMART_BACKOFF, order, {},
-                              stems_section_title='OUT:###SMARTBACKOFF###')
-            pbar.update(1)
-        pbar.close()
+        if workers > 1 or build_cache is not None:
+            for db_ in _construct_order_lines(
+                    SMART_BACKOFF, ORDER, 'OUT:###SMARTBACKOFF###', build_info, workers,
+                    memoize=False, build_cache=build_cache, report=report):
+                merge_order_line_db(db_)
+        else:
+            lexicon_classes = _get_lexicon_classes(SMART_BACKOFF, build_info)
+            pbar = tqdm(total=len(list(ORDER.iterrows())))
+            for index, (_, order) in enumerate(ORDER.iterrows()):
+                pbar.set_description(order['SUFFIX-SHORT'])
+                stats = {} if report is not None else None
+                db_ = _construct_order_line(lexicon_classes, order, {},
+                                            'OUT:###SMARTBACKOFF###', build_info, stats)
+                if report is not None:
+                    report.add_order_line('OUT:###SMARTBACKOFF###', index, order, stats)
+                if db_ is not None:
+                    merge_order_line_db(db_)
+                pbar.update(1)
+            pbar.close()
+    
+    if build_cache is not None:
+        _dump_build_cache(build_cache)
 
     return db
 
+
+def _construct_order_line(lexicon_classes: db_maker_utils.MorphemeClassIndex,
+                          order_sequence: pd.Series,
+                          cmplx_stem_memoize: Optional[Dict],
+                          stems_section_title: str,
+                          build_info: Dict,
+                          stats: Optional[Dict]=None) -> Optional[Dict]:
+    """ Process which is ran for each ORDER line, in which plausible complex morphemes
+    are generated and then tested (validated) against each other across the prefix/stem/suffix
+    boundary. Complex prefixes/stems/suffixes which are compatible with each other are returned
+    as entries of the DB sections of this order line (None if one of the complex morpheme types
+    is empty). `build_info` contains the (read-only) arguments of `construct_almor_db()` which
+    are needed for the validation. If `stats` is specified, it is filled with the statistics
+    of the order line which go in the build report (see `BuildReport`).
+    """
+    morph_classes, cond2class = build_info['morph_classes'], build_info['cond2class']
+    pruning = build_info['pruning']
+    if stats is not None:
+        t0 = perf_counter()
+        stats.update(time={}, combs=dict(prefix={}, stem={}, suffix={}))
+    combs_stats = stats['combs'] if stats is not None else dict(prefix=None, stem=None, suffix=None)
+    # Complex morphemes generation (within the prefix/stem/suffix boundary)
+    cmplx_prefix_classes = gen_cmplx_morph_combs(
+        order_sequence['PREFIX'], morph_classes, lexicon_classes, cond2class,
+        pruning_cond_s_f=pruning, pruning_same_class_incompat=pruning,
+        stats=combs_stats['prefix'])
+    cmplx_suffix_classes = gen_cmplx_morph_combs(
+        order_sequence['SUFFIX'], morph_classes, lexicon_classes, cond2class,
+        pruning_cond_s_f=pruning, pruning_same_class_incompat=pruning,
+        stats=combs_stats['suffix'])
+    cmplx_stem_classes = gen_cmplx_morph_combs(
+        order_sequence['STEM'], morph_classes, lexicon_classes, cond2class,
+        cmplx_morph_memoize=cmplx_stem_memoize,
+        pruning_cond_s_f=pruning, pruning_same_class_incompat=pruning,
+        stats=combs_stats['stem'])
+    if stats is not None:
+        t1 = perf_counter()
+        stats['time'].update(combs=t1 - t0, total=t1 - t0)
+    
+    cmplx_type_empty = set()
+    if not cmplx_stem_classes: cmplx_type_empty.add('Stem')
+    if not cmplx_suffix_classes: cmplx_type_empty.add('Suffix')
+    if not cmplx_prefix_classes: cmplx_type_empty.add('Prefix')
+    if cmplx_type_empty:
+        cmplx_type_empty = '/'.join(cmplx_type_empty)
+        order_key = 'SUFFIX-SHORT' if 'SUFFIX-SHORT' in order_sequence.index else 'SUFFIX'
+        tqdm.write((f"WARNING: {order_sequence[order_key]}: {cmplx_type_empty} class " 
+                    'is empty; proceeding to process next order line.'))
+        if stats is not None:
+            stats['empty'] = sorted(cmplx_type_empty)
+        return None
+    
+    cmplx_morph_classes = dict(
+        cmplx_prefix_classes=(cmplx_prefix_classes, order_sequence['PREFIX'] if order_sequence['PREFIX'] else '[EMPTY]'),
+        cmplx_suffix_classes=(cmplx_suffix_classes, order_sequence['SUFFIX'] if order_sequence['SUFFIX'] else '[EMPTY]'),
+        cmplx_stem_classes=(cmplx_stem_classes, order_sequence['STEM']))
+    
+    # Complex morphemes validation or word generation (across the prefix/stem/suffix boundary)
+    db_ = cross_cmplx_morph_validation(
+        cmplx_morph_classes, order_sequence['CLASS'].lower(), build_info['short_cat_maps'],
+        build_info['defaults'], stems_section_title, build_info['cat2id'],
+        build_info['morph2caphi'], build_info['logprob'], build_info['conditions'],
+        build_info['batched_validation'], stats)
+    if stats is not None:
+        stats['time']['total'] = perf_counter() - t0
+    return db_
+
+
+def _get_lexicon_classes(lexicon: pd.DataFrame,
+                         build_info: Dict) -> db_maker_utils.MorphemeClassIndex:
+    """Indexes the lexicon by class, sharing the condition IDs of the morph index."""
+    morph_classes = build_info['morph_classes']
+    return db_maker_utils.MorphemeClassIndex(
+        lexicon, morph_classes.cond2class, morph_classes.cond2id, stems=True)
+
+
+_worker_build_info, _worker_lexicon_classes = None, None
+
+def _init_order_lines_worker(lexicon_classes: db_maker_utils.MorphemeClassIndex,
+                             build_info: Dict):
+    global _worker_build_info, _worker_lexicon_classes
+    _worker_lexicon_classes, _worker_build_info = lexicon_classes, build_info
+
+
+def _construct_order_lines_group(task: Tuple[str, List[Tuple[int, pd.Series]], bool]):
+    """Worker process which runs `_construct_order_line()` for a group of order lines
+    sharing the same STEM field (so that the stem memo is reused). Since category IDs depend
+    on the order in which categories are generated, each order line gets its own `cat2id`
+    which is then remapped to the global one by the main process."""
+    stems_section_title, order_lines, memoize = task
+    cmplx_stem_memoize = {}
+    results = []
+    for index, order_sequence in order_lines:
+        build_info = _worker_build_info
+        if build_info['cat2id'] is not None:
+            build_info = {**build_info, 'cat2id': {}}
+        stats = {} if build_info['order_line_stats'] else None
+        db_ = _construct_order_line(_worker_lexicon_classes, order_sequence,
+                                    cmplx_stem_memoize if memoize else {},
+                                    stems_section_title, build_info, stats)
+        results.append((index, db_, build_info['cat2id'], stats))
+    return results
+
+
+def _construct_order_lines(lexicon: pd.DataFrame,
+                           ORDER: pd.DataFrame,
+                           stems_section_title: str,
+                           build_info: Dict,
+                           workers: int=1,
+                           memoize: bool=True,
+                           build_cache: Optional[Dict]=None,
+                           report: Optional[db_maker_utils.BuildReport]=None):
+    """Same as running `_construct_order_line()` serially over the ORDER lines but order
+    lines are grouped by STEM field and dispatched to a pool of `workers` processes (or
+    processed in the current process if `workers` is 1). If a build cache is specified,
+    only the order lines which are not found in it are compiled. The DB sections of each
+    order line are yielded in ORDER file order, and if `cat2id` is used, the category IDs
+    are assigned in that same order, such that the resulting DB is the same as the one
+    obtained serially. The statistics of the order lines are added to the build report (if
+    specified) in that same order as well.
+    """
+    index2results, index2key, index2stats = {}, {}, {}
+    if build_cache is not None:
+        index2key = _get_order_line_cache_keys(
+            lexicon, ORDER, stems_section_title, build_info, build_cache['key'])
+        for index, key in index2key.items():
+            if key in build_cache['fragments']:
+                index2results[index] = build_cache['fragments'][key]
+        print(f'Reusing {len(index2results)}/{len(index2key)} order lines from the build cache.')
+    
+    stem2order_lines = {}
+    for index, (_, order_sequence) in enumerate(ORDER.iterrows()):
+        if index in index2results:
+            continue
+        stem2order_lines.setdefault(order_sequence['STEM'], []).append((index, order_sequence))
+    tasks = [(stems_section_title, order_lines, memoize)
+             for order_lines in stem2order_lines.values()]
+    
+    lexicon_classes = _get_lexicon_classes(lexicon, build_info)
+    pbar = tqdm(total=sum(len(order_lines) for order_lines in stem2order_lines.values()))
+    if workers > 1:
+        with multiprocessing.Pool(workers, initializer=_init_order_lines_worker,
+                                  initargs=(lexicon_classes, build_info)) as p:
+            for results in p.imap_unordered(_construct_order_lines_group, tasks):
+                for index, db_, cat2id_, stats in results:
+                    index2results[index] = (db_, cat2id_)
+                    index2stats[index] = stats
+                pbar.update(len(results))
+    else:
+        _init_order_lines_worker(lexicon_classes, build_info)
+        for task in tasks:
+            results = _construct_order_lines_group(task)
+            for index, db_, cat2id_, stats in results:
+                index2results[index] = (db_, cat2id_)
+                index2stats[index] = stats
+            pbar.update(len(results))
+    pbar.close()
+
+    if build_cache is not None:
+        for index, key in index2key.items():
+            build_cache['fragments_new'][key] = index2results[index]
+
+    if report is not None:
+        for index, (_, order_sequence) in enumerate(ORDER.iterrows()):
+            stats = index2stats.get(index)
+            report.add_order_line(stems_section_title, index, order_sequence,
+                                  stats if stats is not None else dict(cached=True))
+
+    cat2id = build_info['cat2id']
+    for index in range(len(ORDER.index)):
+        db_, cat2id_ = index2results[index]
+        if db_ is None:
+            continue
+        if cat2id is not None:
+            db_ = _remap_order_line_cat_ids(db_, cat2id_, cat2id)
+        yield db_
+
+
+def _get_order_line_cache_keys(lexicon: pd.DataFrame,
+                               ORDER: pd.DataFrame,
+                               stems_section_title: str,
+                               build_info: Dict,
+                               build_info_key: str) -> Dict[int, str]:
+    """Computes the build cache key of each order line, which depends on the order line itself,
+    on the contents of the MORPH/LEXICON rows of the classes it refers to, and on the
+    `build_info` of the whole build (key computed in `_load_build_cache()`)."""
+    cls2hash = db_maker_utils.hash_sheet_classes(build_info['MORPH'])
+    stem_cls2hash = db_maker_utils.hash_sheet_classes(lexicon)
+    index2key = {}
+    for index, (_, order_sequence) in enumerate(ORDER.iterrows()):
+        classes_hash = []
+        for field in ['PREFIX', 'SUFFIX', 'STEM']:
+            cmplx_morph_seq = order_sequence[field] if order_sequence[field] else '[EMPTY]'
+            for cmplx_morph_cls in cmplx_morph_seq.split():
+                cls2hash_ = stem_cls2hash if 'STEM' in cmplx_morph_cls else cls2hash
+                classes_hash.append(cls2hash_.get(cmplx_morph_cls))
+        index2key[index] = db_maker_utils.hash_object(
+            (build_info_key, stems_section_title, order_sequence.to_dict(), classes_hash))
+    return index2key
+
+
+def _load_build_cache(build_cache_path: str, build_info: Dict) -> Dict:
+    """Loads the DB sections of the order lines compiled in the previous build (if any). The
+    returned build cache also contains the key of all the information (other than the order
+    lines and the sheets) which the compilation of an order line depends on."""
+    fragments = {}
+    if os.path.exists(build_cache_path):
+        # A build cache which can't be read is ignored (rebuilt from scratch)
+        try:
+            with open(build_cache_path, 'rb') as f:
+                build_cache = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            build_cache = {}
+        if build_cache.get('version') == BUILD_CACHE_VERSION:
+            fragments = build_cache['fragments']
+    
+    # The CAPHI methods are identified by name, and by the contents of the file they are
+    # defined in (such that changes to the CAPHI module invalidate the cache)
+    morph2caphi = build_info['morph2caphi']
+    if morph2caphi is not None:
+        morph2caphi = {morph_type: (f'{method.__module__}.{method.__name__}',
+                                    db_maker_utils.hash_file(inspect.getfile(method)))
+                       for morph_type, method in morph2caphi.items()}
+    key = db_maker_utils.hash_object((
+        BUILD_CACHE_VERSION, build_info['cond2class'], build_info['pruning'],
+        build_info['short_cat_maps'], build_info['defaults'],
+        build_info['cat2id'] is not None, morph2caphi, build_info['logprob']))
+    
+    return dict(path=build_cache_path, key=key, fragments=fragments, fragments_new={})
+
+
+def _dump_build_cache(build_cache: Dict):
+    """Only the order lines of the current build are kept in the build cache. The cache is
+    written to a temporary file first, such that an interrupted build never leaves a partially
+    written cache."""
+    os.makedirs(os.path.dirname(build_cache['path']), exist_ok=True)
+    build_cache_path_tmp = f"{build_cache['path']}.{os.getpid()}.tmp"
+    with open(build_cache_path_tmp, 'wb') as f:
+        pickle.dump(dict(version=BUILD_CACHE_VERSION,
+                         fragments=build_cache['fragments_new']), f)
+    os.replace(build_cache_path_tmp, build_cache['path'])
+
+
+def _remap_order_line_cat_ids(db_: Dict, cat2id_: Dict, cat2id: Dict) -> Dict:
+    """Replaces the category IDs which were assigned locally to an order line by a
+    worker with the global IDs (assigned in the same way as in `_generate_cat_field()`)."""
+    id_map = {}
+    for cmplx_morph_type, cat2id_morph_type_ in cat2id_.items():
+        cat2id_morph_type = cat2id.setdefault(cmplx_morph_type, {})
+        for cat, cat_id_ in cat2id_morph_type_.items():
+            if cat not in cat2id_morph_type:
+                cat2id_morph_type[cat] = f'{cmplx_morph_type}{str(len(cat2id_morph_type) + 1).zfill(5)}'
+            id_map[cat_id_] = cat2id_morph_type[cat]
+    
+    db_remapped = {}
+    for section, contents in db_.items():
+        if section == 'OUT:###STEMBACKOFF###':
+            db_remapped[section] = {backoff_mode: set(id_map[cat] for cat in cats)
+                                    for backoff_mode, cats in contents.items()}
+        elif 'TABLE' in section:
+            db_remapped[section] = {(id_map[cat_1], id_map[cat_2]): v
+                                    for (cat_1, cat_2), v in contents.items()}
+        else:
+            db_remapped[section] = {(match, id_map[cat], analysis): v
+                                    for (match, cat, analysis), v in contents.items()}
+    return db_remapped
+
+
 def cross_cmplx_morph_validation(cmplx_morph_classes: Dict,
                                  pos_type: str,
                                  short_cat_maps: Optional[Dict]=None,
@@ -362,7 +725,10 @@ def cross_cmplx_morph_validation(cmplx_morph_classes: Dict,
                                  stems_section_title: str='OUT:###STEMS###',
                                  cat2id:Optional[Dict]=None,
                                  morph2caphi:Optional[Dict]=None,
-                                 logprob:Optional[Dict]=None) -> Dict:
+                                 logprob:Optional[Dict]=None,
+                                 conditions:Optional[db_maker_utils.Conditions]=None,
+                                 batched:bool=False,
+                                 stats:Optional[Dict]=None) -> Dict:
     """Method which takes in classes of complex morphemes, and validates them against each other
     in a three-loop fashion, one for each of prefix, stem, and suffix. Instead of going over all
     individual combinations, we loop over "classes" of them (since all combinations belonging to
@@ -383,6 +749,14 @@ def cross_cmplx_morph_validation(cmplx_morph_classes: Dict,
         on the complex morpheme type. Defaults to None.
         logprob (Dict): dictionary containing the log probablities of different features, extracted
         from a corpus. Defaults to None.
+        conditions (Conditions): compiled condition inventory used to convert the conditions of
+        each complex morpheme class into bitmasks. If not specified, bits are assigned on the fly.
+        Defaults to None.
+        batched (bool): whether to validate all (prefix, stem, suffix) combinations at once using
+        NumPy array operations instead of Python loops. Defaults to False.
+        stats (Dict): if specified, the number of validated and valid (prefix, stem, suffix)
+        triples, the hits/misses of the category memo, the number of generated entries, and the
+        time spent validating and generating entries are added to it. Defaults to None.
 
     Returns:
         Dict: Database in progress
@@ -400,16 +774,102 @@ def cross_cmplx_morph_validation(cmplx_morph_classes: Dict,
     cmplx_suffix_classes, cmplx_suffix_seq = cmplx_morph_classes['cmplx_suffix_classes']
     cmplx_stem_classes, cmplx_stem_seq = cmplx_morph_classes['cmplx_stem_classes']
     
+    if stats is not None:
+        t0, entries_time = perf_counter(), 0.0
+        num_valid, cat_memo_hits, num_entries = 0, 0, 0
+    if conditions is None:
+        conditions = db_maker_utils.Conditions()
+    # The conditions of each complex morpheme class are joined and compiled once
+    cmplx_prefix_conds = _compile_cmplx_morph_classes(cmplx_prefix_classes, conditions)
+    cmplx_suffix_conds = _compile_cmplx_morph_classes(cmplx_suffix_classes, conditions)
+    cmplx_stem_conds = _compile_cmplx_morph_classes(cmplx_stem_classes, conditions)
+
+    # Both validation methods yield the valid (stem, prefix, suffix) complex morpheme
+    # classes in the same (nested loop) order, which means that the DB is the same.
+    if batched:
+        valid_cmplx_morph_classes = _validate_cmplx_morph_classes_batched(
+            cmplx_prefix_conds, cmplx_stem_conds, cmplx_suffix_conds, conditions)
+    else:
+        valid_cmplx_morph_classes = _validate_cmplx_morph_classes(
+            cmplx_prefix_conds, cmplx_stem_conds, cmplx_suffix_conds)
+
     cat_memoize = {'stem': {}, 'suffix': {}, 'prefix': {}}
-    compatibility_memoize = {}
-    for cmplx_stem_cls, cmplx_stems in cmplx_stem_classes.items():
+    for cmplx_stem_cls, cmplx_prefix_cls, cmplx_suffix_cls in valid_cmplx_morph_classes:
         # `cmplx_stem_cls` = (cmplx_stem['COND-S'], cmplx_stem['COND-T'], cmplx_stem['COND-F'])
         # All entries in `cmplx_stems` have the same cat
-        stem_cond_s = ' '.join([f['COND-S'] for f in cmplx_stems[0]])
-        stem_cond_t = ' '.join([f['COND-T'] for f in cmplx_stems[0]])
-        stem_cond_f = ' '.join([f['COND-F'] for f in cmplx_stems[0]])
+        stem_conds, prefix_conds, suffix_conds = (cmplx_stem_conds[cmplx_stem_cls][0],
+                                                  cmplx_prefix_conds[cmplx_prefix_cls][0],
+                                                  cmplx_suffix_conds[cmplx_suffix_cls][0])
+        stem_cat, prefix_cat, suffix_cat = None, None, None
+        update_info_stem = dict(pos_type=pos_type,
+                                cmplx_morph_seq=cmplx_stem_seq,
+                                cmplx_morph_cls=cmplx_stem_cls,
+                                cmplx_morph_type='stem',
+                                cmplx_morphs=cmplx_stem_classes[cmplx_stem_cls],
+                                conditions=stem_conds,
+                                db_section=stems_section_title)
+        update_info_prefix = dict(pos_type=pos_type,
+                                  cmplx_morph_seq=cmplx_prefix_seq,
+                                  cmplx_morph_cls=cmplx_prefix_cls,
+                                  cmplx_morph_type='prefix',
+                                  cmplx_morphs=cmplx_prefix_classes[cmplx_prefix_cls],
+                                  conditions=prefix_conds,
+                                  db_section='OUT:###PREFIXES###')
+        update_info_suffix = dict(pos_type=pos_type,
+                                  cmplx_morph_seq=cmplx_suffix_seq,
+                                  cmplx_morph_cls=cmplx_suffix_cls,
+                                  cmplx_morph_type='suffix',
+                                  cmplx_morphs=cmplx_suffix_classes[cmplx_suffix_cls],
+                                  conditions=suffix_conds,
+                                  db_section='OUT:###SUFFIXES###')
+        
+        if stats is not None:
+            t1 = perf_counter()
+            num_valid += 1
+            for update_info in [update_info_stem, update_info_prefix, update_info_suffix]:
+                if update_info['cmplx_morph_cls'] in cat_memoize[update_info['cmplx_morph_type']]:
+                    cat_memo_hits += 1
+                else:
+                    num_entries += len(update_info['cmplx_morphs'])
+        for update_info in [update_info_stem, update_info_prefix, update_info_suffix]:
+            update_db(db, update_info, cat_memoize, short_cat_maps, defaults, cat2id,
+                      morph2caphi, logprob)
+        if stats is not None:
+            entries_time += perf_counter() - t1
+        # If morph class cat has already been computed previously, then cat is still `None`
+        # (because we will not go again in the morph for loop) and we need to retrieve the
+        # computed value. 
+        # FIXME: stem_cat seems to always be None at this point, so there is no need for
+        # the if statement 
+        stem_cat = stem_cat if stem_cat else cat_memoize['stem'][cmplx_stem_cls]
+        prefix_cat = prefix_cat if prefix_cat else cat_memoize['prefix'][cmplx_prefix_cls]
+        suffix_cat = suffix_cat if suffix_cat else cat_memoize['suffix'][cmplx_suffix_cls]
+
+        db['OUT:###TABLE AB###'][(prefix_cat, stem_cat)] = 1
+        db['OUT:###TABLE BC###'][(stem_cat, suffix_cat)] = 1
+        db['OUT:###TABLE AC###'][(prefix_cat, suffix_cat)] = 1
+    
+    if stats is not None:
+        stats['triples'] = dict(
+            checked=len(cmplx_prefix_conds) * len(cmplx_stem_conds) * len(cmplx_suffix_conds),
+            valid=num_valid)
+        stats['cat_memo'] = dict(hits=cat_memo_hits, misses=3 * num_valid - cat_memo_hits)
+        stats['entries'] = num_entries
+        stats['time'].update(validation=perf_counter() - t0 - entries_time,
+                             entries=entries_time)
+    # Turn this on to make sure that every entry is only set once (can also be used to catch
+    # double entries in the lexicon sheets)
+    # assert [1 for items in db.values() for item in items if item != 1] == []
+    return db
+
 
-        for cmplx_prefix_cls, cmplx_prefixes in cmplx_prefix_classes.items():
+def _validate_cmplx_morph_classes(cmplx_prefix_conds: Dict,
+                                  cmplx_stem_conds: Dict,
+                                  cmplx_suffix_conds: Dict):
+    """Validates the complex morpheme classes against each other in a three-loop fashion
+    and yields the valid (stem, prefix, suffix) complex morpheme class triples."""
+    for cmplx_stem_cls, (_, stem_masks) in cmplx_stem_conds.items():
+        for cmplx_prefix_cls, (_, prefix_masks) in cmplx_prefix_conds.items():
             #TODO: should probably move this loop to be the outermost one (instead of stem) 
             # and should check if there are interactions between morpheme class/condition
             # pairs between prefix and the stem/suffix. If there are none, then there would
@@ -419,62 +879,64 @@ def cross_cmplx_morph_validation(cmplx_morph_classes: Dict,
             # in morpheme classes that appear in only one of complex prefix, suffix, or stem,
             # then this condition should not have interactions with the other two complex
             # morpheme categories.
-            prefix_cond_s = ' '.join([f['COND-S'] for f in cmplx_prefixes[0]])
-            prefix_cond_t = ' '.join([f['COND-T'] for f in cmplx_prefixes[0]])
-            prefix_cond_f = ' '.join([f['COND-F'] for f in cmplx_prefixes[0]])
-
-            for cmplx_suffix_cls, cmplx_suffixes in cmplx_suffix_classes.items():
-                suffix_cond_s = ' '.join([f['COND-S'] for f in cmplx_suffixes[0]])
-                suffix_cond_t = ' '.join([f['COND-T'] for f in cmplx_suffixes[0]])
-                suffix_cond_f = ' '.join([f['COND-F'] for f in cmplx_suffixes[0]])
-
-                valid = check_compatibility(' '.join([prefix_cond_s, stem_cond_s, suffix_cond_s]),
-                                            ' '.join([prefix_cond_t, stem_cond_t, suffix_cond_t]),
-                                            ' '.join([prefix_cond_f, stem_cond_f, suffix_cond_f]),
-                                            compatibility_memoize)
+            prefix_stem_masks = db_maker_utils.Conditions.combine(prefix_masks, stem_masks)
+            for cmplx_suffix_cls, (_, suffix_masks) in cmplx_suffix_conds.items():
+                valid = check_compatibility(*db_maker_utils.Conditions.combine(
+                    prefix_stem_masks, suffix_masks))
                 if valid:
-                    stem_cat, prefix_cat, suffix_cat = None, None, None
-                    update_info_stem = dict(pos_type=pos_type,
-                                            cmplx_morph_seq=cmplx_stem_seq,
-                                            cmplx_morph_cls=cmplx_stem_cls,
-                                            cmplx_morph_type='stem',
-                                            cmplx_morphs=cmplx_stems,
-                                            conditions=(stem_cond_s, stem_cond_t, stem_cond_f),
-                                            db_section=stems_section_title)
-                    update_info_prefix = dict(pos_type=pos_type,
-                                              cmplx_morph_seq=cmplx_prefix_seq,
-                                              cmplx_morph_cls=cmplx_prefix_cls,
-                                              cmplx_morph_type='prefix',
-                                              cmplx_morphs=cmplx_prefixes,
-                                              conditions=(prefix_cond_s, prefix_cond_t, prefix_cond_f),
-                                              db_section='OUT:###PREFIXES###')
-                    update_info_suffix = dict(pos_type=pos_type,
-                                              cmplx_morph_seq=cmplx_suffix_seq,
-                                              cmplx_morph_cls=cmplx_suffix_cls,
-                                              cmplx_morph_type='suffix',
-                                              cmplx_morphs=cmplx_suffixes,
-                                              conditions=(suffix_cond_s, suffix_cond_t, suffix_cond_f),
-                                              db_section='OUT:###SUFFIXES###')
-                    
-                    for update_info in [update_info_stem, update_info_prefix, update_info_suffix]:
-                        update_db(db, update_info, cat_memoize, short_cat_maps, defaults, cat2id,
-                                  morph2caphi, logprob)
-                    # If morph class cat has already been computed previously, then cat is still `None`
-                    # (because we will not go again in the morph for loop) and we need to retrieve the
-                    # computed value. 
-                    # FIXME: stem_cat seems to always be None at this point, so there is no need for
-                    # the if statement 
-                    stem_cat = stem_cat if stem_cat else cat_memoize['stem'][cmplx_stem_cls]
-                    prefix_cat = prefix_cat if prefix_cat else cat_memoize['prefix'][cmplx_prefix_cls]
-                    suffix_cat = suffix_cat if suffix_cat else cat_memoize['suffix'][cmplx_suffix_cls]
-
-                    db['OUT:###TABLE AB###'][(prefix_cat, stem_cat)] = 1
-                    db['OUT:###TABLE BC###'][(stem_cat, suffix_cat)] = 1
-                    db['OUT:###TABLE AC###'][(prefix_cat, suffix_cat)] = 1
-    # Turn this on to make sure that every entry is only set once (can also be used to catch
-    # double entries in the lexicon sheets)
-    # assert [1 for items in db.values() for item in items if item != 1] == []
-    return db
+                    yield cmplx_stem_cls, cmplx_prefix_cls, cmplx_suffix_cls
+
+
+def _validate_cmplx_morph_classes_batched(cmplx_prefix_conds: Dict,
+                                          cmplx_stem_conds: Dict,
+                                          cmplx_suffix_conds: Dict,
+                                          conditions: db_maker_utils.Conditions):
+    """Same as `_validate_cmplx_morph_classes()` but the whole validity tensor of an order
+    line is computed using broadcast NumPy operations on the bitmasks of the complex morpheme
+    classes (one (prefix, suffix) matrix per stem class to keep memory in check). Disjunctive
+    COND-T terms are validated one unique term at a time, and only for the cells which
+    require them."""
+    cmplx_classes, masks = {}, {}
+    for name, cmplx_conds in [('prefix', cmplx_prefix_conds),
+                              ('stem', cmplx_stem_conds),
+                              ('suffix', cmplx_suffix_conds)]:
+        cmplx_classes[name] = list(cmplx_conds)
+        masks[name] = [cmplx_conds[cls][1] for cls in cmplx_classes[name]]
+        if not masks[name]:
+            return
+    
+    or_terms = sorted(set(or_term for masks_ in masks.values()
+                          for _, _, cond_t_or, _ in masks_ for or_term in cond_t_or))
+    arrays = {}
+    for name, masks_ in masks.items():
+        s, t, t_or, f = zip(*masks_)
+        arrays[name] = dict(s=conditions.to_array(s),
+                            t=conditions.to_array(t),
+                            f=conditions.to_array(f),
+                            t_or=np.array([[or_term in t_or_ for or_term in or_terms]
+                                           for t_or_ in t_or], dtype=bool).reshape(len(t_or), -1))
+    or_terms = conditions.to_array(or_terms)
+    
+    prefix, stem, suffix = arrays['prefix'], arrays['stem'], arrays['suffix']
+    for i, cmplx_stem_cls in enumerate(cmplx_classes['stem']):
+        # Dimensions are (prefix, suffix, word)
+        cond_s = (prefix['s'] | stem['s'][i])[:, None, :] | suffix['s'][None, :, :]
+        cond_t = (prefix['t'] | stem['t'][i])[:, None, :] | suffix['t'][None, :, :]
+        cond_f = (prefix['f'] | stem['f'][i])[:, None, :] | suffix['f'][None, :, :]
+        valid = ~np.any(cond_t & ~cond_s, axis=-1) & ~np.any(cond_s & cond_f, axis=-1)
+        for k, or_term in enumerate(or_terms):
+            required = (prefix['t_or'][:, k] | stem['t_or'][i, k])[:, None] | \
+                suffix['t_or'][None, :, k]
+            if not required.any():
+                continue
+            satisfied = np.any(cond_s & or_term, axis=-1)
+            valid &= ~required | satisfied
+        # Row-major order of `np.argwhere()` preserves the three-loop order
+        for prefix_index, suffix_index in np.argwhere(valid):
+            yield (cmplx_stem_cls,
+                   cmplx_classes['prefix'][prefix_index],
+                   cmplx_classes['suffix'][suffix_index])
+
 
 def update_db(db: Dict,
               update_info: Dict,
@@ -568,16 +1030,8 @@ def _generate_cat_field(cmplx_morph_type: str, cmplx_morph_class: str,
     """This function creates the category for matching using classes and conditions"""
     if short_cat_map:
         cmplx_morph_class = short_cat_map[cmplx_morph_class]
-    cmplx_morph_cond_s = '+'.join(
-        [cond for cond in sorted(cmplx_morph_cond_s.split()) if cond != '_'])
-    cmplx_morph_cond_s = cmplx_morph_cond_s if cmplx_morph_cond_s else '-'
-    cmplx_morph_cond_t = '+'.join(
-        [cond for cond in sorted(cmplx_morph_cond_t.split()) if cond != '_'])
-    cmplx_morph_cond_t = cmplx_morph_cond_t if cmplx_morph_cond_t else '-'
-    cmplx_morph_cond_f = '+'.join(
-        [cond for cond in sorted(cmplx_morph_cond_f.split()) if cond != '_'])
-    cmplx_morph_cond_f = cmplx_morph_cond_f if cmplx_morph_cond_f else '-'
-    cat = f"{cmplx_morph_type}:{cmplx_morph_class}_[CS:{cmplx_morph_cond_s}]_[CT:{cmplx_morph_cond_t}]_[CF:{cmplx_morph_cond_f}]"
+    cat = _generate_cat_name(cmplx_morph_type, cmplx_morph_class,
+                             cmplx_morph_cond_s, cmplx_morph_cond_t, cmplx_morph_cond_f)
     if cat2id is not None:
         cat2id_morph_type = cat2id.setdefault(cmplx_morph_type, {})
         if cat in cat2id_morph_type:
@@ -588,6 +1042,23 @@ def _generate_cat_field(cmplx_morph_type: str, cmplx_morph_class: str,
             cat = cat_
     return cat
 
+@lru_cache(maxsize=ENTRY_MEMO_SIZE)
+def _generate_cat_name(cmplx_morph_type: str, cmplx_morph_class: str,
+                       cmplx_morph_cond_s: str, cmplx_morph_cond_t: str, cmplx_morph_cond_f: str):
+    """Category string (before it is mapped to an ID) of a class and its conditions.
+    Memoized since all the morphemes of a class share it."""
+    cmplx_morph_cond_s = '+'.join(
+        [cond for cond in sorted(cmplx_morph_cond_s.split()) if cond != '_'])
+    cmplx_morph_cond_s = cmplx_morph_cond_s if cmplx_morph_cond_s else '-'
+    cmplx_morph_cond_t = '+'.join(
+        [cond for cond in sorted(cmplx_morph_cond_t.split()) if cond != '_'])
+    cmplx_morph_cond_t = cmplx_morph_cond_t if cmplx_morph_cond_t else '-'
+    cmplx_morph_cond_f = '+'.join(
+        [cond for cond in sorted(cmplx_morph_cond_f.split()) if cond != '_'])
+    cmplx_morph_cond_f = cmplx_morph_cond_f if cmplx_morph_cond_f else '-'
+    return f"{cmplx_morph_type}:{cmplx_morph_class}_[CS:{cmplx_morph_cond_s}]_[CT:{cmplx_morph_cond_t}]_[CF:{cmplx_morph_cond_f}]"
+
+@lru_cache(maxsize=ENTRY_MEMO_SIZE)
 def _convert_bw_tag(bw_tag:str, backoff:bool=False):
     """Create complex BW tag"""
     if bw_tag == '':
@@ -599,11 +1070,42 @@ def _convert_bw_tag(bw_tag:str, backoff:bool=False):
         if 'null' in parts[0]:
             bw_lex = parts[0]
         else:
-            bw_lex = parts[0] if backoff else bw2ar(parts[0])
+            bw_lex = parts[0] if backoff else _bw2ar(parts[0])
         bw_pos = parts[1]
         utf8_bw_tag.append('/'.join([bw_lex, bw_pos]))
     return '+'.join(utf8_bw_tag)
 
+@lru_cache(maxsize=ENTRY_MEMO_SIZE)
+def _bw2ar(bw_str: str) -> str:
+    """Memoized `bw2ar()` since the same lemmas, roots, patterns, etc. are transliterated
+    for many entries."""
+    return bw2ar(bw_str)
+
+# String transforms memoized during entry generation (see `ENTRY_MEMO_SIZE`)
+_ENTRY_MEMOS = {'bw2ar': _bw2ar,
+                'cat_name': _generate_cat_name,
+                'convert_bw_tag': _convert_bw_tag}
+
+def _clear_entry_memos():
+    for memo in _ENTRY_MEMOS.values():
+        memo.cache_clear()
+
+def _get_entry_memo_stats() -> Dict[str, Dict[str, int]]:
+    stats = {}
+    for name, memo in _ENTRY_MEMOS.items():
+        info = memo.cache_info()
+        stats[name] = dict(hits=info.hits, misses=info.misses, size=info.currsize)
+    return stats
+
+def _print_entry_memo_stats():
+    print('\nEntry generation memoization (hits/calls):')
+    if args.workers > 1:
+        print('(entries generated by worker processes are not included)')
+    for name, stats in _get_entry_memo_stats().items():
+        calls = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / calls if calls else 0
+        print(f"{name}: {stats['hits']}/{calls} ({hit_rate:.1%}), {stats['size']} entries")
+
 def _generate_match_field(diac):
     #NOTE: For EGY nominals, postregex symbol is @ while for verbs it is #
     #NOTE: Maybe this is unnecessary and EGY can use #; should look into this
@@ -698,9 +1200,9 @@ def _generate_affix(affix_type: str,
         affix, analysis['caphi'], defaults['transcription']['caphi'], morph2caphi, affix_type_)
     
     for f in ['diac', 'd3seg', 'd3tok', 'atbseg', 'atbtok']:
-        analysis[f] = bw2ar(analysis[f])
+        analysis[f] = _bw2ar(analysis[f])
 
-    affix = {'match': bw2ar(affix_match), 'cat': acat, 'analysis': analysis}
+    affix = {'match': _bw2ar(affix_match), 'cat': acat, 'analysis': analysis}
     return affix
 
 
@@ -756,7 +1258,7 @@ def _generate_stem(cmplx_morph_seq: str,
         analysis['backoff_modes'] = analysis['lex']
         analysis['lex'] = 'NOAN'
     else:
-        match = bw2ar(stem_match)
+        match = _bw2ar(stem_match)
 
     xcat = _generate_cat_field('X', cmplx_morph_seq, stem_cond_s, stem_cond_t,
                                stem_cond_f, short_cat_map, cat2id)
@@ -791,7 +1293,7 @@ def _generate_stem(cmplx_morph_seq: str,
             if f in analysis:
                 if analysis[f] == 'NTWS' or analysis[f] is None:
                     continue
-                analysis[f] = bw2ar(analysis[f])
+                analysis[f] = _bw2ar(analysis[f])
 
     stem = {'match': match, 'cat': xcat, 'analysis': analysis}
     return stem
@@ -1151,59 +1653,107 @@ def collapse_and_reindex_categories(db, collapse_morphemes):
     return db, collapse_and_reindex_debug
 
 
+class StemsSpool:
+    """Stand-in for the STEMS section of the DB which, instead of holding the entries in
+    memory until the whole DB is compiled, writes them (already formatted) to a spool file
+    as soon as they are merged into the DB, i.e., after each order line. Only a digest of
+    each entry is kept in memory to avoid writing the same entry twice, such that the
+    section is the same as if it was kept in a dictionary. Memory use is therefore not
+    bounded: the set of digests still grows linearly with the number of distinct entries,
+    although a digest (16 bytes) is much smaller than an entry. The spool file is an
+    anonymous temporary file (in `dir`), such that it is never left behind, even if the
+    build fails."""
+    
+    def __init__(self, dir: Optional[str]=None):
+        self.digests = set()
+        self.f = tempfile.TemporaryFile('w+', buffering=DB_WRITE_BUFFER_SIZE, dir=dir)
+    
+    def update(self, entries: Dict[Tuple[str, str, str], int]):
+        lines = []
+        for x in entries:
+            # Fields are converted to strings as when they are written
+            digest = hashlib.md5('\0'.join(map(str, x)).encode('utf8')).digest()
+            if digest not in self.digests:
+                self.digests.add(digest)
+                lines.append(_format_stem_entry(x))
+        if lines:
+            self.f.write('\n'.join(lines) + '\n')
+    
+    def __len__(self) -> int:
+        return len(self.digests)
+    
+    def copy_to(self, f):
+        self.f.seek(0)
+        shutil.copyfileobj(self.f, f, DB_WRITE_BUFFER_SIZE)
+        self.close()
+    
+    def close(self):
+        self.f.close()
+
+
 def print_almor_db(output_path, db):
     """Create output file in ALMOR DB format"""
+    # The STEMS section is present from the start if it is a `StemsSpool`, hence its length
+    for section in ['PREFIXES', 'STEMS', 'SUFFIXES']:
+        assert f'OUT:###{section}###' in db and (
+            section != 'STEMS' or len(db['OUT:###STEMS###'])), (
+            f'Empty {section} section. Something might be wrong with the sheets.')
+    write_almor_db(output_path, _generate_almor_db_sections(db))
+
+
+def write_almor_db(output_path: str, sections):
+    """Writes the DB lines yielded by `sections` (an iterable of iterables of lines,
+    or of `StemsSpool`) in large buffered chunks."""
+    with open(output_path, 'w', buffering=DB_WRITE_BUFFER_SIZE) as f:
+        for lines in sections:
+            if isinstance(lines, StemsSpool):
+                lines.copy_to(f)
+                continue
+            chunk = []
+            for line in lines:
+                chunk.append(line)
+                if len(chunk) == DB_WRITE_CHUNK_SIZE:
+                    f.write('\n'.join(chunk) + '\n')
+                    chunk = []
+            if chunk:
+                f.write('\n'.join(chunk) + '\n')
 
-    with open(output_path, 'w') as f:
-        for x in db['OUT:###HEADER###']:
-            print(x, file=f)
 
-        print('###STEMBACKOFF###', file=f)
-        for x in db['OUT:###STEMBACKOFF###']:
-            print(*x, sep=' ', file=f)
-        
-        postregex = db.get('OUT:###POSTREGEX###')
-        if postregex:
-            print('###POSTREGEX###', file=f)
-            for x in postregex:
-                print(x, file=f)
-
-        for section in ['PREFIXES', 'STEMS', 'SUFFIXES']:
-            assert f'OUT:###{section}###' in db, (
-                f'Empty {section} section. Something might be wrong with the sheets.')     
-
-        print('###PREFIXES###', file=f)
-        for x in db['OUT:###PREFIXES###']:
-            print(*x, sep='\t', file=f)
-            
-        print('###SUFFIXES###', file=f)
-        for x in db['OUT:###SUFFIXES###']:
-            print(*x, sep='\t', file=f)
+def _format_stem_entry(x):
+    # Fixes weird underscore generated by bw2ar()
+    return '\t'.join(map(str, (*x[:2], UNDERSCORE_AR.sub('_', x[2]))))
+
+
+def _generate_almor_db_sections(db):
+    """Yields the lines of each section of the DB in the order in which they are printed."""
+    yield map(str, db['OUT:###HEADER###'])
+
+    yield ['###STEMBACKOFF###']
+    yield (' '.join(map(str, x)) for x in db['OUT:###STEMBACKOFF###'])
+    
+    postregex = db.get('OUT:###POSTREGEX###')
+    if postregex:
+        yield ['###POSTREGEX###']
+        yield map(str, postregex)
+
+    yield ['###PREFIXES###']
+    yield ('\t'.join(map(str, x)) for x in db['OUT:###PREFIXES###'])
         
-        underscore_ar = re.compile('ـ')
-        print('###STEMS###', file=f)
-        for x in db['OUT:###STEMS###']:
-            # Fixes weird underscore generated by bw2ar()
-            x = (*x[:2], underscore_ar.sub('_', x[2]))
-            print(*x, sep='\t', file=f)
-
-        smart_backoff = db.get('OUT:###SMARTBACKOFF###')
-        if smart_backoff:
-            print('###SMARTBACKOFF###', file=f)
-            for x in db['OUT:###SMARTBACKOFF###']:
-                print(*x, sep='\t', file=f)
-            
-        print('###TABLE AB###', file=f)
-        for x in db['OUT:###TABLE AB###']:
-            print(*x, sep=' ', file=f)
-            
-        print('###TABLE BC###', file=f)
-        for x in db['OUT:###TABLE BC###']:
-            print(*x, sep=' ', file=f)
-            
-        print('###TABLE AC###', file=f)
-        for x in db['OUT:###TABLE AC###']:
-            print(*x, sep=' ', file=f)
+    yield ['###SUFFIXES###']
+    yield ('\t'.join(map(str, x)) for x in db['OUT:###SUFFIXES###'])
+    
+    yield ['###STEMS###']
+    stems = db['OUT:###STEMS###']
+    yield stems if isinstance(stems, StemsSpool) else map(_format_stem_entry, stems)
+
+    smart_backoff = db.get('OUT:###SMARTBACKOFF###')
+    if smart_backoff:
+        yield ['###SMARTBACKOFF###']
+        yield ('\t'.join(map(str, x)) for x in smart_backoff)
+    
+    for table in ['AB', 'BC', 'AC']:
+        yield [f'###TABLE {table}###']
+        yield (' '.join(map(str, x)) for x in db[f'OUT:###TABLE {table}###'])
 
 
 def _get_short_cat_name_maps(ORDER: pd.DataFrame) -> Dict:
@@ -1246,11 +1796,13 @@ def _get_short_cat_name_maps(ORDER: pd.DataFrame) -> Dict:
 
 
 def gen_cmplx_morph_combs(cmplx_morph_seq: str,
-                          MORPH: pd.DataFrame, LEXICON: pd.DataFrame,
+                          morph_classes: db_maker_utils.MorphemeClassIndex,
+                          lexicon_classes: db_maker_utils.MorphemeClassIndex,
                           cond2class: Optional[Dict[str, Tuple[str, int]]]=None,
                           cmplx_morph_memoize: Optional[Dict]=None,
                           pruning_cond_s_f: bool=True,
-                          pruning_same_class_incompat: bool=True) -> Dict[Tuple[Tuple[str]], List[List[pd.DataFrame]]]:
+                          pruning_same_class_incompat: bool=True,
+                          stats: Optional[Dict]=None) -> Dict[Tuple[Tuple[str]], List[List[db_maker_utils.Morpheme]]]:
     """Method which works within the scope of a PREFIX/STEM/SUFFIX order field. BW for example
     confounds prefixes (suffixes) and proclitics (enclitics) within the PREFIX (SUFFIX) field.
     [Side note]: In our case, we have an additional [Buffer] class which could be considered as
@@ -1269,8 +1821,8 @@ def gen_cmplx_morph_combs(cmplx_morph_seq: str,
     Args:
         cmplx_morph_seq (str): space-separated sequence of classes that predefine the order of the morphemes
         to be assembled for the cartesian product.
-        MORPH (pd.DataFrame): morph specs
-        LEXICON (pd.DataFrame): lexicon specs
+        morph_classes (MorphemeClassIndex): morph specs indexed by class
+        lexicon_classes (MorphemeClassIndex): lexicon specs indexed by class
         cond2class (Optional[Dict[str, Tuple[str, int]]], optional): inventory
         of condition definitions and their corresponding vectors which will be useful in the later
         pruning process. Defaults to None.
@@ -1281,12 +1833,17 @@ def gen_cmplx_morph_combs(cmplx_morph_seq: str,
         pruning_same_class_incompat (bool, optional): whether or not to perform pruning based on wether complex
         morphemes set conditions which belong to the same class of of conditions (different from morpheme class).
         Defaults to True.
+        stats (Optional[Dict], optional): if specified, the number of complex morpheme classes (condition
+        combinations) and complex morphemes before and after pruning are added to it. Defaults to None.
 
     Returns:
-        Dict[Tuple[Tuple[str]], List[List[pd.DataFrame]]]: keys are unique classes of condition combinations, and values
+        Dict[Tuple[Tuple[str]], List[List[Morpheme]]]: keys are unique classes of condition combinations, and values
         are all the combinations that have these conditions.
     """
     if cmplx_morph_memoize:
+        if stats is not None:
+            stats.update(memoized=True, classes=len(cmplx_morph_memoize),
+                         morphemes=sum(map(len, cmplx_morph_memoize.values())))
         return cmplx_morph_memoize
     
     if not cmplx_morph_seq:
@@ -1294,88 +1851,96 @@ def gen_cmplx_morph_combs(cmplx_morph_seq: str,
 
     cmplx_morph_classes = []
     for cmplx_morph_cls in cmplx_morph_seq.split():
-        sheet = LEXICON if 'STEM' in cmplx_morph_cls else MORPH
-        instances = []
-        for _, row in sheet[sheet.CLASS == cmplx_morph_cls].iterrows():
-            if 'STEM' in cmplx_morph_cls and (row['FORM'] == '' or row['FORM'] == "DROP"):
-                continue
-            instances.append(row.to_dict())
-        if not instances:
+        index = lexicon_classes if 'STEM' in cmplx_morph_cls else morph_classes
+        groups = index.get(cmplx_morph_cls)
+        if not groups:
+            if stats is not None:
+                stats.update(classes_before=0, morphemes_before=0, classes=0, morphemes=0)
             return {}
-        cmplx_morph_classes.append(instances)
+        cmplx_morph_classes.append(groups)
     
-    cmplx_morphs = [list(t) for t in itertools.product(*[mc for mc in cmplx_morph_classes if mc])]
+    # Combinations are generated at the level of groups of morphemes having the same conditions
+    # (in the same order as the combinations of the individual morphemes would be), and are only
+    # expanded into the individual morpheme combinations if they are not pruned out.
     cmplx_morph_categorized = {}
-    for seq in cmplx_morphs:
+    for seq in itertools.product(*cmplx_morph_classes):
         #TODO: maybe can reduce number of classes by uniquing and sorting?
         # Maybe there is even no need for a 3-tuple, they could all be in one string
         # (and thus reducing compilation time). I don't really know if this
         # is conceptually possible. Should try it, and see if the same DB is produced
-        cmplx_morph_class = [(morph['COND-S'], morph['COND-T'], morph['COND-F']) for morph in seq]
-        cmplx_morph_categorized.setdefault(tuple(cmplx_morph_class), []).append(seq)
-    
-    # Performing partial compatibility tests to prune out incoherent combinations
-    if pruning_cond_s_f or pruning_same_class_incompat:
-        # Prune out incoherent classes
-        complex_morph_categorized_ = {}
-        for seq_class, seq_instances in cmplx_morph_categorized.items():
-            cond_s_seq = {
-                cond for part in seq_class for cond in part[0].split()}
-            cond_t_seq = {
-                cond for part in seq_class for cond in part[1].split()}
-            cond_f_seq = {
-                cond for part in seq_class for cond in part[2].split()}
+        cmplx_morph_class = tuple(group.conds for group in seq)
+        # Performing partial compatibility tests to prune out incoherent combinations
+        if pruning_cond_s_f:
+            s_mask, f_mask = 0, 0
+            for group in seq:
+                s_mask |= group.s_mask
+                f_mask |= group.f_mask
             # If any condition appears in COND-S and COND-F of the combination sequence,
             # then the sequence should be pruned out since it is incoherent.
-            if pruning_cond_s_f and cond_s_seq.intersection(cond_f_seq) != set():
+            if s_mask & f_mask:
                 continue
-            # If any two conditions belonging to the same condition class appear in COND-T
-            # of the combination sequence, then the sequence should be pruned out since it
-            # is incoherent.
-            if pruning_same_class_incompat:
-                # If or-ed (||) COND-T did not exist, this would be as simple as checking
-                # whether two conditions of the same class are present in COND-T of the combination
-                # sequence, and disqualifying the latter based on that since two morphemes cannot
-                # coherently require some condition to be true if they are of the same class 
-                # (e.g., a combination sequence (suffix/prefix/stem) cannot both require #t and #-a>
-                # since these conditions are contradictory). But or-ed conditions require us to follow
-                # a different approach implemented below.
-                coherence = {}
-                is_not_coherent = False
-                for cond in cond_t_seq:
-                    # Disregard if default condition
-                    if cond == '_':
-                        continue
-                    elif '||' in cond:
-                        cond_s = cond.split('||')
-                        or_terms = [cond2class[cond][1] for cond in cond_s]
-                        # Based on the assumption that all terms belong to the same class
-                        cond_onehot_or = int('0' * or_terms[0], 2)
-                        for or_term in or_terms:
-                            cond_onehot_or = cond_onehot_or | or_term
-                        cond_class = cond2class[cond_s[0]]
-                        cond_onehot = cond_onehot_or
-                    else:
-                        cond_class, cond_onehot = cond2class[cond]
-                    cond_onehot_and = coherence.setdefault(cond_class, cond_onehot)
-                    coherence[cond_class] = cond_onehot_and & cond_onehot
-                for morph in coherence.values():
-                    if morph == 0:
-                        is_not_coherent = True
-                        continue
-                if is_not_coherent:
-                    continue
-            complex_morph_categorized_[seq_class] = seq_instances
-        
-        cmplx_morph_categorized = complex_morph_categorized_
+        # If any two conditions belonging to the same condition class appear in COND-T
+        # of the combination sequence, then the sequence should be pruned out since it
+        # is incoherent.
+        if pruning_same_class_incompat:
+            # If or-ed (||) COND-T did not exist, this would be as simple as checking
+            # whether two conditions of the same class are present in COND-T of the combination
+            # sequence, and disqualifying the latter based on that since two morphemes cannot
+            # coherently require some condition to be true if they are of the same class 
+            # (e.g., a combination sequence (suffix/prefix/stem) cannot both require #t and #-a>
+            # since these conditions are contradictory). But or-ed conditions require us to
+            # or their one-hot vectors (see `MorphemeClassIndex`).
+            coherence = {}
+            for group in seq:
+                if group.t_coherence is None:
+                    raise KeyError(f'Condition in {group.conds[1]} is not defined.')
+                for cond_class, cond_onehot in group.t_coherence:
+                    coherence[cond_class] = coherence.get(cond_class, cond_onehot) & cond_onehot
+            if any(cond_onehot == 0 for cond_onehot in coherence.values()):
+                continue
+        cmplx_morph_categorized[cmplx_morph_class] = [
+            list(t) for t in itertools.product(*[group.morphemes for group in seq])]
+    
+    if cmplx_morph_memoize is not None:
+        cmplx_morph_memoize.update(cmplx_morph_categorized)
     
-    cmplx_morph_memoize = cmplx_morph_categorized
+    if stats is not None:
+        classes_before, morphemes_before = 1, 1
+        for groups in cmplx_morph_classes:
+            classes_before *= len(groups)
+            morphemes_before *= sum(len(group.morphemes) for group in groups)
+        stats.update(classes_before=classes_before, morphemes_before=morphemes_before,
+                     classes=len(cmplx_morph_categorized),
+                     morphemes=sum(map(len, cmplx_morph_categorized.values())))
     
     return cmplx_morph_categorized
 
 
-def check_compatibility (cond_s: str, cond_t: str, cond_f: str,
-                         compatibility_memoize: Dict[str, bool]) -> bool:
+def _compile_cmplx_morph_classes(cmplx_morph_classes: Dict,
+                                 conditions: db_maker_utils.Conditions) -> Dict:
+    """Joins the COND-S, COND-T, and COND-F of the morphemes of each complex morpheme class
+    (all complex morphemes of a class share the same conditions) and compiles them into bitmasks.
+
+    Args:
+        cmplx_morph_classes (Dict): keys are unique classes of condition combinations and values
+        are all the combinations (complex morphemes) that have these conditions.
+        conditions (Conditions): compiled condition inventory.
+
+    Returns:
+        Dict: keys are the complex morpheme classes and values are 2-tuples containing the
+        space-separated (COND-S, COND-T, COND-F) strings and their compiled bitmasks.
+    """
+    cmplx_morph_conds = {}
+    for cmplx_morph_cls, cmplx_morphs in cmplx_morph_classes.items():
+        cond_s = ' '.join([f['COND-S'] for f in cmplx_morphs[0]])
+        cond_t = ' '.join([f['COND-T'] for f in cmplx_morphs[0]])
+        cond_f = ' '.join([f['COND-F'] for f in cmplx_morphs[0]])
+        cmplx_morph_conds[cmplx_morph_cls] = (
+            (cond_s, cond_t, cond_f), conditions.compile(cond_s, cond_t, cond_f))
+    return cmplx_morph_conds
+
+
+def check_compatibility(cond_s: int, cond_t: int, cond_t_or: Tuple[int], cond_f: int) -> bool:
     """Method which, based on COND-S (conditions set by the morpheme), COND-T (conditions
     required to be set by the concatenating morpheme(s)), and COND-F (conditions required not
     to be set by the concatenating morpheme(s)), decides whether a combination of
@@ -1387,53 +1952,31 @@ def check_compatibility (cond_s: str, cond_t: str, cond_f: str,
     with each other, their conditions must be evaluated collectively across the complex morphemes,
     along the two COND-T and COND-F axes, based on their collective identity (COND-S). In other
     words, if any COND-S of the word fromed by the complex morpheme system is present in COND-F,
+    or if any term of COND-T is not present in COND-S, then the combination is invalid.
+    Conditions are expected to be compiled into bitmasks (see `db_maker_utils.Conditions`).
 
     Args:
-        cond_s (str): concatenation of COND-S of complex prefix, complex stem, and complex suffix
-        cond_t (str): concatenation of COND-T of complex prefix, complex stem, and complex suffix
-        cond_f (str): concatenation of COND-F of complex prefix, complex stem, and complex suffix
-        compatibility_memoize (Dict[str, bool]): dictionary keeping track of combinations that were
-        previously validated to avoid recomputing them a second time.
+        cond_s (int): mask of the concatenation of COND-S of complex prefix, stem, and suffix
+        cond_t (int): mask of the (non-disjunctive) terms of the concatenation of COND-T of complex
+        prefix, stem, and suffix
+        cond_t_or (Tuple[int]): masks of the disjunctive terms of the concatenation of COND-T of complex
+        prefix, stem, and suffix
+        cond_f (int): mask of the concatenation of COND-F of complex prefix, stem, and suffix
 
     Returns:
         bool: whether a combination of complex morphemes is valid or not. If it is valid, all the
         complex morphemes in it are secured a place in the DB.
     """
-    #TODO: inefficient, in future create a Conditions class and vectorize everything
-    # This method takes up about half of the runtime profile.
-    key = f'{cond_s}\t{cond_t}\t{cond_f}'
-    if key in compatibility_memoize:
-      return compatibility_memoize[key]
-    else:
-      compatibility_memoize[key] = ''
-    # Remove all nil items (indicated as "_")
-    cs = [cond for cond in cond_s.split()]
-    ct = [cond for cond in cond_t.split()]
-    cf = [cond for cond in cond_f.split()]
-
-    valid = True
-    # Conditions required to be set by the concatenating morpheme(s)
-    for t in ct:
-        # Supports cases where we have a disjunction of condition terms
-        validor = False
-        for ort in t.split('||'):
-            validor = validor or ort in cs
-        # If any of the conditions present in COND-T is not present in COND-S
-        # then the combination in invalid 
-        valid = valid and validor
-        if not valid:
-            compatibility_memoize[key] = valid
-            return valid
+    # If any of the conditions present in COND-T is not present in COND-S
+    # then the combination in invalid
+    if cond_s & cond_t != cond_t:
+        return False
+    # Supports cases where we have a disjunction of condition terms
+    for or_term in cond_t_or:
+        if not cond_s & or_term:
+            return False
     # Conditions required NOT to be set by the concatenating morpheme(s)
-    for f in cf:
-        for orf in f.split('||'):
-            valid = valid and orf not in cs
-        if not valid:
-            compatibility_memoize[key] = valid
-            return valid
-
-    compatibility_memoize[key] = valid
-    return valid                     
+    return not cond_s & cond_f
 
 
 def _choose_required_feats(pos_type):
@@ -1498,6 +2041,16 @@ def _read_header_file(header:pd.DataFrame):
 
 
 if __name__ == "__main__":
+    if args.compare_reports is not None:
+        old_report, new_report = map(db_maker_utils.BuildReport.load, args.compare_reports)
+        lines, regressions = db_maker_utils.compare_build_reports(
+            old_report, new_report, threshold=args.report_threshold)
+        print('\n'.join(lines))
+        if regressions:
+            print(f'\n{len(regressions)} regression(s):')
+            print('\n'.join(regressions))
+        sys.exit(1 if regressions else 0)
+
     if args.run_profiling:
         profiler = cProfile.Profile()
         profiler.enable()
@@ -1513,3 +2066,4 @@ if __name__ == "__main__":
         profiler.disable()
         stats = pstats.Stats(profiler).sort_stats('cumtime')
         stats.print_stats()
+        _print_entry_memo_stats()
@@ -25,12 +25,16 @@ import os
 import sys
 from typing import Dict, List, Optional, Union, Set, Tuple
 from itertools import product
-from collections import Counter
-from itertools import combinations
+from collections import Counter, namedtuple
 import pickle
+import hashlib
+import json
+from contextlib import contextmanager, nullcontext
+from time import perf_counter, process_time
 from tqdm import tqdm
 
 import pandas as pd
+import numpy as np
 from numpy import nan
 
 try:
@@ -55,25 +59,38 @@ SPECS_HEADER_REQUIRED = dict(
 )
 ORDER_FIELDS = ['PREFIX', 'STEM', 'SUFFIX']
 ORDER_FIELDS_SHORT = ['PREFIX-SHORT', 'STEM-SHORT', 'SUFFIX-SHORT']
+# Should be incremented each time the processing of the sheets changes (such that
+# sheets processed by previous versions are not reused)
+SPECS_CACHE_VERSION = 2
 
 def read_morph_specs(config:Config,
                      lexicon_df: Optional[pd.DataFrame] = None,
                      process_morph:bool=True,
-                     lexicon_cond_f:bool=True) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Tuple[str, int]]]:
+                     lexicon_cond_f:bool=True,
+                     report:Optional['BuildReport']=None,
+                     use_cache:bool=True) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Tuple[str, int]]]:
     """
     Method which loads and processes the `csv` sheets that are specified in the
     specific configuration of the config file. Outputs a dictionary which contains
     the 7 main dataframes which will be used throughout the DB making process.
     It preprocesses all of the sheets, concatenates MORPH sheets together (same
     for ORDER and LEXICON), computes the COND-F column for MORPH and LEXICON sheets.
+    The processed sheets are cached (see `Config.get_specs_cache_path()`) and are
+    reused as long as neither the sheets of the data directory of the configuration,
+    nor the options which affect their processing, changed since.
 
     Args:
         config (Dict): dictionary containing all the necessary information to build 
         the `db` file.
         lexicon_df (pd.DataFrame): if this is specified, then the passed dataframe will be
-        processed instead of the path that is specified in the config. Defaults to None.
+        processed instead of the path that is specified in the config (the cache is not
+        used in that case). Defaults to None.
         process_morph (bool): whether or not to process MORPH specs. Defaults to True.
         lexicon_cond_f (bool): whether or not to convert COND-T conditions to COND-F when necessary. Defaults to True.
+        report (BuildReport): build report in which to record the time spent processing the
+        MORPH specs. Defaults to None.
+        use_cache (bool): whether or not to reuse (and update) the cached processed sheets.
+        Defaults to True.
 
     Returns:
         Tuple[Dict[str, pd.DataFrame], Dict[str, Tuple[str, int]]]: dictionary which contains
@@ -82,6 +99,83 @@ def read_morph_specs(config:Config,
         pruning process.
 
     """
+    if not use_cache or lexicon_df is not None:
+        return _read_morph_specs(config, lexicon_df, process_morph, lexicon_cond_f, report)
+    
+    with report_phase(report, 'specs_cache'):
+        try:
+            specs_cache_path = config.get_specs_cache_path(
+                f'_{int(process_morph)}{int(lexicon_cond_f)}')
+        except TypeError:
+            # No DB directory (`db_dir`) to keep the cache in
+            specs_cache_path = None
+        key = _get_specs_cache_key(config, process_morph, lexicon_cond_f)
+        specs = _load_specs_cache(specs_cache_path, key)
+    if specs is None:
+        specs = _read_morph_specs(config, None, process_morph, lexicon_cond_f, report)
+        _dump_specs_cache(specs_cache_path, key, specs)
+    return specs
+
+
+def _get_specs_cache_key(config: Config, process_morph: bool, lexicon_cond_f: bool) -> str:
+    """The processed sheets depend on the contents of the sheets (all the sheets which are
+    read are in the data directory of the configuration), and on the options of the
+    configuration which are used while processing them."""
+    data_dir_path = config.get_data_dir_path()
+    sheets_hash = []
+    if os.path.isdir(data_dir_path):
+        for sheet_name in sorted(os.listdir(data_dir_path)):
+            if sheet_name.endswith('.csv'):
+                with open(os.path.join(data_dir_path, sheet_name), 'rb') as f:
+                    sheets_hash.append((sheet_name, hashlib.md5(f.read()).hexdigest()))
+    options = [getattr(config, option) for option in [
+        'about', 'header', 'order', 'morph', 'lexicon', 'postregex', 'exclude', 'passive',
+        'backoff', 'dialect', 'split_or', 'clean_conditions']]
+    return hash_object((SPECS_CACHE_VERSION, sheets_hash, options, process_morph, lexicon_cond_f))
+
+
+def _load_specs_cache(specs_cache_path: Optional[str], key: str) -> Optional[Tuple]:
+    if specs_cache_path is None or not os.path.exists(specs_cache_path):
+        return None
+    # A cache which can't be read is ignored (rebuilt from the sheets)
+    try:
+        with open(specs_cache_path, 'rb') as f:
+            specs_cache = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    if (isinstance(specs_cache, dict) and
+            specs_cache.get('version') == SPECS_CACHE_VERSION and
+            specs_cache.get('key') == key):
+        return specs_cache['specs']
+    return None
+
+
+def _dump_specs_cache(specs_cache_path: Optional[str], key: str, specs: Tuple):
+    """The cache is written to a temporary file first, such that concurrent runs never
+    read a partially written cache. Scripts which only read the sheets may not be able to
+    write to the DB directory, in which case the specs are simply not cached."""
+    if specs_cache_path is None:
+        print('WARNING: No DB directory to cache the processed sheets in')
+        return
+    specs_cache_path_tmp = f'{specs_cache_path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(specs_cache_path), exist_ok=True)
+        with open(specs_cache_path_tmp, 'wb') as f:
+            pickle.dump(dict(version=SPECS_CACHE_VERSION, key=key, specs=specs), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(specs_cache_path_tmp, specs_cache_path)
+    except OSError as e:
+        print(f'WARNING: Could not cache the processed sheets in {specs_cache_path} ({e})')
+        if os.path.exists(specs_cache_path_tmp):
+            os.remove(specs_cache_path_tmp)
+
+
+def _read_morph_specs(config:Config,
+                      lexicon_df: Optional[pd.DataFrame],
+                      process_morph:bool,
+                      lexicon_cond_f:bool,
+                      report:Optional['BuildReport']) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Tuple[str, int]]]:
+    """Same as `read_morph_specs()` but without the cache."""
     # Imported here to avoid disturbing other files' camel_tools importing which
     # should happen from the fork and not the pip installed version. If imported
     # globally, then the official camel_tools will be loaded everywhere, even in
@@ -122,8 +216,7 @@ def read_morph_specs(config:Config,
                     columns = ['CLASS']
                 for col in columns:
                     if label:
-                        specs_[col] = specs_.apply(
-                            lambda row: re.sub(r'\]', f'-{label}]', row[col]), axis=1)
+                        specs_[col] = _add_class_label(specs_[col], label)
                 specs = pd.concat([specs, specs_]).fillna('') if specs is not None else specs_
                 
             specs.reset_index(drop=True, inplace=True)
@@ -170,8 +263,7 @@ def read_morph_specs(config:Config,
             LEXICON_ = pd.read_csv(config.get_sheet_path_from_name(lexicon_sheet_name),
                                    dtype=object, na_filter=False)
             if label:
-                LEXICON_['CLASS'] = LEXICON_.apply(
-                    lambda row: re.sub(r'\]', f'-{label}]', row['CLASS']), axis=1)
+                LEXICON_['CLASS'] = _add_class_label(LEXICON_['CLASS'], label)
         else:
             LEXICON_ = label
         # Only use entries in which the `DEFINE` has 'LEXICON' specified.
@@ -214,15 +306,12 @@ def read_morph_specs(config:Config,
         if LEXICON[lex_type] is None:
             continue
         LEXICON[lex_type] = LEXICON[lex_type].astype(str)
-        LEXICON[lex_type] = LEXICON[lex_type].apply(
-            lambda x: x.str.strip() if x.dtype == 'object' and x.dtype not in [float, int] else x)
+        LEXICON[lex_type] = LEXICON[lex_type].apply(lambda x: x.str.strip())
         LEXICON[lex_type].reset_index(drop=True, inplace=True)
-        LEXICON[lex_type] = LEXICON[lex_type].apply(
-            lambda x: x.str.strip() if x.dtype == 'object' else x)
         if 'BW' not in LEXICON[lex_type].columns:
             LEXICON[lex_type]['BW'] = LEXICON[lex_type]['FEAT'].str.extract(
                 r'pos:(\S+)')[0].apply(str.upper)
-        LEXICON[lex_type]['BW'] = LEXICON[lex_type]['BW'].replace('\s+', '#', regex=True)
+        LEXICON[lex_type]['BW'] = LEXICON[lex_type]['BW'].str.replace(r'\s+', '#', regex=True)
         LEXICON[lex_type].loc[LEXICON[lex_type]['BW'] == '', 'BW'] = \
             LEXICON[lex_type]['FEAT'].str.extract(r'pos:(\S+)')[0].apply(str.upper)
         LEXICON[lex_type].loc[LEXICON[lex_type]['BW'].str.contains('\+'), 'BW'] = \
@@ -269,21 +358,7 @@ def read_morph_specs(config:Config,
         for lex_type in ['concrete', 'backoff']:
             if LEXICON[lex_type] is None:
                 continue
-            LEXICON_ = []
-            for _, row in LEXICON[lex_type].iterrows():
-                terms = {'disj': [], 'other': []}
-                for term in row['COND-T'].split():
-                    terms['disj' if '||' in term else 'other'].append(term)
-                
-                if terms['disj']:
-                    terms_other = ' '.join(terms['other'])
-                    for disj_terms in product(*[t.split('||') for t in terms['disj']]):
-                        row_ = row.to_dict()
-                        row_['COND-T'] = f"{' '.join(disj_terms)} {terms_other}".strip()
-                        LEXICON_.append(row_)
-                else:
-                    LEXICON_.append(row.to_dict())
-            LEXICON[lex_type] = pd.DataFrame(LEXICON_)
+            LEXICON[lex_type] = _split_or_sheet(LEXICON[lex_type])
 
     exclusions: List[str] = config.exclude if config.exclude is not None else []
     
@@ -321,51 +396,27 @@ def read_morph_specs(config:Config,
         # Process MORPH sheet
         MORPH = MORPH[MORPH.DEFINE == 'MORPH']
         MORPH = pd.concat([MORPH, pd.DataFrame(EMPTY_ROW)], ignore_index=True).fillna('')
-        MORPH = MORPH.astype(str)
-        MORPH = MORPH.apply(lambda x: x.str.strip()
-                            if x.dtype == 'object' and x.dtype not in [float, int] else x)
-        MORPH = MORPH.replace('\s+', ' ', regex=True)
-
-        MORPH['COND-S'] = MORPH['COND-S'].replace('[\[\]]', '', regex=True)
-        MORPH.loc[MORPH['COND-S'] == '', 'COND-S'] = '_'
-        MORPH.loc[MORPH['COND-T'] == '', 'COND-T'] = '_'
-        # Replace spaces in BW and GLOSS with '#'
-        MORPH['BW'] = MORPH['BW'].replace('\s+', '#', regex=True)
-        MORPH.loc[MORPH['BW'] == '', 'BW'] = '_'
-        MORPH.loc[MORPH['FORM'] == '', 'FORM'] = '_'
-        MORPH['GLOSS'] = MORPH['GLOSS'].replace('\s+', '#', regex=True)
+        MORPH = _normalize_morph_sheet(MORPH)
         if 'COND-F' not in MORPH.columns:
             MORPH['COND-F'] = ''
-        MORPH = process_morph_specs(MORPH, exclusions) if process_morph else MORPH
+        if process_morph:
+            with report_phase(report, 'process_morph_specs'):
+                MORPH = process_morph_specs(MORPH, exclusions)
 
     # cont'd: Process LEXICON sheet
     for lex_type in ['concrete', 'backoff']:
         if LEXICON[lex_type] is None:
             continue
-        LEXICON[lex_type] = LEXICON[lex_type].replace('\s+', ' ', regex=True)
-        LEXICON[lex_type]['GLOSS'] = LEXICON[lex_type]['GLOSS'].replace('\s+', '#', regex=True)
-        # Generate Lexicon COND-F if necessary
-        if lexicon_cond_f and any('!' in cond_t for cond_t in LEXICON[lex_type]['COND-T'].values.tolist()):
-            print('Lexicon sheet COND-F populated')
-            for i, row in LEXICON[lex_type].iterrows():
-                cond_t = row['COND-T'].split()
-                cond_t_, cond_f_ = [], []
-                for ct in cond_t:
-                    if ct.startswith('!'):
-                        cond_f_.append(ct[1:])
-                    else:
-                        cond_t_.append(ct)
-                LEXICON[lex_type].at[i, 'COND-T'] = ' '.join(cond_t_)
-                LEXICON[lex_type].at[i, 'COND-F'] = ' '.join(cond_f_)
+        LEXICON[lex_type] = _normalize_lexicon_sheet(LEXICON[lex_type], lexicon_cond_f)
     
     #NOTE: temporary fix to the next `if` statement; read below FIXME note to see
     # what the problem is. Here we delete some unused conditions manually, but
     # there might be others which we do not know of, which is why the next `if`
     # statement is needed.
     if LEXICON['concrete'] is not None:
-        LEXICON['concrete']['COND-S'] = LEXICON['concrete']['COND-S'].replace(
+        LEXICON['concrete']['COND-S'] = LEXICON['concrete']['COND-S'].str.replace(
             r'hollow|defective', '', regex=True)
-        LEXICON['concrete']['COND-S'] = LEXICON['concrete']['COND-S'].replace(
+        LEXICON['concrete']['COND-S'] = LEXICON['concrete']['COND-S'].str.replace(
             r' +', ' ', regex=True)
     
     #FIXME: below `if` statement currently not being used anywhere because behavior is
@@ -401,12 +452,10 @@ def read_morph_specs(config:Config,
                             for cond in conditions_unused)
                 if conditions_unused:
                     print(f'Deleting unused conditions: {conditions_unused}')
-                    conditions_unused = '^(' + conditions_unused + ')$'
-                    df[f] = df.apply(lambda row: ' '.join(re.sub(conditions_unused, '', cond)
-                                                          for cond in row[f].split()), axis=1)
+                    df[f] = _delete_conditions(df[f], conditions_unused)
 
-                df[f] = df[f].replace(' +', ' ', regex=True)
-                df[f] = df[f].replace(' $', '', regex=True)
+                df[f] = df[f].str.replace(' +', ' ', regex=True)
+                df[f] = df[f].str.replace(' $', '', regex=True)
 
     SHEETS = dict(about=ABOUT, header=HEADER, order=ORDER, morph=MORPH,
                   lexicon=LEXICON['concrete'], smart_backoff=LEXICON['smart_backoff'],
@@ -416,6 +465,87 @@ def read_morph_specs(config:Config,
     return SHEETS, cond2class
 
 
+def _replace_regex(sheet: pd.DataFrame, pattern: str, repl: str) -> pd.DataFrame:
+    """Same as `sheet.replace(pattern, repl, regex=True)` for sheets containing strings
+    only, but done column by column using the vectorized string methods, which is
+    much faster on large sheets."""
+    sheet = sheet.copy()
+    for col in sheet.columns:
+        if sheet[col].dtype == object:
+            sheet[col] = sheet[col].str.replace(pattern, repl, regex=True)
+    return sheet
+
+
+def _add_class_label(classes: pd.Series, label: str) -> pd.Series:
+    """Appends the label of a sheet to the morpheme classes of its column, e.g.,
+    `[STEM-PV]` becomes `[STEM-PV-label]` (see `_read_specs()` in `read_morph_specs()`)."""
+    return classes.str.replace(']', f'-{label}]', regex=False)
+
+
+def _normalize_morph_sheet(MORPH: pd.DataFrame) -> pd.DataFrame:
+    """Strips the cells of the MORPH sheet, collapses their whitespace, and fills in the
+    empty COND-S, COND-T, BW, and FORM cells with `_`."""
+    MORPH = MORPH.astype(str)
+    MORPH = MORPH.apply(lambda x: x.str.strip()
+                        if x.dtype == 'object' and x.dtype not in [float, int] else x)
+    MORPH = _replace_regex(MORPH, r'\s+', ' ')
+
+    MORPH['COND-S'] = MORPH['COND-S'].str.replace(r'[\[\]]', '', regex=True)
+    MORPH.loc[MORPH['COND-S'] == '', 'COND-S'] = '_'
+    MORPH.loc[MORPH['COND-T'] == '', 'COND-T'] = '_'
+    # Replace spaces in BW and GLOSS with '#'
+    MORPH['BW'] = MORPH['BW'].str.replace(r'\s+', '#', regex=True)
+    MORPH.loc[MORPH['BW'] == '', 'BW'] = '_'
+    MORPH.loc[MORPH['FORM'] == '', 'FORM'] = '_'
+    MORPH['GLOSS'] = MORPH['GLOSS'].str.replace(r'\s+', '#', regex=True)
+    return MORPH
+
+
+def _normalize_lexicon_sheet(LEXICON: pd.DataFrame, lexicon_cond_f: bool) -> pd.DataFrame:
+    """Collapses the whitespace of the cells of a LEXICON sheet and, if `lexicon_cond_f`
+    is set, moves the negated (`!`) COND-T terms to COND-F."""
+    LEXICON = _replace_regex(LEXICON, r'\s+', ' ')
+    LEXICON['GLOSS'] = LEXICON['GLOSS'].str.replace(r'\s+', '#', regex=True)
+    cond_t = LEXICON['COND-T']
+    if lexicon_cond_f and cond_t.str.contains('!', regex=False).any():
+        print('Lexicon sheet COND-F populated')
+        LEXICON['COND-F'] = cond_t.str.findall(r'(?<!\S)!(\S*)').str.join(' ')
+        LEXICON['COND-T'] = cond_t.str.replace(
+            r'(?<!\S)!\S*', '', regex=True).str.split().str.join(' ')
+    return LEXICON
+
+
+def _split_or_sheet(LEXICON: pd.DataFrame) -> pd.DataFrame:
+    """Repeats each row of a LEXICON sheet once per conjunctive expression its COND-T
+    expands into (see `_split_or_cond_t()`)."""
+    LEXICON = LEXICON.assign(**{'COND-T': [
+        _split_or_cond_t(cond_t) for cond_t in LEXICON['COND-T'].values.tolist()]})
+    return LEXICON.explode('COND-T', ignore_index=True)
+
+
+def _delete_conditions(conditions: pd.Series, conditions_unused: str) -> pd.Series:
+    """Deletes the conditions matching `conditions_unused` (a disjunction of conditions)
+    from a condition column. Only whole (space-separated) terms are deleted, and the
+    terms are split on whitespace first, such that stray spaces (e.g., left by the
+    deletion of `hollow|defective`) are dropped, as when deleting term by term."""
+    conditions = conditions.str.split().str.join(' ')
+    return conditions.str.replace(
+        r'(?<!\S)(' + conditions_unused + r')(?!\S)', '', regex=True)
+
+
+def _split_or_cond_t(cond_t: str) -> List[str]:
+    """Expands a COND-T expression with disjunctive (`||`) terms into the list of
+    conjunctive expressions it is equivalent to (see `split_or` in `read_morph_specs()`)."""
+    terms = {'disj': [], 'other': []}
+    for term in cond_t.split():
+        terms['disj' if '||' in term else 'other'].append(term)
+    if not terms['disj']:
+        return [cond_t]
+    terms_other = ' '.join(terms['other'])
+    return [f"{' '.join(disj_terms)} {terms_other}".strip()
+            for disj_terms in product(*[t.split('||') for t in terms['disj']])]
+
+
 def process_morph_specs(MORPH:pd.DataFrame, exclusions: List[str]) -> pd.DataFrame:
     """
     Method which preprocesses the MORPH sheet by cleaning it and generating
@@ -479,72 +609,74 @@ def process_morph_specs(MORPH:pd.DataFrame, exclusions: List[str]) -> pd.DataFra
     Returns:
         pd.DataFrame: processed morph dataframe.
     """
-    MORPH_CLASSES = MORPH.CLASS.unique()
-    MORPH_CLASSES = MORPH_CLASSES[MORPH_CLASSES != '_']
-    MORPH_MORPHEMES = MORPH.FUNC.unique()
-    MORPH_MORPHEMES = MORPH_MORPHEMES[MORPH_MORPHEMES != '_']
-    # TODO: refactor in a way to go through only valid morphemes, it is not necessary
-    # to search for those, simply iterate over them as they are in MORPH sheet.
-    for CLASS in MORPH_CLASSES:
-        for MORPHEME in MORPH_MORPHEMES: 
-            # Get the unique list of the true conditions in all the allomorphs.
-            # We basically want to convert the 'COND-T' column into n columns
-            # where n = maximum number of conditions for a single allomorph
-            cond_t = MORPH[(MORPH.FUNC == MORPHEME) & 
-                                (MORPH.CLASS == CLASS)]['COND-T'].str.split(pat=' ', expand=True)
-            if cond_t.empty:
-                continue
-            cond_t = cond_t.replace(r'\b_\b', '', regex=True)
+    # Conditions are processed as lists (one per morpheme, i.e., (CLASS, FUNC) group) and
+    # the COND-T and COND-F columns are written back only once at the end.
+    MORPH_COND_T, MORPH_COND_F = MORPH['COND-T'].tolist(), MORPH['COND-F'].tolist()
+    for (CLASS, MORPHEME), indexes in MORPH.groupby(['CLASS', 'FUNC'], sort=False).indices.items():
+        if CLASS == '_' or MORPHEME == '_':
+            continue
+        indexes = indexes.tolist()
+        # Get the unique list of the true conditions in all the allomorphs.
+        # We basically want to convert the 'COND-T' column into n columns
+        # where n = maximum number of conditions for a single allomorph
+        cond_t = [MORPH_COND_T[idx].split(' ') for idx in indexes]
+        num_cols = max(len(cond_t_almrph) for cond_t_almrph in cond_t)
+        cond_t = [[re.sub(r'\b_\b', '', cond) for cond in cond_t_almrph] +
+                  [None] * (num_cols - len(cond_t_almrph))
+                  for cond_t_almrph in cond_t]
 
-            if len(cond_t.iloc[:][:]) == 1 and cond_t.iloc[0][0] == '':
-                continue
-            # Go through each column in the true conditions
-            for col in cond_t:
-                if col == 0:
-                    # Unique col[0] and remove fluff
-                    cond_t_current = get_clean_set(cond_t[col])
-                    MORPH = get_morph_cond_f(cond_t[col], cond_t_current, MORPH)
+        if len(cond_t) == 1 and cond_t[0][0] == '':
+            continue
+        cond_f = [MORPH_COND_F[idx] for idx in indexes]
+        # Go through each column in the true conditions
+        for col in range(num_cols):
+            if col == 0:
+                # Unique col[0] and remove fluff
+                cond_t_col = [cond_t_almrph[0] for cond_t_almrph in cond_t]
+                cond_t_current = get_clean_set(cond_t_col)
+                get_morph_cond_f(cond_t_col, cond_t_current, cond_f)
+            else:
+                # Merge the condTrue for col 0-col (the SR) to group allomorphs with similar
+                # general conditions, and go through each group of allomorphs (in order
+                # of appearance of the groups).
+                if col == 1:
+                    cond_t_col = [cond_t_almrph[1] for cond_t_almrph in cond_t]
+                    cond_t_sr = [cond_t_almrph[0] for cond_t_almrph in cond_t]
                 else:
-                    # Create temp_T by merging the the condTrue for col 0-col, put it in 
-                    # col[0] and remove 1:col. This is basically to group allomorph with 
-                    # similar general conditions. Take the unique of what is now col[0] and
-                    # remove the fluff.
-                    if col == 1:
-                        cond_t_temp = cond_t.copy()
-                    else:
-                        cond_t_temp = cond_t.copy()
-                        cond_t_temp = cond_t_temp.replace([None], '')
-
-                        cond_t_temp[0] = cond_t_temp.loc[:,:col-1].agg(' '.join, axis=1)
-                        cond_t_temp = cond_t_temp.drop(cond_t_temp.columns[1:col], axis=1)
-                        cond_t_temp.columns = range(cond_t_temp.shape[1])
-                    if len(cond_t_temp.columns) == 1:
-                        continue
-
-                    cond_groups = cond_t_temp[0].unique()
-                    cond_groups = cond_groups[cond_groups!= '_']
-                    # Go through each group of allomorphs
-                    for cond_group in cond_groups:
-                        cond_t_current = get_clean_set(cond_t_temp[cond_t_temp[0] == cond_group][1])
-                        MORPH = get_morph_cond_f(
-                            cond_t_temp[cond_t_temp[0] == cond_group][1], cond_t_current, MORPH)
-            
-            for idx, _ in MORPH[(MORPH.FUNC == MORPHEME) & (MORPH.CLASS == CLASS)].iterrows():
-                # If there is a negated condition in the set of true conditions for the 
-                # current allomorph, remove the negation and add it to the false 
-                # conditions list for the current alomorph.
-                cond_t_almrph = MORPH.loc[idx, 'COND-T'].split(' ')
-                cond_f_almrph = MORPH.loc[idx, 'COND-F'].split(' ')
-                cond_s_negated = [x for x in cond_t_almrph if x.startswith('!')]
-                if cond_s_negated:
-                    for cond_negated in cond_s_negated:
-                        cond_f_almrph.append(cond_negated[1:])
-                        # remove from the true conditions
-                        cond_t_almrph.remove(cond_negated)
-                cond_t_almrph = [y for y in cond_t_almrph if y not in ['', '_', 'else', None]]
-                cond_f_almrph = [y for y in cond_f_almrph if y not in ['', '_', 'else', None]]
-                MORPH.loc[idx, 'COND-T'] = ' '.join(cond_t_almrph)
-                MORPH.loc[idx, 'COND-F'] = ' '.join(cond_f_almrph)
+                    cond_t_col = [cond_t_almrph[col] if cond_t_almrph[col] is not None else ''
+                                  for cond_t_almrph in cond_t]
+                    cond_t_sr = [' '.join(cond if cond is not None else '' for cond in cond_t_almrph[:col])
+                                 for cond_t_almrph in cond_t]
+                cond_groups = {}
+                for i, cond_group in enumerate(cond_t_sr):
+                    if cond_group != '_':
+                        cond_groups.setdefault(cond_group, []).append(i)
+                for group_indexes in cond_groups.values():
+                    cond_t_col_group = [cond_t_col[i] for i in group_indexes]
+                    cond_t_current = get_clean_set(cond_t_col_group)
+                    cond_f_group = [cond_f[i] for i in group_indexes]
+                    get_morph_cond_f(cond_t_col_group, cond_t_current, cond_f_group)
+                    for i, cond_f_almrph in zip(group_indexes, cond_f_group):
+                        cond_f[i] = cond_f_almrph
+        
+        for i, idx in enumerate(indexes):
+            # If there is a negated condition in the set of true conditions for the 
+            # current allomorph, remove the negation and add it to the false 
+            # conditions list for the current alomorph.
+            cond_t_almrph = MORPH_COND_T[idx].split(' ')
+            cond_f_almrph = cond_f[i].split(' ')
+            cond_s_negated = [x for x in cond_t_almrph if x.startswith('!')]
+            if cond_s_negated:
+                for cond_negated in cond_s_negated:
+                    cond_f_almrph.append(cond_negated[1:])
+                    # remove from the true conditions
+                    cond_t_almrph.remove(cond_negated)
+            cond_t_almrph = [y for y in cond_t_almrph if y not in ['', '_', 'else', None]]
+            cond_f_almrph = [y for y in cond_f_almrph if y not in ['', '_', 'else', None]]
+            MORPH_COND_T[idx] = ' '.join(cond_t_almrph)
+            MORPH_COND_F[idx] = ' '.join(cond_f_almrph)
+    
+    MORPH['COND-T'], MORPH['COND-F'] = MORPH_COND_T, MORPH_COND_F
 
     for exclusion in exclusions:
         MORPH = MORPH[~MORPH.EXCLUDE.str.contains(f'(?:^|\s){exclusion}(?:\s|$)')]
@@ -555,24 +687,24 @@ def process_morph_specs(MORPH:pd.DataFrame, exclusions: List[str]) -> pd.DataFra
     return MORPH
 
 
-def get_clean_set(cond_col: pd.Series) -> Set[str]:
+def get_clean_set(cond_col: List[Optional[str]]) -> Set[str]:
     """Cleans up the conjunction of terms in COND-T field, keeping only valid
     conditions (not else or empty)."""
-    morph_cond_t = cond_col.tolist()
     morph_cond_t = [
-        y for y in morph_cond_t if y not in ['', '_', 'else', None]]
+        y for y in cond_col if y not in ['', '_', 'else', None]]
     morph_cond_t = set(morph_cond_t)
 
     return morph_cond_t
 
 
-def get_morph_cond_f(morph_cond_t: pd.Series,
+def get_morph_cond_f(morph_cond_t: List[Optional[str]],
                      cond_t_current: Set[str],
-                     MORPH: pd.DataFrame) -> pd.DataFrame:
+                     morph_cond_f: List[str]):
     """Get COND-F based on the RoA (see defition in documentation of
-    `process_morph_specs()`"""
+    `process_morph_specs()`. `morph_cond_f` (COND-F of the allomorphs in
+    `morph_cond_t`) is updated in place."""
     # Go through each allomorph
-    for idx, entry in morph_cond_t.iteritems():
+    for i, entry in enumerate(morph_cond_t):
         # If we have no true condition for the allomorph (aka can take anything)
         if entry is None:
             continue
@@ -581,11 +713,8 @@ def get_morph_cond_f(morph_cond_t: pd.Series,
         elif entry == 'else':
             cond_f_almrph = cond_t_current
             # Finally, populate the 'COND-F' cell with the false conditions
-        MORPH.loc[idx, 'COND-F'] = MORPH.loc[idx, 'COND-F'] + \
-            ' ' + ' '.join(cond_f_almrph)
-        MORPH.loc[idx, 'COND-F'] = re.sub(r'\b_\b', '', MORPH.loc[idx, 'COND-F'])
-    
-    return MORPH
+        morph_cond_f[i] = morph_cond_f[i] + ' ' + ' '.join(cond_f_almrph)
+        morph_cond_f[i] = re.sub(r'\b_\b', '', morph_cond_f[i])
 
 def _get_cond_false(cond_t_all, cond_t_almrph):
     """
@@ -603,6 +732,413 @@ def _get_cond_false(cond_t_all, cond_t_almrph):
     return cond_f_almrph, cond_t_almrph
 
 
+class Conditions:
+    """Compiled representation of the conditions used in the COND-S, COND-T, and
+    COND-F fields of the MORPH and LEXICON sheets. Each condition is assigned a unique
+    integer bit (the `_` default is treated as any other condition), which allows a
+    (complex) morpheme's conditions to be represented as bitmasks, and thus validation
+    to be performed using bitwise operations instead of string splitting and lookups.
+    A compiled conjunction of conditions is a 4-tuple (S, T, T_OR, F) where:
+        - S is the mask of all conditions set by the morpheme(s).
+        - T is the mask of all conditions required to be set (non-disjunctive terms).
+        - T_OR is a tuple of masks, one per disjunctive (`||`) COND-T term, at least
+        one bit of which should be set.
+        - F is the mask of all conditions (including each disjunct of disjunctive terms)
+        required not to be set.
+    Conditions which were not seen at initialization time get a new bit on the fly.
+    """
+    def __init__(self, conditions: Optional[List[str]] = None) -> None:
+        self.cond2bit: Dict[str, int] = {}
+        if conditions is not None:
+            for cond in conditions:
+                self.get_bit(cond)
+
+    @classmethod
+    def from_specs(cls,
+                   cond2class: Optional[Dict[str, Tuple[str, int]]],
+                   sheets: List[Optional[pd.DataFrame]]) -> 'Conditions':
+        """Assigns bits to all conditions defined in the CONDITIONS rows of the
+        MORPH sheet (`cond2class`) first, and then to all the remaining conditions
+        appearing in the condition fields of the specified sheets."""
+        conditions = list(cond2class) if cond2class is not None else []
+        for sheet in sheets:
+            if sheet is None:
+                continue
+            for f in ['COND-S', 'COND-T', 'COND-F']:
+                if f not in sheet.columns:
+                    continue
+                for cond_field in sheet[f].unique().tolist():
+                    conditions += [cond for term in cond_field.split()
+                                   for cond in term.split('||') if cond]
+        return cls(conditions)
+
+    def get_bit(self, cond: str) -> int:
+        bit = self.cond2bit.get(cond)
+        if bit is None:
+            bit = 1 << len(self.cond2bit)
+            self.cond2bit[cond] = bit
+        return bit
+
+    def compile(self, cond_s: str, cond_t: str, cond_f: str) -> Tuple[int, int, Tuple[int], int]:
+        """Compiles space-separated COND-S, COND-T, and COND-F strings (conjunctions of terms)
+        into their bitmask representation."""
+        s_mask = 0
+        for cond in cond_s.split():
+            s_mask |= self.get_bit(cond)
+        t_mask, t_or_masks = 0, []
+        for term in cond_t.split():
+            if '||' in term:
+                # Empty disjuncts can never be set so they do not contribute to the mask
+                or_mask = 0
+                for cond in term.split('||'):
+                    if cond:
+                        or_mask |= self.get_bit(cond)
+                t_or_masks.append(or_mask)
+            else:
+                t_mask |= self.get_bit(term)
+        f_mask = 0
+        for term in cond_f.split():
+            for cond in term.split('||'):
+                if cond:
+                    f_mask |= self.get_bit(cond)
+        return s_mask, t_mask, tuple(t_or_masks), f_mask
+
+    def to_array(self, masks: List[int]) -> np.ndarray:
+        """Converts a list of (arbitrarily long) integer masks into an array of shape
+        (len(masks), W) of 64-bit words, with W being large enough to fit all the bits
+        which were assigned so far."""
+        num_words = max(1, (len(self.cond2bit) + 63) // 64)
+        array = np.zeros((len(masks), num_words), dtype=np.uint64)
+        for i, mask in enumerate(masks):
+            for j in range(num_words):
+                array[i, j] = (mask >> (64 * j)) & 0xFFFFFFFFFFFFFFFF
+        return array
+
+    @staticmethod
+    def combine(*compiled: Tuple[int, int, Tuple[int], int]) -> Tuple[int, int, Tuple[int], int]:
+        """Concatenates the conditions of multiple compiled (complex) morphemes, which is
+        equivalent to joining their COND-S, COND-T, and COND-F strings."""
+        s_mask, t_mask, t_or_masks, f_mask = 0, 0, (), 0
+        for s, t, t_or, f in compiled:
+            s_mask |= s
+            t_mask |= t
+            t_or_masks += t_or
+            f_mask |= f
+        return s_mask, t_mask, t_or_masks, f_mask
+
+
+class Morpheme:
+    """Read-only record of a row (morpheme) of the MORPH or LEXICON sheets. It is accessed in
+    the same way as the dictionary of the row (`morpheme['FORM']`, `morpheme.get('SOURCE')`,
+    `'LEMMA' in morpheme`), but only stores a tuple of values and a reference to the column
+    index of the sheet it comes from."""
+    __slots__ = ('values', 'col2index')
+
+    def __init__(self, values: Tuple, col2index: Dict[str, int]):
+        self.values = values
+        self.col2index = col2index
+    
+    def __getitem__(self, col: str):
+        return self.values[self.col2index[col]]
+    
+    def __contains__(self, col: str) -> bool:
+        return col in self.col2index
+    
+    def get(self, col: str, default=None):
+        index = self.col2index.get(col)
+        return self.values[index] if index is not None else default
+
+
+# Morphemes of a class which have the same (COND-S, COND-T, COND-F), along with their
+# conditions compiled for pruning. `s_mask` and `f_mask` are bitmasks over the whitespace
+# separated condition IDs of COND-S and COND-F, and `t_coherence` contains the (condition
+# class, one-hot vector) of the COND-T conditions (None if some condition is not defined).
+MorphemeGroup = namedtuple('MorphemeGroup', ['conds', 'morphemes', 's_mask', 'f_mask', 't_coherence'])
+
+
+class MorphemeClassIndex:
+    """One-time index of the morphemes of a sheet (MORPH or LEXICON) by CLASS. Morphemes
+    of each class are grouped by conditions, in order of first appearance in the sheet,
+    such that complex morphemes can be generated (and pruned) at the condition level
+    before being expanded into individual morpheme combinations."""
+    
+    def __init__(self,
+                 sheet: pd.DataFrame,
+                 cond2class: Optional[Dict[str, Tuple[str, int]]]=None,
+                 cond2id: Optional[Dict[str, int]]=None,
+                 stems: bool=False):
+        """
+        Args:
+            sheet (pd.DataFrame): MORPH or LEXICON sheet.
+            cond2class (Optional[Dict[str, Tuple[str, int]]]): inventory of condition definitions
+            and their corresponding vectors. Defaults to None.
+            cond2id (Optional[Dict[str, int]]): condition IDs to share with other indexes (such
+            that their masks can be combined). Defaults to None.
+            stems (bool): whether the sheet is a lexicon, in which case stems with an empty
+            or DROP form are skipped. Defaults to False.
+        """
+        self.cond2id = cond2id if cond2id is not None else {}
+        self.cond2class = cond2class
+        self.class2groups: Dict[str, List[MorphemeGroup]] = {}
+        col2index = {col: i for i, col in enumerate(sheet.columns)}
+        cond_cols = [col2index[col] for col in ['COND-S', 'COND-T', 'COND-F']]
+        class_col, form_col = col2index['CLASS'], col2index['FORM']
+        class2conds2morphemes = {}
+        for values in sheet.itertuples(index=False, name=None):
+            if stems and (values[form_col] == '' or values[form_col] == 'DROP'):
+                continue
+            conds = tuple(values[i] for i in cond_cols)
+            class2conds2morphemes.setdefault(values[class_col], {}).setdefault(
+                conds, []).append(Morpheme(values, col2index))
+        for cls, conds2morphemes in class2conds2morphemes.items():
+            self.class2groups[cls] = [self._get_group(conds, morphemes)
+                                      for conds, morphemes in conds2morphemes.items()]
+    
+    def get_cond_id(self, cond: str) -> int:
+        return self.cond2id.setdefault(cond, len(self.cond2id))
+
+    def _get_group(self, conds: Tuple[str, str, str], morphemes: List[Morpheme]) -> MorphemeGroup:
+        cond_s, cond_t, cond_f = conds
+        s_mask, f_mask = 0, 0
+        for cond in cond_s.split():
+            s_mask |= 1 << self.get_cond_id(cond)
+        for cond in cond_f.split():
+            f_mask |= 1 << self.get_cond_id(cond)
+        try:
+            t_coherence = tuple(self._get_coherence(cond)
+                                for cond in set(cond_t.split()) if cond != '_')
+        except (KeyError, TypeError):
+            t_coherence = None
+        return MorphemeGroup(conds, morphemes, s_mask, f_mask, t_coherence)
+
+    def _get_coherence(self, cond: str) -> Tuple:
+        if '||' in cond:
+            cond_s = cond.split('||')
+            # Based on the assumption that all terms belong to the same class
+            cond_onehot = 0
+            for or_term in cond_s:
+                cond_onehot |= self.cond2class[or_term][1]
+            return self.cond2class[cond_s[0]], cond_onehot
+        else:
+            return self.cond2class[cond]
+    
+    def get(self, cls: str) -> List[MorphemeGroup]:
+        return self.class2groups.get(cls, [])
+
+
+class BuildReport:
+    """Instrumentation of a DB build. Records the wall-clock and CPU time of each build
+    phase, statistics of the compilation of each order line (sizes of the complex morpheme
+    classes before and after pruning, number of validated triples, hit rate of the category
+    memo, number of generated entries, and time spent in each step), and counters, which
+    are then dumped as a JSON report (see `compare_build_reports()` to diff two reports)."""
+    VERSION = 1
+
+    def __init__(self, info: Optional[Dict] = None) -> None:
+        self.info = info if info is not None else {}
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.order_lines: List[Dict] = []
+        self.counters: Dict[str, Dict] = {}
+        self._phase_stack: List[str] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times the enclosed block. Phases entered from within another phase are recorded
+        as `outer/inner`, and the time of a phase which is entered more than once is summed."""
+        self._phase_stack.append(name)
+        phase = self.phases.setdefault('/'.join(self._phase_stack),
+                                       dict(wall=0.0, cpu=0.0, calls=0))
+        wall, cpu = perf_counter(), process_time()
+        try:
+            yield
+        finally:
+            phase['wall'] += perf_counter() - wall
+            phase['cpu'] += process_time() - cpu
+            phase['calls'] += 1
+            self._phase_stack.pop()
+
+    def add_order_line(self, section: str, index: int, order_sequence: pd.Series,
+                       stats: Dict) -> None:
+        order_line = dict(section=section, index=index)
+        for field in ['CLASS'] + ORDER_FIELDS + ORDER_FIELDS_SHORT:
+            if field in order_sequence.index:
+                order_line[field] = order_sequence[field]
+        order_line.update(stats)
+        self.order_lines.append(order_line)
+
+    def get_totals(self) -> Dict:
+        """Sums the statistics of all the (non-cached) order lines."""
+        totals = dict(order_lines=len(self.order_lines), cached=0, empty=0)
+        for order_line in self.order_lines:
+            if order_line.get('cached'):
+                totals['cached'] += 1
+                continue
+            if order_line.get('empty'):
+                totals['empty'] += 1
+            _add_counts(totals, {k: v for k, v in order_line.items()
+                                 if k in ['time', 'combs', 'triples', 'cat_memo', 'entries']})
+        cat_memo = totals.get('cat_memo')
+        if cat_memo:
+            lookups = cat_memo['hits'] + cat_memo['misses']
+            cat_memo['hit_rate'] = cat_memo['hits'] / lookups if lookups else 0.0
+        return totals
+
+    def to_dict(self) -> Dict:
+        return dict(version=self.VERSION, info=self.info, phases=self.phases,
+                    totals=self.get_totals(), counters=self.counters,
+                    order_lines=self.order_lines)
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def load(path: str) -> Dict:
+        with open(path) as f:
+            report = json.load(f)
+        if report.get('version') != BuildReport.VERSION:
+            raise ValueError(f'{path}: unsupported build report version {report.get("version")}.')
+        return report
+
+
+def report_phase(report: Optional[BuildReport], name: str):
+    """`report.phase(name)` if a build report is being recorded (no-op otherwise)."""
+    return report.phase(name) if report is not None else nullcontext()
+
+
+def _add_counts(totals: Dict, counts: Dict) -> None:
+    for k, v in counts.items():
+        if isinstance(v, dict):
+            _add_counts(totals.setdefault(k, {}), v)
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            totals[k] = totals.get(k, 0) + v
+
+
+def _order_line_key(order_line: Dict) -> Tuple[str, ...]:
+    return tuple(order_line.get(field, '') for field in ['section', 'CLASS'] + ORDER_FIELDS)
+
+
+def compare_build_reports(old: Dict,
+                          new: Dict,
+                          threshold: float = 0.1,
+                          min_time: float = 0.1,
+                          top: int = 10) -> Tuple[List[str], List[str]]:
+    """Diffs two build reports (as loaded by `BuildReport.load()`).
+
+    Args:
+        old (Dict): report of the reference build.
+        new (Dict): report of the build to compare against the reference.
+        threshold (float): relative wall time increase above which a phase or an order line
+        is reported as a regression. Defaults to 0.1.
+        min_time (float): increases (in seconds) smaller than this are never reported as
+        regressions (timing noise). Defaults to 0.1.
+        top (int): number of order lines with the largest time differences to show.
+        Defaults to 10.
+
+    Returns:
+        Tuple[List[str], List[str]]: lines of the comparison, and descriptions of the regressions.
+    """
+    lines, regressions = [], []
+
+    def _diff(old_time, new_time):
+        return f'{old_time:10.3f} {new_time:10.3f} {_relative_diff(old_time, new_time):>8}'
+
+    def _is_regression(old_time, new_time):
+        return new_time - old_time > max(min_time, threshold * old_time)
+
+    lines.append(f"{'Phase':<40} {'Old (s)':>10} {'New (s)':>10} {'Diff':>8}")
+    for name in list(old['phases']) + [p for p in new['phases'] if p not in old['phases']]:
+        old_time = old['phases'].get(name, {}).get('wall', 0.0)
+        new_time = new['phases'].get(name, {}).get('wall', 0.0)
+        lines.append(f'{name:<40} {_diff(old_time, new_time)}')
+        if _is_regression(old_time, new_time):
+            regressions.append(f'Phase {name}: {old_time:.3f}s -> {new_time:.3f}s')
+
+    lines.append('')
+    lines.append(f"{'Total':<40} {'Old':>14} {'New':>14} {'Diff':>8}")
+    old_totals, new_totals = _flatten(old['totals']), _flatten(new['totals'])
+    for name in list(old_totals) + [t for t in new_totals if t not in old_totals]:
+        old_value, new_value = old_totals.get(name, 0), new_totals.get(name, 0)
+        lines.append(f'{name:<40} {_format_value(old_value):>14} {_format_value(new_value):>14} '
+                     f'{_relative_diff(old_value, new_value):>8}')
+
+    old_order_lines = {_order_line_key(l): l for l in old['order_lines'] if not l.get('cached')}
+    new_order_lines = {_order_line_key(l): l for l in new['order_lines'] if not l.get('cached')}
+    common = [key for key in new_order_lines if key in old_order_lines]
+    added = [key for key in new_order_lines if key not in old_order_lines]
+    removed = [key for key in old_order_lines if key not in new_order_lines]
+    order_line_diffs = []
+    for key in common:
+        old_line, new_line = old_order_lines[key], new_order_lines[key]
+        old_time, new_time = old_line['time']['total'], new_line['time']['total']
+        counts_changed = any(old_line.get(k) != new_line.get(k)
+                             for k in ['combs', 'triples', 'entries'])
+        order_line_diffs.append((new_time - old_time, key, old_time, new_time, counts_changed))
+        if _is_regression(old_time, new_time):
+            regressions.append(f"Order line {' '.join(key)}: {old_time:.3f}s -> {new_time:.3f}s")
+    order_line_diffs.sort(key=lambda x: abs(x[0]), reverse=True)
+
+    lines.append('')
+    lines.append(f'Order lines: {len(common)} common, {len(added)} added, {len(removed)} removed, '
+                 f'{sum(1 for diff in order_line_diffs if diff[4])} with different counts')
+    lines.append(f"{'Order line':<60} {'Old (s)':>10} {'New (s)':>10} {'Diff':>8}")
+    for _, key, old_time, new_time, counts_changed in order_line_diffs[:top]:
+        name = ' '.join(key)
+        name = name if len(name) <= 60 else name[:57] + '...'
+        lines.append(f"{name:<60} {_diff(old_time, new_time)}{' *' if counts_changed else ''}")
+    
+    return lines, regressions
+
+
+def _flatten(d: Dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for k, v in d.items():
+        if isinstance(v, dict):
+            flat.update(_flatten(v, f'{prefix}{k}.'))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            flat[f'{prefix}{k}'] = v
+    return flat
+
+
+def _format_value(value: float) -> str:
+    return f'{value:,}' if isinstance(value, int) else f'{value:.3f}'
+
+
+def _relative_diff(old_value: float, new_value: float) -> str:
+    if old_value == new_value:
+        return '='
+    if old_value == 0:
+        return 'new'
+    return f'{(new_value - old_value) / old_value:+.1%}'
+
+
+def hash_object(obj) -> str:
+    """Content hash of any picklable object (used as a build cache key)."""
+    return hashlib.md5(pickle.dumps(obj, protocol=4)).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """Content hash of a file."""
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def hash_dataframe(df: Optional[pd.DataFrame]) -> str:
+    """Content hash of a dataframe (rows and column names), independent of its index."""
+    if df is None:
+        return hash_object(None)
+    md5 = hashlib.md5(pickle.dumps(list(df.columns), protocol=4))
+    md5.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return md5.hexdigest()
+
+
+def hash_sheet_classes(sheet: Optional[pd.DataFrame]) -> Dict[str, str]:
+    """Content hash of the rows of each morpheme class (CLASS column) of a sheet."""
+    if sheet is None:
+        return {}
+    return {cls: hash_dataframe(rows) for cls, rows in sheet.groupby('CLASS', sort=False)}
+
+
 def _bw2ar_regex(regex, bw2ar):
     """ Converts regex expression from the sheet to Arabic while taking care not to
     convert characters which are special regex characters in the process. This expects
@@ -626,6 +1162,49 @@ def _reverse_compat_table(XY):
     return YX
 
 
+def _equivalent_categories(X_Y_compat, X_Z_compat, equivalences):
+    """Categories of type X are equivalent if they are compatible with the same
+    categories of both other types. They are grouped by hashing these two sets
+    (their signature) instead of comparing all pairs of categories, and each
+    one is mapped to the last category (in the order of the tables) of its
+    group."""
+    X_classes = {}
+    for X_cat in X_Y_compat:
+        signature = (frozenset(X_Y_compat[X_cat]), frozenset(X_Z_compat[X_cat]))
+        X_classes.setdefault(signature, []).append(X_cat)
+
+    X_cat_repr = {}
+    for X_cats in X_classes.values():
+        for X_cat in X_cats[:-1]:
+            X_cat_repr[X_cat] = X_cats[-1]
+    for X_cat in X_Y_compat:
+        if X_cat in X_cat_repr:
+            equivalences[X_cat] = X_cat_repr[X_cat]
+
+
+def _close_equivalences(equivalences):
+    """Maps each category of a table of pairwise equivalences (category to the
+    categories after it which are equivalent to it) to the last category it is
+    equivalent to."""
+    equivalences_ = {}
+    done = set()
+    while done != {True}:
+        done = set()
+        for cat, cats_eq in (equivalences_ if equivalences_ else equivalences).items():
+            cats_eq_ = set()
+            for cat_eq in cats_eq:
+                cats_eq_.update(equivalences.get(cat_eq, {cat_eq}))
+            if cats_eq != cats_eq_:
+                done.add(False)
+            else:
+                done.add(True)
+            equivalences_[cat] = cats_eq_
+
+    assert all(len(v) == 1 for v in equivalences_.values())
+    assert set.union(*equivalences_.values()) & set(equivalences_) == set()
+    return {k: next(iter(v)) for k, v in equivalences_.items()}
+
+
 def factorize_categories(prefix_stem_compat,
                          stem_suffix_compat,
                          prefix_suffix_compat,
@@ -637,26 +1216,14 @@ def factorize_categories(prefix_stem_compat,
            len(stem_prefix_compat) == len(stem_suffix_compat) and \
            len(suffix_stem_compat) == len(suffix_prefix_compat)
 
-    combs = dict(
-        prefix=list(combinations(prefix_stem_compat, 2)),
-        stem=list(combinations(stem_suffix_compat, 2)),
-        suffix=list(combinations(suffix_stem_compat, 2))
-    )
-    
     if not test:
         equivalences = {}
-        for pcat_1, pcat_2 in tqdm(combs['prefix']):
-            if prefix_stem_compat[pcat_1] == prefix_stem_compat[pcat_2]:
-                if prefix_suffix_compat[pcat_1] == prefix_suffix_compat[pcat_2]:
-                    equivalences.setdefault(pcat_1, set()).add(pcat_2)
-        for xcat_1, xcat_2 in tqdm(combs['stem']):
-            if stem_suffix_compat[xcat_1] == stem_suffix_compat[xcat_2]:
-                if stem_prefix_compat[xcat_1] == stem_prefix_compat[xcat_2]:
-                    equivalences.setdefault(xcat_1, set()).add(xcat_2)
-        for scat_1, scat_2 in tqdm(combs['suffix']):
-            if suffix_stem_compat[scat_1] == suffix_stem_compat[scat_2]:
-                if suffix_prefix_compat[scat_1] == suffix_prefix_compat[scat_2]:
-                    equivalences.setdefault(scat_1, set()).add(scat_2)
+        _equivalent_categories(
+            prefix_stem_compat, prefix_suffix_compat, equivalences)
+        _equivalent_categories(
+            stem_suffix_compat, stem_prefix_compat, equivalences)
+        _equivalent_categories(
+            suffix_stem_compat, suffix_prefix_compat, equivalences)
     else:
         with open(test, 'rb') as f:
             equivalences = pickle.load(f)
@@ -666,25 +1233,10 @@ def factorize_categories(prefix_stem_compat,
                'optimally factorized'))
         return {}
 
-    equivalences_ = {}
-    done = set()
-    while done != {True}:
-        done = set()
-        for cat, cats_eq in (equivalences_ if equivalences_ else equivalences).items():
-            cats_eq_ = set()
-            for cat_eq in cats_eq:
-                cats_eq_.update(equivalences.get(cat_eq, {cat_eq}))
-            if cats_eq != cats_eq_:
-                done.add(False)
-            else:
-                done.add(True)
-            equivalences_[cat] = cats_eq_
-
-    assert all(len(v) == 1 for v in equivalences_.values())
-    assert set.union(*equivalences_.values()) & set(equivalences_) == set()
-    equivalences_ = {k: next(iter(v)) for k, v in equivalences_.items()}
+    if test:
+        equivalences = _close_equivalences(equivalences)
 
-    return equivalences_
+    return equivalences
 
 
 def factorize_compatibility_lines(prefix_stem_compat,
@@ -374,7 +374,7 @@ def create_conjugation_tables(config,
         else:
             paradigm = expand_paradigm(paradigms, pos_type_, paradigm_key_)
         
-        outputs = {}
+        slots = []
         for signature in paradigm:
             if type(signature) is tuple:
                 features, signature = signature
@@ -400,33 +400,46 @@ def create_conjugation_tables(config,
                 #     if discard:
                 #         continue
 
-                # Using altered local copy of generator.py in camel_tools
-                analyses, debug_message = generator.generate(lemma_ar, features_, debug=True)
-                prefix_cats = [a[1] for a in analyses]
-                stem_cats = [a[2] for a in analyses]
-                suffix_cats = [a[3] for a in analyses]
-                analyses = [a[0] for a in analyses]
-                debug_info = dict(analyses=analyses,
-                                  pos_type=pos_type_,
-                                  gloss=gloss,
-                                  bw=bw,
-                                  form=form,
-                                  gen=gen,
-                                  num=num,
-                                  enc0=info.get('enc0', ''),
-                                  cond_s=cond_s,
-                                  cond_t=cond_t,
-                                  prefix_cats=prefix_cats,
-                                  stem_cats=stem_cats,
-                                  suffix_cats=suffix_cats,
-                                  lemma=info['lemma'],
-                                  morph_class=info['morph_class'],
-                                  pattern=pattern,
-                                  pos=pos,
-                                  freq=info.get('freq'),
-                                  features=features_,
-                                  debug_message=debug_message)
-                outputs[f"{signature}{f'_{features_[diff]}' if len(features) > 1 else ''}"] = debug_info
+                slots.append(
+                    (f"{signature}{f'_{features_[diff]}' if len(features) > 1 else ''}",
+                     features_))
+
+        # All the slots of the lemma are generated at once if the generator
+        # supports it (only the lrec-coling2024 copy of camel_tools does)
+        if hasattr(generator, 'generate_paradigm'):
+            generations = generator.generate_paradigm(
+                lemma_ar, [features_ for _, features_ in slots], debug=True)
+        else:
+            # Using altered local copy of generator.py in camel_tools
+            generations = [generator.generate(lemma_ar, features_, debug=True)
+                           for _, features_ in slots]
+        outputs = {}
+        for (slot, features_), (analyses, debug_message) in zip(slots, generations):
+            prefix_cats = [a[1] for a in analyses]
+            stem_cats = [a[2] for a in analyses]
+            suffix_cats = [a[3] for a in analyses]
+            analyses = [a[0] for a in analyses]
+            debug_info = dict(analyses=analyses,
+                              pos_type=pos_type_,
+                              gloss=gloss,
+                              bw=bw,
+                              form=form,
+                              gen=gen,
+                              num=num,
+                              enc0=info.get('enc0', ''),
+                              cond_s=cond_s,
+                              cond_t=cond_t,
+                              prefix_cats=prefix_cats,
+                              stem_cats=stem_cats,
+                              suffix_cats=suffix_cats,
+                              lemma=info['lemma'],
+                              morph_class=info['morph_class'],
+                              pattern=pattern,
+                              pos=pos,
+                              freq=info.get('freq'),
+                              features=features_,
+                              debug_message=debug_message)
+            outputs[slot] = debug_info
 
         lemmas_conj.append(outputs)
 
@@ -97,7 +97,9 @@ def get_all_lemmas_from_db(db):
     lemmas_pos = set()
     for match, analyses in db.stem_hash.items():
         for cat, analysis in analyses:
-            preprocess_lex_features(analysis)
+            # DB analyses are read-only records
+            analysis = preprocess_lex_features(analysis.copy(),
+                                               return_analysis=True)
             lemmas_pos.add((analysis['lex'], analysis['pos']))
     return lemmas_pos
 
@@ -78,41 +78,47 @@ def _process_generations(generations, defaults):
     return generations_
 
 
+def _generate_paradigm(generator, lemma_ar, feats_list, system, failed):
+    # All the feature combinations of the lemma are generated at once if the
+    # generator supports it, and one at a time otherwise or to find out which
+    # of them failed
+    if hasattr(generator, 'generate_paradigm'):
+        try:
+            return [g for generations in generator.generate_paradigm(
+                lemma_ar, feats_list) for g in generations]
+        except:
+            pass
+    generations = []
+    for feats in feats_list:
+        try:
+            generations += generator.generate(lemma_ar, feats)
+        except:
+            failed.setdefault(system, []).append((lemma_ar, feats))
+    return generations
+
+
 def _produce_generations(lemma_ar, oblig_feats, clitic_feats, feats_set):
     generations_baseline, generations_system = [], []
     failed = {}
     if oblig_feats:
         #FIXME: currently broken
-        for feats_oblig in tqdm(oblig_feats):
-            for feats_clitic in clitic_feats:
-                feats_all = {**feats_oblig, **feats_clitic}
-                try:
-                    generations_baseline += generator_baseline.generate(
-                        lemma_ar, feats_all)
-                except:
-                    failed.setdefault('baseline', []).append((lemma_ar, feats_all))
-                if feats_all.get('prc0') not in ['mA_neg', 'lA_neg']:
-                    try:
-                        generations_system += generator_system.generate(
-                            lemma_ar, feats_all)
-                    except:
-                        failed.setdefault('system', []).append((lemma_ar, feats_all))
+        feats_all = [{**feats_oblig, **feats_clitic}
+                     for feats_oblig in oblig_feats
+                     for feats_clitic in clitic_feats]
+        generations_baseline = _generate_paradigm(
+            generator_baseline, lemma_ar, feats_all, 'baseline', failed)
+        generations_system = _generate_paradigm(
+            generator_system, lemma_ar,
+            [feats for feats in feats_all
+             if feats.get('prc0') not in ['mA_neg', 'lA_neg']],
+            'system', failed)
     else:
-        for feats_clitic in clitic_feats:
-            if feats_set in ['baseline_only', 'intersection']:
-                try:
-                    generations_ = generator_baseline.generate(
-                        lemma_ar, feats_clitic)
-                    generations_baseline += generations_
-                except:
-                    failed.setdefault('baseline', []).append((lemma_ar, feats_clitic))
-            if feats_set in ['system_only', 'intersection']:
-                try:
-                    generations_ = generator_system.generate(
-                        lemma_ar, feats_clitic)
-                    generations_system += generations_
-                except:
-                    failed.setdefault('system', []).append((lemma_ar, feats_clitic))
+        if feats_set in ['baseline_only', 'intersection']:
+            generations_baseline = _generate_paradigm(
+                generator_baseline, lemma_ar, clitic_feats, 'baseline', failed)
+        if feats_set in ['system_only', 'intersection']:
+            generations_system = _generate_paradigm(
+                generator_system, lemma_ar, clitic_feats, 'system', failed)
     
     return generations_baseline, generations_system, failed
 
@@ -767,6 +767,13 @@ class Config:
     def get_db_path(self):
         db_name = self._config_local['db']
         return os.path.join(self.get_db_dir_path(), db_name)
+    
+    def get_build_cache_path(self):
+        return os.path.join(self.get_db_dir_path(), 'build_cache', f'{self._config_name}.pkl')
+    
+    def get_specs_cache_path(self, variant=''):
+        return os.path.join(
+            self.get_db_dir_path(), 'build_cache', f'{self._config_name}_specs{variant}.pkl')
 
     def get_data_dir_path(self):
         return os.path.join(self.data_dir, self.get_dialect_project_dir_path(), self._config_name)
@@ -30,8 +30,11 @@
 from __future__ import absolute_import
 
 from collections import deque, namedtuple
+from collections.abc import MutableMapping
 import copy
 import itertools
+from multiprocessing import Pool
+import os
 import re
 from threading import RLock
 
@@ -43,12 +46,10 @@ from camel_tools.utils.charsets import AR_CHARSET, AR_DIAC_CHARSET
 from camel_tools.utils.charmap import CharMapper
 from camel_tools.morphology.database import MorphologyDB
 from camel_tools.morphology.errors import AnalyzerError
-from camel_tools.morphology.utils import merge_features
+from camel_tools.morphology.utils import merge_features, merge_feature
 from camel_tools.morphology.utils import simple_ar_to_caphi
 from camel_tools.utils.dediac import dediac_ar
 
-from copy import deepcopy
-
 _ALL_PUNC = u''.join(UNICODE_PUNCT_SYMBOL_CHARSET)
 
 _DIAC_RE = re.compile(u'[' + re.escape(u''.join(AR_DIAC_CHARSET)) + u']')
@@ -93,6 +94,24 @@ _BACKOFF_TYPES = frozenset(['NONE', 'NOAN_ALL', 'NOAN_PROP', 'ADD_ALL',
                             'ADD_PROP', 'SMART', 'NOAN-ONLY_ALL'])
 
 
+class BatchStats(namedtuple('BatchStats', ['tokens', 'types', 'hits',
+                                         'misses'])):
+    """A named tuple containing the number of words processed by
+    :meth:`Analyzer.analyze_batch`.
+
+    Attributes:
+        tokens (:obj:`int`): Number of words.
+
+        types (:obj:`int`): Number of distinct words (up to diacritics) in
+            each batch.
+
+        hits (:obj:`int`): Number of types found in the cache of the
+            analyzer.
+
+        misses (:obj:`int`): Number of types which were analyzed.
+    """
+
+
 class AnalyzedWord(namedtuple('AnalyzedWord', ['word', 'analyses'])):
     """A named tuple containing a word and its analyses.
 
@@ -135,6 +154,175 @@ def _segments_gen(word, max_prefix=1, max_suffix=1):
             yield (prefix, stem, suffix)
 
 
+def _legal_suffixes(db, cats, suffix_analyses):
+    suffix_cats = db.prefix_stem_suffix_compat.get(cats)
+    if suffix_cats is None:
+        return []
+    return [suffix for suffix in suffix_analyses if suffix[0] in suffix_cats]
+
+
+def _trie_match_lengths(trie, chars):
+    lengths = []
+    node = trie
+    if '' in node:
+        lengths.append(0)
+    for i, char in enumerate(chars, 1):
+        node = node.get(char)
+        if node is None:
+            break
+        if '' in node:
+            lengths.append(i)
+    return lengths
+
+
+def _trie_segments_gen(word, prefix_trie, suffix_trie):
+    """Same segmentations as :func:`_segments_gen` (and in the same order),
+    restricted to those whose prefix and suffix are in the database.
+    """
+
+    w = len(word)
+    prefix_lengths = _trie_match_lengths(prefix_trie, word)
+    # Longest suffixes first, i.e. shortest stems first
+    suffix_lengths = _trie_match_lengths(suffix_trie, reversed(word))[::-1]
+    for p in prefix_lengths:
+        if p > w - 1:
+            break
+        prefix = word[:p]
+        for s in suffix_lengths:
+            if s > w - p - 1:
+                continue
+            yield (prefix, word[p:w - s], word[w - s:])
+
+
+# Analyzer used by the worker processes of Analyzer.analyze_batch, installed
+# once per worker by _init_batch_worker
+_batch_analyzer = None
+
+
+def _init_batch_worker(analyzer):
+    global _batch_analyzer
+    _batch_analyzer = analyzer
+
+
+def _analyze_batch_word(word):
+    return _batch_analyzer._analyze(word)
+
+
+class LazyAnalysis(MutableMapping):
+    """Analysis returned by :obj:`Analyzer` in lazy mode. Features are only
+    merged from the prefix, stem and suffix analyses when first accessed
+    (and are then memoized), but the analysis otherwise behaves like the
+    dictionary :obj:`Analyzer` returns in regular mode: iterating over it,
+    deleting a feature, copying or pickling it computes all its features.
+
+    Args:
+        analyzer (:obj:`Analyzer`): Analyzer which produced the analysis.
+        prefix_feats (:obj:`dict`): Prefix analysis.
+        stem_feats (:obj:`dict`): Stem analysis.
+        suffix_feats (:obj:`dict`): Suffix analysis.
+        stem_cat (:obj:`str`): Category of the stem.
+        word_dediac (:obj:`str`): Dediacritized analyzed word.
+    """
+
+    __slots__ = ('_analyzer', '_prefix_feats', '_stem_feats', '_suffix_feats',
+                 '_stem_cat', '_word_dediac', '_merged', '_feats',
+                 '_complete')
+
+    def __init__(self, analyzer, prefix_feats, stem_feats, suffix_feats,
+                 stem_cat, word_dediac):
+        self._analyzer = analyzer
+        self._prefix_feats = prefix_feats
+        self._stem_feats = stem_feats
+        self._suffix_feats = suffix_feats
+        self._stem_cat = stem_cat
+        self._word_dediac = word_dediac
+        # Memoized merged features, and features set by the caller (which
+        # hold all the features once the analysis is complete)
+        self._merged = {}
+        self._feats = {}
+        self._complete = False
+
+    def _merge_feature(self, feat):
+        if feat in self._merged:
+            return self._merged[feat]
+
+        if feat == 'stem':
+            value = self._stem_feats['diac']
+        elif feat == 'stemcat':
+            value = self._stem_cat
+        elif (feat == 'source' and
+                self._word_dediac.replace(u'\u0640', '') !=
+                dediac_ar(self._merge_feature('diac'))):
+            value = 'spvar'
+        else:
+            value = merge_feature(self._analyzer._db, self._prefix_feats,
+                                  self._stem_feats, self._suffix_feats, feat,
+                                  variant=self._analyzer._variant)
+
+        self._merged[feat] = value
+        return value
+
+    def _complete_feats(self):
+        if self._complete:
+            return
+
+        feats = self._analyzer._merge_analysis(self._word_dediac,
+                                               self._prefix_feats,
+                                               self._stem_feats,
+                                               self._suffix_feats,
+                                               self._stem_cat)
+        feats.update(self._feats)
+        self._feats = feats
+        self._merged = None
+        self._complete = True
+
+    def __getitem__(self, feat):
+        if feat in self._feats or self._complete:
+            return self._feats[feat]
+        feats = self._analyzer._feats
+        if feats is not None and feat not in feats:
+            raise KeyError(feat)
+        return self._merge_feature(feat)
+
+    def __contains__(self, feat):
+        try:
+            self[feat]
+        except KeyError:
+            return False
+        return True
+
+    def __setitem__(self, feat, value):
+        self._feats[feat] = value
+
+    def __delitem__(self, feat):
+        self._complete_feats()
+        del self._feats[feat]
+
+    def __iter__(self):
+        self._complete_feats()
+        return iter(self._feats)
+
+    def __len__(self):
+        self._complete_feats()
+        return len(self._feats)
+
+    def copy(self):
+        """Compute all the features of the analysis.
+
+        Returns:
+            :obj:`dict`: The complete analysis.
+        """
+
+        self._complete_feats()
+        return dict(self._feats)
+
+    def __reduce__(self):
+        return (dict, (self.copy(),))
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
 class Analyzer:
     """Morphological analyzer component.
 
@@ -155,6 +343,17 @@ class Analyzer:
         cache_size (:obj:`int`, optional): If greater than zero, then the
             analyzer will cache the analyses for the **cache_Size** most
             frequent words, otherwise no analyses will be cached.
+        lazy (:obj:`bool`, optional): If set to `True`, then the analyses
+            of words found in the database are returned as
+            :obj:`LazyAnalysis` objects whose features are only computed
+            when accessed. Defaults to `False`.
+            Analyses computed by worker processes in
+            :meth:`analyze_batch` are regular dictionaries.
+        feats (:obj:`list` of :obj:`str`, optional): If set, analyses only
+            contain these features (in this order, if available), and the
+            others are not computed. Opening **db** with the same features
+            (see :obj:`~camel_tools.morphology.database.MorphologyDB`) also
+            drops the others from the database. Defaults to None.
 
     Raises:
         :obj:`~camel_tools.morphology.errors.AnalyzerError`: If database is
@@ -168,7 +367,9 @@ class Analyzer:
                  norm_map=None,
                  strict_digit=False,
                  cache_size=0,
-                 variant='msa'):
+                 variant='msa',
+                 lazy=False,
+                 feats=None):
         if not isinstance(db, MorphologyDB):
             raise AnalyzerError('DB is not an instance of MorphologyDB')
         if not db.flags.analysis:
@@ -178,6 +379,11 @@ class Analyzer:
         self._backoff = backoff
         self._strict_digit = strict_digit
         self._variant = variant
+        self._lazy = lazy
+        self._feats = None if feats is None else tuple(dict.fromkeys(feats))
+        self._cache = None
+        self._cache_lock = None
+        self._batch_stats = BatchStats(0, 0, 0, 0)
 
         if norm_map is None:
             self._norm_map = DEFAULT_NORMALIZE_MAP
@@ -201,13 +407,52 @@ class Analyzer:
 
         if isinstance(cache_size, int):
             if cache_size > 0:
-                cache = LFUCache(cache_size)
-                self.analyze = cached(cache, lock=RLock())(self.analyze)
+                # Words are cached by the key which determines their
+                # analyses (see _cache_key), shared with analyze_batch
+                self._cache = LFUCache(cache_size)
+                self._cache_lock = RLock()
+                self.analyze = cached(self._cache, key=self._cache_key,
+                                      lock=self._cache_lock)(self.analyze)
 
         else:
             raise AnalyzerError('Invalid cache size {}'.format(
                                 repr(cache_size)))
 
+    def __getstate__(self):
+        # The cache is not sent to worker processes
+        state = self.__dict__.copy()
+        state.pop('analyze', None)
+        state['_cache'] = None
+        state['_cache_lock'] = None
+        return state
+
+    def _is_literal(self, word):
+        # Words whose analyses are built from the word itself (numbers,
+        # punctuation, and foreign words) rather than from the database
+        if self._strict_digit and _is_strict_digit(word):
+            return True
+        if not self._strict_digit and _is_digit(word):
+            return True
+        # Arabic words have no punctuation, which is checked last since it is
+        # matched against a large character set.
+        if _is_ar(word):
+            return False
+        return _is_punc(word) or not _has_punc(word)
+
+    def _cache_key(self, word):
+        # Words with the same key have the same analyses: those looked up in
+        # the database only depend on the dediacritized word.
+        word = word.strip()
+        if self._is_literal(word):
+            return (word, True)
+        return (dediac_ar(word), False)
+
+    def _project(self, analysis):
+        if self._feats is None:
+            return analysis
+        return {feat: analysis[feat] for feat in self._feats
+                if feat in analysis}
+
     def _normalize(self, word):
         if self._norm_map is None:
             return word
@@ -219,6 +464,9 @@ class Analyzer:
                            stem_analyses,
                            suffix_analyses):
         combined = deque()
+        # Suffix analyses which are compatible with a (prefix, stem)
+        # category pair, filtered once per pair
+        legal_suffixes = {}
 
         for p in itertools.product(prefix_analyses, stem_analyses):
             prefix_cat = p[0][0]
@@ -226,28 +474,55 @@ class Analyzer:
             stem_cat = p[1][0]
             stem_feats = p[1][1]
 
-            if stem_cat in self._db.prefix_stem_compat[prefix_cat]:
-                for suffix_cat, suffix_feats in suffix_analyses:
-                    if ((stem_cat not in self._db.stem_suffix_compat) or
-                        (prefix_cat not in self._db.prefix_suffix_compat) or
-                        (suffix_cat not in
-                         self._db.stem_suffix_compat[stem_cat]) or
-                        (suffix_cat not in
-                         self._db.prefix_suffix_compat[prefix_cat])):
-                        continue
-
-                    merged = merge_features(self._db, prefix_feats, stem_feats,
-                                            suffix_feats, variant=self._variant)
-                    merged['stem'] = stem_feats['diac']
-                    merged['stemcat'] = stem_cat
+            cats = (prefix_cat, stem_cat)
+            suffixes = legal_suffixes.get(cats)
+            if suffixes is None:
+                suffixes = _legal_suffixes(self._db, cats, suffix_analyses)
+                legal_suffixes[cats] = suffixes
+
+            for suffix_cat, suffix_feats in suffixes:
+                if self._lazy:
+                    combined.append(LazyAnalysis(self, prefix_feats,
+                                                 stem_feats, suffix_feats,
+                                                 stem_cat, word_dediac))
+                else:
+                    combined.append(self._merge_analysis(word_dediac,
+                                                         prefix_feats,
+                                                         stem_feats,
+                                                         suffix_feats,
+                                                         stem_cat))
 
-                    merged_dediac = dediac_ar(merged['diac'])
-                    if word_dediac.replace(u'\u0640', '') != merged_dediac:
-                        merged['source'] = 'spvar'
+        return combined
 
-                    combined.append(merged)
+    def _merge_analysis(self,
+                        word_dediac,
+                        prefix_feats,
+                        stem_feats,
+                        suffix_feats,
+                        stem_cat):
+        feats = self._feats
+        merged = merge_features(self._db, prefix_feats, stem_feats,
+                                suffix_feats, variant=self._variant,
+                                feats=feats)
+        if feats is None or 'stem' in feats:
+            merged['stem'] = stem_feats['diac']
+        if feats is None or 'stemcat' in feats:
+            merged['stemcat'] = stem_cat
+
+        if feats is None or 'source' in feats:
+            if 'diac' in merged:
+                merged_diac = merged['diac']
+            else:
+                merged_diac = merge_feature(self._db, prefix_feats,
+                                            stem_feats, suffix_feats, 'diac',
+                                            variant=self._variant)
+            merged_dediac = dediac_ar(merged_diac)
+            if word_dediac.replace(u'\u0640', '') != merged_dediac:
+                merged['source'] = 'spvar'
 
-        return combined
+        # The features added after merging are moved back to their place in
+        # the projection
+        return self._project(merged)
 
     def _combined_backoff_analyses(self,
                                    stem,
@@ -256,41 +531,43 @@ class Analyzer:
                                    stem_analyses,
                                    suffix_analyses):
         combined = deque()
+        legal_suffixes = {}
 
         for p in itertools.product(prefix_analyses, stem_analyses):
             prefix_cat = p[0][0]
             prefix_feats = p[0][1]
             stem_cat = p[1][0]
-            stem_feats = copy.copy(p[1][1])
-
-            if stem_cat in self._db.prefix_stem_compat[prefix_cat]:
-                for suffix_cat, suffix_feats in suffix_analyses:
-                    if ((suffix_cat not in
-                         self._db.stem_suffix_compat[stem_cat]) or
-                        (prefix_cat not in self._db.prefix_suffix_compat or
-                         suffix_cat not in
-                         self._db.prefix_suffix_compat[prefix_cat])):
-                        continue
 
-                    if (self._backoff_action == 'PROP' and
-                            'NOUN_PROP' not in stem_feats['bw']):
-                        continue
+            cats = (prefix_cat, stem_cat)
+            suffixes = legal_suffixes.get(cats)
+            if suffixes is None:
+                suffixes = _legal_suffixes(self._db, cats, suffix_analyses)
+                legal_suffixes[cats] = suffixes
+            if not suffixes:
+                continue
+
+            stem_feats = p[1][1].copy()
+            for suffix_cat, suffix_feats in suffixes:
+                if (self._backoff_action == 'PROP' and
+                        'NOUN_PROP' not in stem_feats['bw']):
+                    continue
 
-                    stem_feats['bw'] = _NOAN_RE.sub(stem, stem_feats['bw'])
-                    stem_feats['diac'] = _NOAN_RE.sub(stem, stem_feats['diac'])
-                    stem_feats['lex'] = _NOAN_RE.sub(stem, stem_feats['lex'])
-                    stem_feats['caphi'] = simple_ar_to_caphi(stem)
+                stem_feats['bw'] = _NOAN_RE.sub(stem, stem_feats['bw'])
+                stem_feats['diac'] = _NOAN_RE.sub(stem, stem_feats['diac'])
+                stem_feats['lex'] = _NOAN_RE.sub(stem, stem_feats['lex'])
+                stem_feats['caphi'] = simple_ar_to_caphi(stem)
 
-                    merged = merge_features(self._db, prefix_feats, stem_feats,
-                                            suffix_feats, variant=self._variant)
+                merged = merge_features(self._db, prefix_feats, stem_feats,
+                                        suffix_feats, variant=self._variant,
+                                        feats=self._feats)
 
-                    merged['stem'] = stem_feats['diac']
-                    merged['stemcat'] = stem_cat
-                    merged['source'] = 'backoff'
-                    merged['pattern'] = 'backoff'
-                    merged['gloss'] = stem_feats['gloss']
+                merged['stem'] = stem_feats['diac']
+                merged['stemcat'] = stem_cat
+                merged['source'] = 'backoff'
+                merged['pattern'] = 'backoff'
+                merged['gloss'] = stem_feats['gloss']
 
-                    combined.append(merged)
+                combined.append(self._project(merged))
 
         return combined
 
@@ -307,6 +584,9 @@ class Analyzer:
             information on features and their values.
         """
 
+        return self._analyze(word)
+
+    def _analyze(self, word):
         word = word.strip()
 
         if word == '':
@@ -350,7 +630,7 @@ class Analyzer:
             if 'form_num' in self._db.defines and result['num'] == '-':
                 result['num'] = result['form_num']
 
-            return [result]
+            return [self._project(result)]
 
         elif _is_punc(word):
             result = copy.copy(self._db.defaults['punc'])
@@ -385,7 +665,7 @@ class Analyzer:
             if 'form_num' in self._db.defines and result['num'] == '-':
                 result['num'] = result['form_num']
 
-            return [result]
+            return [self._project(result)]
 
         elif _has_punc(word):
             pass
@@ -427,12 +707,13 @@ class Analyzer:
             if 'form_num' in self._db.defines and result['num'] == '-':
                 result['num'] = result['form_num']
 
-            return [result]
+            return [self._project(result)]
 
         else:
             if self._backoff_condition not in ['SMART', 'NOAN-ONLY']:
-                segments_gen = _segments_gen(word_normal, self._db.max_prefix_size,
-                                            self._db.max_suffix_size)
+                segments_gen = _trie_segments_gen(word_normal,
+                                                  self._db.prefix_trie,
+                                                  self._db.suffix_trie)
 
                 for segmentation in segments_gen:
                     prefix = segmentation[0]
@@ -457,9 +738,9 @@ class Analyzer:
         if ((self._backoff_condition == 'NOAN' and len(analyses) == 0) or
                 (self._backoff_condition in ['ADD', 'NOAN-ONLY'])):
 
-            segments_gen = _segments_gen(word_normal,
-                                         self._db.max_prefix_size,
-                                         self._db.max_suffix_size)
+            segments_gen = _trie_segments_gen(word_normal,
+                                              self._db.prefix_trie,
+                                              self._db.suffix_trie)
 
             backoff_cats = self._db.stem_backoffs[self._backoff_action]
 
@@ -493,40 +774,26 @@ class Analyzer:
                 analyses.extend(combined)
 
         elif self._backoff_condition == 'SMART' and len(analyses) == 0:
-            segments_gen = _segments_gen(word_normal, self._db.max_prefix_size,
-                                         self._db.max_suffix_size)
+            segments_gen = _trie_segments_gen(word_normal,
+                                              self._db.prefix_trie,
+                                              self._db.suffix_trie)
             for segmentation in segments_gen:
                 prefix = segmentation[0]
                 stem = segmentation[1]
                 suffix = segmentation[2]
 
-                smartbackoff_hash = self._db.smartbackoff_hash.get(len(stem))
-                if not smartbackoff_hash:
+                backoff_patterns = self._db.smartbackoff_index.get(len(stem))
+                if not backoff_patterns:
                     continue
-                for match_re, abstract_analyses in smartbackoff_hash.items():
-                    match = re.match(match_re, stem)
-                    if match is None:
-                        continue
 
-                    prefix_analyses = self._db.prefix_hash.get(prefix, None)
-                    suffix_analyses = self._db.suffix_hash.get(suffix, None)
+                prefix_analyses = self._db.prefix_hash.get(prefix, None)
+                suffix_analyses = self._db.suffix_hash.get(suffix, None)
 
-                    if prefix_analyses is None or suffix_analyses is None:
-                        continue
+                if prefix_analyses is None or suffix_analyses is None:
+                    continue
 
-                    concrete_analyses = []
-                    for entry in abstract_analyses:
-                        entry_ = deepcopy(entry)
-                        entry_[1]['diac'] = re.sub(
-                            match_re, entry_[1]['diac'], stem)
-                        entry_[1]['bw'] = re.sub(
-                            match_re, entry_[1]['bw'], stem)
-                        entry_[1]['lex'] = re.sub(
-                            match_re, entry_[1]['lex'], stem)
-                        entry_[1]['root'] = re.sub(
-                            match_re, entry_[1]['root'], stem)
-                        concrete_analyses.append(entry_)
-                    stem_analyses = concrete_analyses
+                for backoff_pattern in backoff_patterns.candidates(stem):
+                    stem_analyses = backoff_pattern.concrete_analyses(stem)
 
                     if stem_analyses is not None:
                         combined = self._combined_analyses(word_dediac,
@@ -552,6 +819,101 @@ class Analyzer:
 
         return list(map(lambda w: AnalyzedWord(w, self.analyze(w)), words))
 
+    def analyze_batch(self, words, processes=1, chunksize=None):
+        '''Analyze a batch of words (e.g. the tokens of a corpus). Each
+        distinct word (up to diacritics) is only analyzed once, or looked up
+        in the cache of the analyzer if it has one, and the analyses of the
+        words not found in the cache are added to it.
+
+        Args:
+            words (iterable of :py:obj:`str`): Words to analyze.
+            processes (:obj:`int`, optional): Number of worker processes
+                analyzing the words not found in the cache. If set to 1,
+                they are analyzed in this process, and if set to None, one
+                worker per CPU (see :func:`os.cpu_count`) is used. The
+                analyzer is sent once to each worker with its database, so
+                the database should be opened with `shared=True` (see
+                :obj:`~camel_tools.morphology.database.MorphologyDB`) when
+                workers are spawned rather than forked. Defaults to 1.
+            chunksize (:obj:`int`, optional): Number of words sent to a
+                worker at a time. Defaults to an even split of the words
+                over four chunks per worker.
+
+        Returns:
+            :obj:`list` of :obj:`list` of :obj:`dict`: The list of analyses
+            of each word in **words**. Words which only differ in their
+            diacritics share the same list of analyses, which should be
+            copied before being modified.
+        '''
+
+        token_keys = []
+        types = {}
+        word_keys = {}
+        for word in words:
+            key = word_keys.get(word)
+            if key is None:
+                key = self._cache_key(word)
+                word_keys[word] = key
+            token_keys.append(key)
+            if key not in types:
+                types[key] = word
+
+        results = {}
+        misses = []
+        for key, word in types.items():
+            if self._cache is not None:
+                with self._cache_lock:
+                    analyses = self._cache.get(key)
+                if analyses is not None:
+                    results[key] = analyses
+                    continue
+            misses.append(key)
+
+        miss_words = [types[key] for key in misses]
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes == 1 or len(miss_words) == 0:
+            analyzed = map(self._analyze, miss_words)
+        else:
+            if chunksize is None:
+                chunksize = max(1, len(miss_words) // (4 * processes))
+            with Pool(processes, initializer=_init_batch_worker,
+                      initargs=(self,)) as pool:
+                analyzed = pool.map(_analyze_batch_word, miss_words,
+                                    chunksize)
+
+        for key, analyses in zip(misses, analyzed):
+            results[key] = analyses
+            if self._cache is not None:
+                with self._cache_lock:
+                    self._cache[key] = analyses
+
+        stats = self._batch_stats
+        self._batch_stats = BatchStats(stats.tokens + len(token_keys),
+                                       stats.types + len(types),
+                                       stats.hits + len(types) - len(misses),
+                                       stats.misses + len(misses))
+
+        return [results[key] for key in token_keys]
+
+    def batch_stats(self):
+        '''Return the number of words processed by :meth:`analyze_batch`
+        since the analyzer was created or :meth:`reset_batch_stats` was
+        last called.
+
+        Returns:
+            :obj:`BatchStats`: The number of tokens, types, cache hits, and
+            cache misses.
+        '''
+
+        return self._batch_stats
+
+    def reset_batch_stats(self):
+        '''Reset the numbers returned by :meth:`batch_stats`.
+        '''
+
+        self._batch_stats = BatchStats(0, 0, 0, 0)
+
     def all_feats(self):
         """Return a set of all features provided by the database used in this
         analyzer instance.
@@ -27,12 +27,31 @@
 
 from __future__ import absolute_import
 
-from collections import namedtuple
+from ast import literal_eval
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from collections.abc import Mapping
+from functools import lru_cache
+from operator import getitem
 from pathlib import Path
+import hashlib
+import io
+import mmap
+import os
+import pickle
 import re
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:
+    import sre_constants, sre_parse
+import struct
+import sys
+import tempfile
 
 from camel_tools.utils.stringutils import force_unicode
-from camel_tools.morphology.utils import strip_lex
+from camel_tools.morphology.utils import strip_lex, merge_dependencies
+from camel_tools.morphology.utils import PostRegex, required_chars
 from camel_tools.morphology.errors import InvalidDatabaseFlagError
 from camel_tools.morphology.errors import DatabaseParseError
 try:
@@ -44,6 +63,681 @@ except:
 MorphologyDBFlags = namedtuple('MorphologyDBFlags', ['analysis', 'generation',
                                                      'reinflection'])
 
+# Compiled (see MorphologyDB.compile) and shared (see the `shared` argument of
+# MorphologyDB) database files have the same layout
+_SHARED_DB_MAGIC = b'CAMELSHM'
+_SHARED_DB_VERSION = 10
+_SHARED_DB_FOOTER = struct.Struct('<Q')
+_SHARED_DB_KEY_SIZE = struct.Struct('<I')
+_SHARED_DB_CACHE_SIZE = 4096
+# Indexes which are stored in the memory-mapped file instead of the memory of
+# each process.
+_SHARED_DB_MAPPINGS = ('prefix_hash', 'suffix_hash', 'stem_hash',
+                       'smartbackoff_hash', 'prefix_cat_hash',
+                       'suffix_cat_hash', 'lemma_hash', 'prefix_stem_compat',
+                       'stem_suffix_compat', 'prefix_suffix_compat',
+                       'stem_prefix_compat', 'prefix_stem_suffix_compat',
+                       'prefix_cat_clitics', 'suffix_cat_clitics',
+                       'stem_affix_cats')
+_SHARED_DB_FILES = {}
+
+# Marks the end of a string in a trie node
+_TRIE_END = ''
+
+# Features kept by databases restricted to a subset of features, which are
+# used by the analyzer and generator themselves
+_REQUIRED_FEATS = frozenset(['diac', 'lex', 'pos'])
+_GENERATION_FEATS = frozenset(['vox', 'rat', 'prc0', 'prc1', 'prc1.5', 'prc2',
+                               'prc3', 'enc0', 'enc1', 'enc2'])
+
+# Clitic features of prefix and suffix analyses, whose values are indexed for
+# generation
+PROCLITIC_FEATS = ('prc0', 'prc1', 'prc1.5', 'prc2', 'prc3')
+ENCLITIC_FEATS = ('enc0', 'enc1', 'enc2')
+
+# Features of smart backoff analyses which are replacement templates of their
+# stem pattern
+_SMART_BACKOFF_FEATS = ('diac', 'bw', 'lex', 'root')
+# Group references (by number or name) in replacement templates
+_TEMPLATE_GROUP_RE = re.compile(r'\\(?:([1-9][0-9]?)|g<(\w+)>)')
+_OCTAL_DIGITS = frozenset('01234567')
+
+
+class AnalysisSchema:
+    """Feature order and interned feature values shared by all the
+    :obj:`AnalysisRecord` objects of a database. Every value of a feature
+    is stored once in the value table of that feature, and records only
+    store the indexes of their values in these tables.
+    Args:
+        feats (:obj:`list` of :obj:`str`, optional): Initial feature order
+            (usually the ORDER line of the database). Features which are not
+            in it are appended when first encountered. Defaults to None.
+    """
+
+    def __init__(self, feats=None):
+        self.feats = []
+        self.slots = {}
+        self.tables = []
+        self._value2index = []
+        self._shapes = {}
+
+        for feat in feats or []:
+            self._add_feat(feat)
+
+    def _add_feat(self, feat):
+        self.slots[feat] = len(self.feats)
+        self.feats.append(feat)
+        self.tables.append([])
+        if self._value2index is None:
+            self._build_value2index()
+        else:
+            self._value2index.append({})
+
+        return self.slots[feat]
+
+    def _build_value2index(self):
+        self._value2index = [{value: index
+                              for index, value in enumerate(table)}
+                             for table in self.tables]
+
+    def _index(self, feat, value):
+        slot = self.slots.get(feat)
+        if slot is None:
+            slot = self._add_feat(feat)
+
+        if self._value2index is None:
+            self._build_value2index()
+        value2index = self._value2index[slot]
+        index = value2index.get(value)
+        if index is None:
+            index = len(self.tables[slot])
+            value2index[value] = index
+            self.tables[slot].append(value)
+
+        return slot, index
+
+    def shape(self, slots):
+        """Get the shape of the records having a given set of features.
+        Args:
+            slots (:obj:`tuple` of :obj:`int`): Slots of the features, in
+                the order of the features of the records.
+        Returns:
+            :obj:`AnalysisShape`: The (shared) shape.
+        """
+
+        shape = self._shapes.get(slots)
+        if shape is None:
+            shape = AnalysisShape(self, slots)
+            self._shapes[slots] = shape
+        return shape
+
+    def record(self, analysis):
+        """Create a record from an analysis dictionary. The record keeps the
+        order of the features of the analysis.
+        Args:
+            analysis (:obj:`dict`): Analysis to encode.
+        Returns:
+            :obj:`AnalysisRecord`: Encoded analysis.
+        """
+
+        indexes = [self._index(feat, value)
+                   for feat, value in analysis.items()]
+        shape = self.shape(tuple(slot for slot, _ in indexes))
+
+        return AnalysisRecord(shape,
+                              array('I', [index for _, index in indexes]))
+
+    def compact(self):
+        """Release the memory used to intern new values. It is allocated
+        again if new records are created afterwards.
+        """
+
+        self._value2index = None
+
+    def intern(self, analysis):
+        """Replace the values of an analysis dictionary by their interned
+        version (used for the analyses of affixes which are few, and are kept
+        as dictionaries since they are accessed in the innermost loops).
+        Args:
+            analysis (:obj:`dict`): Analysis to intern.
+        Returns:
+            :obj:`dict`: A copy of the analysis with interned features and
+            values.
+        """
+
+        interned = {}
+        for feat, value in analysis.items():
+            slot, index = self._index(feat, value)
+            interned[self.feats[slot]] = self.tables[slot][index]
+
+        return interned
+
+    def __getstate__(self):
+        return (self.feats, self.tables)
+
+    def __setstate__(self, state):
+        self.feats, self.tables = state
+        self.slots = {feat: slot for slot, feat in enumerate(self.feats)}
+        self._value2index = None
+        self._shapes = {}
+
+
+class AnalysisShape:
+    """Features (and their value tables) shared by the
+    :obj:`AnalysisRecord` objects which have exactly these features, in the
+    same order.
+    Args:
+        schema (:obj:`AnalysisSchema`): Schema of the features.
+        slots (:obj:`tuple` of :obj:`int`): Slots of the features, in order.
+    """
+
+    __slots__ = ('schema', 'slots', 'feats', 'tables', 'positions')
+
+    def __init__(self, schema, slots):
+        self.schema = schema
+        self.slots = slots
+        self.feats = tuple(schema.feats[slot] for slot in slots)
+        self.tables = tuple(schema.tables[slot] for slot in slots)
+        self.positions = {feat: i for i, feat in enumerate(self.feats)}
+
+    def __reduce__(self):
+        return (self.schema.shape, (self.slots,))
+
+
+class AnalysisRecord(Mapping):
+    """Compact read-only stem analysis as stored in :obj:`MorphologyDB`
+    indexes. It behaves like a read-only dictionary of features, and
+    :meth:`copy` returns a regular (mutable) :obj:`dict`.
+    Args:
+        shape (:obj:`AnalysisShape`): Features of the record.
+        values (:obj:`array.array`): Value indexes of the features of the
+            record, in the order of its shape.
+    """
+
+    __slots__ = ('_shape', '_values')
+
+    def __init__(self, shape, values):
+        self._shape = shape
+        self._values = values
+
+    def __reduce__(self):
+        return (AnalysisRecord, (self._shape, self._values))
+
+    def __getitem__(self, feat):
+        i = self._shape.positions[feat]
+        return self._shape.tables[i][self._values[i]]
+
+    def get(self, feat, default=None):
+        i = self._shape.positions.get(feat)
+        if i is None:
+            return default
+        return self._shape.tables[i][self._values[i]]
+
+    def __contains__(self, feat):
+        return feat in self._shape.positions
+
+    def __iter__(self):
+        return iter(self._shape.feats)
+
+    def __len__(self):
+        return len(self._shape.feats)
+
+    def copy(self):
+        """Materialize the record.
+        Returns:
+            :obj:`dict`: Features of the record.
+        """
+
+        return dict(zip(self._shape.feats,
+                        map(getitem, self._shape.tables, self._values)))
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
+def _compile_template(regex, template):
+    # Splits a replacement template into literal strings and group numbers.
+    # Templates with other escapes (and invalid ones) are left to re.sub.
+    parts = []
+    pos = 0
+    for m in _TEMPLATE_GROUP_RE.finditer(template):
+        literal = template[pos:m.start()]
+        if '\\' in literal:
+            return None
+        if literal:
+            parts.append(literal)
+
+        number, name = m.groups()
+        if number is not None:
+            # Three octal digits make an octal escape
+            if (len(number) == 2 and m.end() < len(template) and
+                    _OCTAL_DIGITS.issuperset(number + template[m.end()])):
+                return None
+            group = int(number)
+        elif name.isdigit():
+            group = int(name)
+        else:
+            group = regex.groupindex.get(name)
+        if group is None or group == 0 or group > regex.groups:
+            return None
+        parts.append(group)
+        pos = m.end()
+
+    literal = template[pos:]
+    if '\\' in literal:
+        return None
+    if literal:
+        parts.append(literal)
+    return tuple(parts)
+
+
+def _expand_template(parts, match):
+    return ''.join([part if isinstance(part, str) else (match.group(part) or '')
+                    for part in parts])
+
+
+class SmartBackoffPattern:
+    """Stem pattern of the smart backoff section of a database with the
+    abstract analyses of the stems it matches.
+    Args:
+        match_re (:obj:`str`): Regular expression matching stems.
+        analyses (:obj:`list` of :obj:`tuple`): Category and abstract
+            analysis pairs, in which the 'diac', 'bw', 'lex', and 'root'
+            features are replacement templates of **match_re**.
+    """
+
+    __slots__ = ('match_re', 'regex', 'analyses', 'required', '_anchored',
+                 '_templates')
+
+    def __init__(self, match_re, analyses):
+        self.match_re = match_re
+        self.regex = re.compile(match_re)
+        self.analyses = analyses
+        self.required = tuple(sorted(required_chars(self.regex)))
+
+        parsed = sre_parse.parse(match_re)
+        self._anchored = (len(parsed) > 0 and
+                          parsed[0] == (sre_constants.AT,
+                                        sre_constants.AT_BEGINNING))
+        self._templates = [
+            {feat: _compile_template(self.regex, analysis[feat])
+             for feat in _SMART_BACKOFF_FEATS if feat in analysis}
+            for _, analysis in analyses]
+
+    def concrete_analyses(self, stem):
+        """Return the analyses of a stem if it matches the pattern.
+        Args:
+            stem (:obj:`str`): Stem to match.
+        Returns:
+            :obj:`list` of :obj:`tuple`: Category and analysis pairs of
+            **stem**, or None if **stem** doesn't match the pattern.
+        """
+
+        if not all(map(stem.__contains__, self.required)):
+            return None
+        match = self.regex.match(stem)
+        if match is None:
+            return None
+
+        # An anchored match of the whole stem is its only match, so the
+        # templates can be expanded directly.
+        expand = self._anchored and match.end() == len(stem)
+
+        concrete = []
+        for (category, analysis), templates in zip(self.analyses,
+                                                   self._templates):
+            analysis = dict(analysis)
+            for feat in _SMART_BACKOFF_FEATS:
+                template = templates.get(feat)
+                if expand and template is not None:
+                    analysis[feat] = _expand_template(template, match)
+                else:
+                    analysis[feat] = self.regex.sub(analysis[feat], stem)
+            concrete.append((category, analysis))
+
+        return concrete
+
+
+class SmartBackoffBucket:
+    """Smart backoff stem patterns matching stems of the same length, indexed
+    by a character every match of each pattern contains.
+    Args:
+        patterns (:obj:`list` of :obj:`SmartBackoffPattern`): Patterns in
+            database order.
+    """
+
+    __slots__ = ('patterns', '_index', '_unindexed')
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+
+        # Patterns are indexed by their least common required character
+        counts = Counter(char for pattern in patterns
+                         for char in pattern.required)
+        index = {}
+        unindexed = []
+        for i, pattern in enumerate(patterns):
+            if pattern.required:
+                char = min(pattern.required,
+                           key=lambda char: (counts[char], char))
+                index.setdefault(char, []).append(i)
+            else:
+                unindexed.append(i)
+        self._index = {char: tuple(indexes)
+                       for char, indexes in index.items()}
+        self._unindexed = tuple(unindexed)
+
+    def candidates(self, stem):
+        """Return the patterns which may match a stem.
+        Args:
+            stem (:obj:`str`): Stem to match.
+        Returns:
+            :obj:`list` of :obj:`SmartBackoffPattern`: Patterns which may
+            match **stem**, in database order.
+        """
+
+        indexes = list(self._unindexed)
+        for char in set(stem):
+            indexes.extend(self._index.get(char, ()))
+        indexes.sort()
+        return [self.patterns[i] for i in indexes]
+
+
+def _clitic_signatures(cat_hash, clitic_feats):
+    # Runs of consecutive analyses of a category with the same clitic values,
+    # as (values, start, stop), so that they can be filtered without changing
+    # the order of the analyses
+    signatures = {}
+    cat_signatures = {}
+    for cat, analyses in cat_hash.items():
+        runs = []
+        for i, analysis in enumerate(analyses):
+            signature = tuple(analysis.get(feat) for feat in clitic_feats)
+            signature = signatures.setdefault(signature, signature)
+            if runs and runs[-1][0] is signature:
+                runs[-1][2] = i + 1
+            else:
+                runs.append([signature, i, i + 1])
+        cat_signatures[cat] = tuple(tuple(run) for run in runs)
+    return cat_signatures
+
+
+def _build_trie(strings):
+    trie = {}
+    for string in strings:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, {})
+        node[_TRIE_END] = True
+    return trie
+
+
+def _hash_file(fpath):
+    md5 = hashlib.md5()
+    with open(fpath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _source_info(fpath):
+    stat = os.stat(fpath)
+    return {'source_size': stat.st_size,
+            'source_mtime': stat.st_mtime_ns,
+            'source_hash': _hash_file(fpath)}
+
+
+def _is_source_unchanged(fpath, header):
+    # The md5 of the source is only computed if its size matches but its
+    # modification time does not (e.g. after a copy).
+    stat = os.stat(fpath)
+    if stat.st_size != header['source_size']:
+        return False
+    return (stat.st_mtime_ns == header['source_mtime'] or
+            _hash_file(fpath) == header['source_hash'])
+
+
+def _shared_key_bytes(key):
+    return repr(key).encode('utf-8')
+
+
+def _shared_key_hash(key_bytes):
+    return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(),
+                          'little')
+
+
+def _open_shared_file(fpath):
+    # One memory map per file (and version of it) per process. The pages of
+    # the map are shared by all processes mapping the same file. Every call
+    # must be matched by a call to _close_shared_file, and the map is closed
+    # once it isn't used anymore.
+    stat = os.stat(fpath)
+    file_key = (os.path.abspath(fpath), stat.st_ino, stat.st_mtime_ns)
+    shared_file = _SHARED_DB_FILES.get(file_key)
+    if shared_file is None:
+        with open(fpath, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if mm[:len(_SHARED_DB_MAGIC)] != _SHARED_DB_MAGIC:
+                raise ValueError('invalid shared database file')
+            header_offset, = _SHARED_DB_FOOTER.unpack_from(
+                mm, len(mm) - _SHARED_DB_FOOTER.size)
+            header = pickle.loads(mm[header_offset:-_SHARED_DB_FOOTER.size])
+        except:
+            mm.close()
+            raise
+        shared_file = [mm, header, 0]
+        _SHARED_DB_FILES[file_key] = shared_file
+    shared_file[2] += 1
+    return file_key, shared_file[0], shared_file[1]
+
+
+def _close_shared_file(file_key):
+    shared_file = _SHARED_DB_FILES[file_key]
+    shared_file[2] -= 1
+    if shared_file[2] == 0:
+        del _SHARED_DB_FILES[file_key]
+        shared_file[0].close()
+
+
+class _SharedPickler(pickle.Pickler):
+    # The analysis schema of the database is stored once in the header of the
+    # shared file instead of in every pickled value.
+
+    def __init__(self, file, schema):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._schema = schema
+
+    def persistent_id(self, obj):
+        return 'schema' if obj is self._schema else None
+
+
+class _SharedUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, schema):
+        super().__init__(file)
+        self._schema = schema
+
+    def persistent_load(self, pid):
+        return self._schema
+
+
+def _write_mapped_dbs(mapped_fpath, fpath, dbs):
+    # The indexes of each database (one per variant, see
+    # MorphologyDB._compiled_key) are written as SharedMapping sections, and the
+    # rest of its state is pickled in the header at the end of the file.
+    # The file is written to a temporary file next to it and then renamed, so
+    # that other processes never map a partially written file.
+    fd, tmp_fpath = tempfile.mkstemp(
+        prefix='{}.'.format(os.path.basename(mapped_fpath)), suffix='.tmp',
+        dir=os.path.dirname(os.path.abspath(mapped_fpath)))
+    variants = {}
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_SHARED_DB_MAGIC)
+            for db in dbs:
+                mappings = {}
+                for name in _SHARED_DB_MAPPINGS:
+                    mappings[name] = _write_shared_mapping(
+                        f, getattr(db, name), db._schema)
+                state = {k: v for k, v in db.__dict__.items()
+                         if k not in _SHARED_DB_MAPPINGS}
+                variants[db._compiled_key()] = {'mappings': mappings,
+                                                'state': state}
+
+            header = dict(_source_info(fpath), version=_SHARED_DB_VERSION,
+                          byteorder=sys.byteorder, variants=variants)
+            header_offset = f.tell()
+            f.write(pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL))
+            f.write(_SHARED_DB_FOOTER.pack(header_offset))
+        # mkstemp creates files only readable by their owner
+        os.chmod(tmp_fpath, 0o644)
+        os.replace(tmp_fpath, mapped_fpath)
+    except:
+        os.remove(tmp_fpath)
+        raise
+
+
+def _write_shared_mapping(f, mapping, schema):
+    entries = []
+    for key, value in mapping.items():
+        key_bytes = _shared_key_bytes(key)
+        entries.append((_shared_key_hash(key_bytes), key_bytes, value))
+    entries.sort(key=lambda e: e[0])
+
+    hashes, offsets, blobs, offset = array('Q'), array('Q'), [], 0
+    for key_hash, key_bytes, value in entries:
+        value_file = io.BytesIO()
+        _SharedPickler(value_file, schema).dump(value)
+        blob = (_SHARED_DB_KEY_SIZE.pack(len(key_bytes)) + key_bytes +
+                value_file.getvalue())
+        hashes.append(key_hash)
+        offsets.append(offset)
+        blobs.append(blob)
+        offset += len(blob)
+    offsets.append(offset)
+
+    index_offset = f.tell()
+    f.write(hashes.tobytes())
+    f.write(offsets.tobytes())
+    for blob in blobs:
+        f.write(blob)
+    f.write(b'\0' * (-f.tell() % 8))
+
+    return (index_offset, len(entries))
+
+
+class SharedMapping(Mapping):
+    """Read-only mapping backed by a memory-mapped compiled or shared database
+    file (see :meth:`MorphologyDB.compile` and the `shared` argument of
+    :obj:`MorphologyDB`). Keys are looked up in a sorted hash index and
+    values are unpickled from the file on access, so that only a bounded
+    cache of recently used values lives in the memory of each process.
+    Pickling a shared mapping (e.g. when sending it to a spawned worker) only
+    pickles the location of the mapping in the file. The file is unmapped
+    when all the mappings using it are closed (see :meth:`close`).
+    Args:
+        fpath (:obj:`str`): File path to the database file.
+        variant (:obj:`tuple`): Variant of the database (flags and features
+            it was loaded with) the mapping belongs to.
+        name (:obj:`str`): Name of the index of the database.
+        cache_size (:obj:`int`, optional): Number of unpickled values to
+            keep per process. Defaults to 4096.
+    """
+
+    def __init__(self, fpath, variant, name,
+                 cache_size=_SHARED_DB_CACHE_SIZE):
+        self._fpath = fpath
+        self._variant = variant
+        self._name = name
+        self._cache_size = cache_size
+
+        self._file_key, mm, header = _open_shared_file(fpath)
+        try:
+            variant_header = header['variants'][variant]
+            index_offset, count = variant_header['mappings'][name]
+        except KeyError:
+            _close_shared_file(self._file_key)
+            raise
+        self._schema = variant_header['state']['_schema']
+        self._view = memoryview(mm)
+        offsets_offset = index_offset + 8 * count
+        data_offset = offsets_offset + 8 * (count + 1)
+        self._hashes = self._view[index_offset:offsets_offset].cast('Q')
+        self._offsets = self._view[offsets_offset:data_offset].cast('Q')
+        self._data = self._view[data_offset:data_offset + self._offsets[count]]
+        self._decode = lru_cache(maxsize=cache_size)(self._decode_value)
+
+    def __reduce__(self):
+        return (SharedMapping, (self._fpath, self._variant, self._name,
+                                self._cache_size))
+
+    def close(self):
+        """Releases the memory-mapped file of the mapping, which is closed
+        once no other mapping uses it. The mapping can't be used anymore
+        after it is closed. Closing a closed mapping has no effect.
+        """
+
+        if self._view is None:
+            return
+
+        self._decode.cache_clear()
+        for view in (self._hashes, self._offsets, self._data, self._view):
+            view.release()
+        self._hashes = self._offsets = self._data = self._view = None
+        _close_shared_file(self._file_key)
+
+    def _find(self, key):
+        if self._view is None:
+            raise ValueError('operation on closed shared mapping')
+
+        key_bytes = _shared_key_bytes(key)
+        key_hash = _shared_key_hash(key_bytes)
+
+        i = bisect_left(self._hashes, key_hash)
+        while i < len(self._hashes) and self._hashes[i] == key_hash:
+            start = self._offsets[i] + _SHARED_DB_KEY_SIZE.size
+            key_size, = _SHARED_DB_KEY_SIZE.unpack_from(self._data,
+                                                        self._offsets[i])
+            if self._data[start:start + key_size] == key_bytes:
+                return i
+            i += 1
+
+        return -1
+
+    def _decode_key(self, i):
+        start = self._offsets[i] + _SHARED_DB_KEY_SIZE.size
+        key_size, = _SHARED_DB_KEY_SIZE.unpack_from(self._data,
+                                                    self._offsets[i])
+        return literal_eval(bytes(self._data[start:start + key_size]).decode(
+            'utf-8'))
+
+    def _decode_value(self, i):
+        key_size, = _SHARED_DB_KEY_SIZE.unpack_from(self._data,
+                                                    self._offsets[i])
+        start = self._offsets[i] + _SHARED_DB_KEY_SIZE.size + key_size
+        value_file = io.BytesIO(self._data[start:self._offsets[i + 1]])
+        return _SharedUnpickler(value_file, self._schema).load()
+
+    def __getitem__(self, key):
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._decode(i)
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._decode_key(i)
+
+    def __len__(self):
+        if self._view is None:
+            raise ValueError('operation on closed shared mapping')
+        return len(self._hashes)
+
 
 class MorphologyDB:
     """Class providing indexes from a given morphology database file.
@@ -55,6 +749,26 @@ class MorphologyDB:
             reinflection. 'r' is equivalent to 'ag' since the reinflector
             uses both analyzer and generator components internally.
             Defaults to 'a'.
+        use_compiled (:obj:`bool`): If True and a compiled version of the
+            database (see :meth:`compile`) which is up to date with `fpath`
+            exists, it is loaded instead of parsing the text database. Its
+            indexes are then accessed through :obj:`SharedMapping` objects.
+            Defaults to True.
+        shared (:obj:`bool`): If True, the indexes of the database are kept
+            in a read-only memory-mapped file next to `fpath` (created
+            if it doesn't exist or is out of date with `fpath`) and are
+            accessed through :obj:`SharedMapping` objects. All processes
+            loading the same database this way (e.g. the workers of a
+            multiprocessing pool) share a single copy of the indexes.
+            Defaults to False.
+        feats (:obj:`list` of :obj:`str`, optional): If set, only these
+            features, those needed to compute them when merging analyses,
+            and those used internally by the analyzer and generator are
+            kept, and the others are dropped from the analyses and the
+            definitions of the database (stem backoff analyses are kept as
+            they are). Compiled databases only hold full databases, so
+            restricted ones are parsed from `fpath` unless `shared` is set.
+            Defaults to None.
     Raises:
         :obj:`~camel_tools.morphology.errors.InvalidDatabaseFlagError`: When
             an invalid flag value is given.
@@ -92,7 +806,46 @@ class MorphologyDB:
 
         return MorphologyDB(str(Path(db_info.path, 'morphology.db')), flags)
 
-    def __init__(self, fpath, flags='a'):
+    @staticmethod
+    def compiled_path(fpath):
+        """Returns the path of the compiled version of a database file.
+        Args:
+            fpath (:obj:`str`): File path to database.
+        Returns:
+            :obj:`str`: File path to the compiled database.
+        """
+
+        return '{}.bin'.format(fpath)
+
+    @staticmethod
+    def compile(fpath, flags_list=('a', 'g', 'r')):
+        """Compiles a database file into a binary file (next to it, see
+        :meth:`compiled_path`) from which :obj:`MorphologyDB` instances can
+        be loaded without parsing the text database. The compiled file
+        contains one pre-built set of indexes per flag string. Each index
+        is stored as a hash table of offsets to its entries, whose analyses
+        are slot-based records of the values of the database (see
+        :obj:`AnalysisSchema`). Loading a compiled database only maps the
+        file into memory and reads its header: entries are only decoded
+        when they are accessed (see :obj:`SharedMapping`), and their pages
+        are shared by all processes mapping the file.
+        Args:
+            fpath (:obj:`str`): File path to database.
+            flags_list (:obj:`tuple` of :obj:`str`, optional): Flag strings
+                to compile the database for. Defaults to ('a', 'g', 'r').
+        Returns:
+            :obj:`str`: File path to the compiled database.
+        """
+
+        dbs = [MorphologyDB(fpath, flags, use_compiled=False)
+               for flags in flags_list]
+        compiled_fpath = MorphologyDB.compiled_path(fpath)
+        _write_mapped_dbs(compiled_fpath, fpath, dbs)
+
+        return compiled_fpath
+
+    def __init__(self, fpath, flags='a', use_compiled=True, shared=False,
+                 feats=None):
         """Class constructor.
         """
 
@@ -131,25 +884,161 @@ class MorphologyDB:
         self.tokenizations = set()
         self.compute_feats = frozenset()
         self.stem_backoffs = {}
-        self.postregex = []
+        self.postregex = PostRegex()
+        self._schema = AnalysisSchema()
+        # Features kept in the database, None meaning all of them
+        self._feats = None
+        if feats is not None:
+            self._feats = merge_dependencies(feats) | _REQUIRED_FEATS
+            if self._withGeneration:
+                self._feats |= _GENERATION_FEATS
 
         self.prefix_hash = {}
         self.suffix_hash = {}
         self.stem_hash = {}
         self.smartbackoff_hash = {}
+        # Smart backoff patterns by length of the stems they match
+        self.smartbackoff_index = {}
 
         self.prefix_cat_hash = {}
         self.suffix_cat_hash = {}
         self.lemma_hash = {}
+        # Clitic feature values (None if absent) of the analyses of each
+        # prefix and suffix category
+        self.prefix_cat_clitics = {}
+        self.suffix_cat_clitics = {}
+        # Prefix categories compatible with each stem category, each with
+        # the suffix categories compatible with both
+        self.stem_affix_cats = {}
 
         self.prefix_stem_compat = {}
         self.stem_suffix_compat = {}
         self.prefix_suffix_compat = {}
         self.stem_prefix_compat = {}
+        # Legal suffix categories of compatible prefix and stem categories
+        self.prefix_stem_suffix_compat = {}
         self.max_prefix_size = 0
         self.max_suffix_size = 0
+        # Character tries of prefixes and (reversed) suffixes used for
+        # segmentation
+        self.prefix_trie = {}
+        self.suffix_trie = {}
+
+        if shared and self._load_shared(fpath):
+            return
+
+        if not (use_compiled and self._load_compiled(fpath)):
+            self._parse_dbfile(fpath)
+
+        if shared:
+            # If the shared file can't be written (e.g. read-only directory)
+            # the database is kept in the memory of this process.
+            try:
+                self._dump_shared(fpath)
+            except OSError:
+                return
+            self._load_shared(fpath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Closes the memory-mapped files of the indexes of a compiled or
+        shared database (see :obj:`SharedMapping`). The database, and the
+        analyzers, generators and reinflectors using it, can't be used
+        anymore after it is closed. Databases parsed from their text file
+        don't hold any open files, and closing them has no effect.
+        A database can also be used as a context manager, which closes it
+        on exit.
+        """
 
-        self._parse_dbfile(fpath)
+        for name in _SHARED_DB_MAPPINGS:
+            mapping = getattr(self, name)
+            if isinstance(mapping, SharedMapping):
+                mapping.close()
+
+    def _compiled_key(self):
+        if self._feats is None:
+            return (self._withAnalysis, self._withGeneration, self._debug)
+        return (self._withAnalysis, self._withGeneration, self._debug,
+                tuple(sorted(self._feats)))
+
+    def _shared_path(self, fpath):
+        flags = ''.join(flag for flag, on in zip('agd', self._compiled_key())
+                        if on)
+        if self._feats is not None:
+            feats_hash = hashlib.blake2b(
+                ' '.join(sorted(self._feats)).encode('utf-8'), digest_size=4)
+            flags = '{}.{}'.format(flags, feats_hash.hexdigest())
+        return '{}.{}.shm'.format(fpath, flags)
+
+    def _restrict_header(self):
+        self.defines = {feat: values for feat, values in self.defines.items()
+                        if feat in self._feats}
+        self.defaults = {dkey: {feat: value for feat, value in default.items()
+                                if feat in self._feats}
+                         for dkey, default in self.defaults.items()}
+        self.order = [feat for feat in self.order if feat in self._feats]
+        self.tokenizations = frozenset(feat for feat in self.tokenizations
+                                       if feat in self._feats)
+        self.compute_feats = frozenset(self.order)
+        self._schema = AnalysisSchema(self.order)
+
+    def _restrict_analysis(self, analysis):
+        if self._feats is None:
+            return analysis
+        return {feat: value for feat, value in analysis.items()
+                if feat in self._feats}
+
+    def _dump_shared(self, fpath):
+        _write_mapped_dbs(self._shared_path(fpath), fpath, [self])
+
+    def _load_shared(self, fpath):
+        return self._load_mapped(self._shared_path(fpath), fpath)
+
+    def _load_compiled(self, fpath):
+        return self._load_mapped(MorphologyDB.compiled_path(fpath), fpath)
+
+    def _load_mapped(self, mapped_fpath, fpath):
+        if not os.path.exists(mapped_fpath):
+            return False
+
+        try:
+            file_key, _, header = _open_shared_file(mapped_fpath)
+        except (OSError, ValueError, EOFError, struct.error,
+                pickle.UnpicklingError):
+            return False
+
+        mappings = {}
+        try:
+            # The file is only used if it was written from the current
+            # version of the text database.
+            if (header['version'] != _SHARED_DB_VERSION or
+                    header['byteorder'] != sys.byteorder):
+                return False
+            if not _is_source_unchanged(fpath, header):
+                return False
+
+            variant = self._compiled_key()
+            variant_header = header['variants'].get(variant)
+            if variant_header is None:
+                return False
+            for name in variant_header['mappings']:
+                mappings[name] = SharedMapping(mapped_fpath, variant, name)
+        except (OSError, ValueError, KeyError):
+            for mapping in mappings.values():
+                mapping.close()
+            return False
+        finally:
+            # The mappings hold their own references to the file
+            _close_shared_file(file_key)
+
+        self.__dict__.update(variant_header['state'])
+        self.__dict__.update(mappings)
+        return True
 
     def _parse_analysis_line_toks(self, toks):
         res = {}
@@ -258,6 +1147,7 @@ class MorphologyDB:
 
                 if line == '###TOKENIZATIONS###':
                     self.compute_feats = frozenset(self.order)
+                    self._schema = AnalysisSchema(self.order)
                     break
 
                 toks = line.split(u' ')
@@ -332,6 +1222,11 @@ class MorphologyDB:
 
                     match_replace.append(line.split('\t'))
 
+            self.postregex = PostRegex(self.postregex)
+
+            if self._feats is not None:
+                self._restrict_header()
+
             # Process PREFIXES
             for line in dbfile:
                 line = force_unicode(line)
@@ -344,9 +1239,10 @@ class MorphologyDB:
                         'invalid PREFIXES line {}'.format(repr(line)))
 
                 prefix = parts[0].strip()
-                category = parts[1]
-                analysis = self._parse_analysis_line_toks(
-                    parts[2].strip().split(u' '))
+                category = sys.intern(parts[1])
+                analysis = self._schema.intern(self._restrict_analysis(
+                    self._parse_analysis_line_toks(
+                        parts[2].strip().split(u' '))))
 
                 if self._withAnalysis:
                     if prefix not in self.prefix_hash:
@@ -371,9 +1267,10 @@ class MorphologyDB:
                         'invalid SUFFIXES line {}'.format(repr(line)))
 
                 suffix = parts[0].strip()
-                category = parts[1]
-                analysis = self._parse_analysis_line_toks(
-                    parts[2].strip().split(u' '))
+                category = sys.intern(parts[1])
+                analysis = self._schema.intern(self._restrict_analysis(
+                    self._parse_analysis_line_toks(
+                        parts[2].strip().split(u' '))))
 
                 if self._withAnalysis:
                     if suffix not in self.suffix_hash:
@@ -400,10 +1297,17 @@ class MorphologyDB:
                         'invalid STEMS line {}'.format(repr(line)))
 
                 stem = parts[0]
-                category = parts[1]
+                category = sys.intern(parts[1])
                 analysis = self._parse_analysis_line_toks(parts[2].split(u' '))
+                # Backoff stems are kept whole since the analyzer rewrites
+                # several of their features
+                if stem != 'NOAN':
+                    analysis = self._restrict_analysis(analysis)
                 if not self._debug:
                     analysis['lex'] = strip_lex(analysis['lex'])
+                if self._withGeneration:
+                    analysis['stemcat'] = category
+                analysis = self._schema.record(analysis)
 
                 if self._withAnalysis:
                     if stem not in self.stem_hash:
@@ -413,7 +1317,6 @@ class MorphologyDB:
                 if self._withGeneration:
                     # FIXME: Make sure analyses for category are unique?
                     lemma_key = analysis['lex']
-                    analysis['stemcat'] = category
                     if lemma_key not in self.lemma_hash:
                         self.lemma_hash[lemma_key] = []
                     self.lemma_hash[lemma_key].append(analysis)
@@ -451,6 +1354,11 @@ class MorphologyDB:
                         analysis = vv[1]
                         smartbackoff_hash.setdefault(len(chars), {}).setdefault(k, []).append(vv)
                 self.smartbackoff_hash = smartbackoff_hash
+                self.smartbackoff_index = {
+                    length: SmartBackoffBucket([
+                        SmartBackoffPattern(match_re, analyses)
+                        for match_re, analyses in patterns.items()])
+                    for length, patterns in smartbackoff_hash.items()}
             
             # Process prefix_stem compatibility table
             for line in dbfile:
@@ -465,8 +1373,8 @@ class MorphologyDB:
                     raise DatabaseParseError(
                         'invalid TABLE AB line {}'.format(repr(line)))
 
-                prefix_cat = toks[0]
-                stem_cat = toks[1]
+                prefix_cat = sys.intern(toks[0])
+                stem_cat = sys.intern(toks[1])
 
                 if self._withAnalysis:
                     if prefix_cat not in self.prefix_stem_compat:
@@ -491,8 +1399,8 @@ class MorphologyDB:
                     raise DatabaseParseError(
                         'invalid TABLE BC line {}'.format(repr(line)))
 
-                stem_cat = toks[0]
-                suffix_cat = toks[1]
+                stem_cat = sys.intern(toks[0])
+                suffix_cat = sys.intern(toks[1])
 
                 if stem_cat not in self.stem_suffix_compat:
                     self.stem_suffix_compat[stem_cat] = set()
@@ -508,8 +1416,8 @@ class MorphologyDB:
                     raise DatabaseParseError(
                         'invalid TABLE AC line {}'.format(repr(line)))
 
-                prefix_cat = toks[0]
-                suffix_cat = toks[1]
+                prefix_cat = sys.intern(toks[0])
+                suffix_cat = sys.intern(toks[1])
 
                 if prefix_cat not in self.prefix_suffix_compat:
                     self.prefix_suffix_compat[prefix_cat] = set()
@@ -523,6 +1431,51 @@ class MorphologyDB:
                     self.max_suffix_size = max(self.max_suffix_size,
                                                len(suffix))
 
+                self.prefix_trie = _build_trie(self.prefix_hash.keys())
+                self.suffix_trie = _build_trie(
+                    suffix[::-1] for suffix in self.suffix_hash.keys())
+
+                # Identical sets of legal suffix categories are only stored
+                # once.
+                unique_suffix_cats = {}
+                for prefix_cat, stem_cats in self.prefix_stem_compat.items():
+                    prefix_suffix_cats = self.prefix_suffix_compat.get(
+                        prefix_cat, set())
+                    for stem_cat in stem_cats:
+                        suffix_cats = frozenset(
+                            self.stem_suffix_compat.get(stem_cat, set()) &
+                            prefix_suffix_cats)
+                        if not suffix_cats:
+                            continue
+                        suffix_cats = unique_suffix_cats.setdefault(
+                            suffix_cats, suffix_cats)
+                        self.prefix_stem_suffix_compat[
+                            (prefix_cat, stem_cat)] = suffix_cats
+
+            if self._withGeneration:
+                self.prefix_cat_clitics = _clitic_signatures(
+                    self.prefix_cat_hash, PROCLITIC_FEATS)
+                self.suffix_cat_clitics = _clitic_signatures(
+                    self.suffix_cat_hash, ENCLITIC_FEATS)
+
+                for stem_cat, prefix_cats in self.stem_prefix_compat.items():
+                    suffix_cats = [
+                        suffix_cat for suffix_cat in
+                        self.stem_suffix_compat.get(stem_cat, ())
+                        if suffix_cat in self.suffix_cat_hash]
+                    affix_cats = []
+                    for prefix_cat in prefix_cats:
+                        if prefix_cat not in self.prefix_cat_hash:
+                            continue
+                        prefix_suffix_cats = self.prefix_suffix_compat.get(
+                            prefix_cat, ())
+                        affix_cats.append((prefix_cat, tuple(
+                            suffix_cat for suffix_cat in suffix_cats
+                            if suffix_cat in prefix_suffix_cats)))
+                    self.stem_affix_cats[stem_cat] = tuple(affix_cats)
+
+            self._schema.compact()
+
     def all_feats(self):
         """Return a set of all features provided by this database instance.
         Returns:
@@ -28,13 +28,48 @@
 from __future__ import absolute_import
 
 import copy
-import collections
 
 from camel_tools.morphology.database import MorphologyDB
+from camel_tools.morphology.database import PROCLITIC_FEATS, ENCLITIC_FEATS
 from camel_tools.morphology.errors import GeneratorError
 from camel_tools.morphology.errors import InvalidGeneratorFeature
 from camel_tools.morphology.errors import InvalidGeneratorFeatureValue
-from camel_tools.morphology.utils import merge_features, strip_lex
+from camel_tools.morphology.utils import merge_features, merge_feature
+from camel_tools.morphology.utils import strip_lex
+
+
+# Maximum number of filtered prefix and suffix lists kept by a generator
+_AFFIX_CACHE_SIZE = 100000
+
+# Value of the features missing from a merged analysis
+_MISSING = object()
+
+
+def _filter_clitics(analyses, signatures, clitics, stem_clitics, accepted):
+    # Keeps the affix analyses whose clitic values agree with the requested
+    # ones (None if not requested), falling back on the values of the stem
+    # for the clitics the affix doesn't have
+    result = []
+    for signature, start, stop in signatures:
+        key = (signature, stem_clitics)
+        accept = accepted.get(key)
+        if accept is None:
+            accept = True
+            for value, affix_value, stem_value in zip(clitics, signature,
+                                                      stem_clitics):
+                if value is None:
+                    continue
+                if affix_value is None:
+                    if value != '0' and stem_value != value:
+                        accept = False
+                        break
+                elif affix_value != value:
+                    accept = False
+                    break
+            accepted[key] = accept
+        if accept:
+            result.extend(analyses[start:stop])
+    return result
 
 
 class Generator(object):
@@ -44,6 +79,10 @@ class Generator(object):
         db (:obj:`~camel_tools.morphology.database.MorphologyDB`): Database to
             use for generation. Must be opened in generation or reinflection
             mode.
+        feats (:obj:`list` of :obj:`str`, optional): If set, generated
+            analyses only contain these features (in this order, if
+            available), and the others are only computed if they are
+            requested in :meth:`generate`. Defaults to None.
 
     Raises:
         :obj:`~camel_tools.morphology.errors.GeneratorError`: If **db** is not
@@ -52,7 +91,7 @@ class Generator(object):
             does not support generation.
     """
 
-    def __init__(self, db, variant='msa', diac_only=False):
+    def __init__(self, db, variant='msa', diac_only=False, feats=None):
         if not isinstance(db, MorphologyDB):
             raise GeneratorError('DB is not an instance of MorphologyDB')
         if not db.flags.generation:
@@ -61,6 +100,10 @@ class Generator(object):
         self._db = db
         self._variant = variant
         self._diac_only = diac_only
+        self._feats = None if feats is None else tuple(dict.fromkeys(feats))
+        # Affix analyses of a category filtered on the requested clitics,
+        # keyed by the category and the requested and stem clitic values
+        self._affix_cache = {}
 
     def generate(self, lemma, feats, debug=False):
         """Generate surface forms and their associated analyses for a given 
@@ -86,14 +129,69 @@ class Generator(object):
                 If an invalid value is given to a feature or if 'pos' feature
                 is not defined.
         """
-        debug_message = set()
+        if debug:
+            return self.generate_paradigm(lemma, [feats], debug=True)[0]
 
-        # lemma = strip_lex(lemma)
         if lemma not in self._db.lemma_hash:
-            debug_message.add(
-                ('Lemma not foud in `self._db.lemma_hash`', 'L0'))
-            return ([], debug_message) if debug else []
+            return []
+
+        feats = self._complete_feats(feats, set())
+        if feats is None:
+            return []
+
+        return self._generate(lemma, feats, self._merge_feats([feats]))
+
+    def generate_paradigm(self, lemma, feature_bundles, debug=False):
+        """Generate the surface forms and their associated analyses for a
+        given lemma and each of a list of feature sets, e.g. the cells of its
+        inflection table. This is equivalent to calling :meth:`generate` for
+        each feature set, but the combinations of prefixes, stems and suffixes
+        of the lemma are only enumerated and merged once for all of them.
+
+        Args:
+            lemma (:obj:`str`): Lemma to generate from.
+            feature_bundles (:obj:`list` of :obj:`dict`): Feature sets to
+                generate. Each must contain the 'pos' feature.
+                See :doc:`/reference/camel_morphology_features` for
+                more information on features and their values.
+
+        Returns:
+            :obj:`list`: One result per feature set, in the same order, as it
+            would have been returned by :meth:`generate`.
+
+        Raises:
+            :obj:`~camel_tools.morphology.errors.InvalidGeneratorFeature`: If
+                a feature is given that is not defined in database.
+            :obj:`~camel_tools.morphology.errors.InvalidGeneratorFeatureValue`:
+                If an invalid value is given to a feature or if 'pos' feature
+                is not defined.
+        """
+        feature_bundles = list(feature_bundles)
+        debug_messages = [set() for _ in feature_bundles]
+        analyses = [[] for _ in feature_bundles]
 
+        if lemma not in self._db.lemma_hash:
+            for debug_message in debug_messages:
+                debug_message.add(
+                    ('Lemma not foud in `self._db.lemma_hash`', 'L0'))
+        else:
+            bundles = [self._complete_feats(feats, debug_message)
+                       for feats, debug_message in zip(feature_bundles,
+                                                       debug_messages)]
+            self._generate_paradigm(lemma, bundles, analyses, debug_messages,
+                                    debug)
+
+        if not debug:
+            return analyses
+
+        for analyses_, debug_message in zip(analyses, debug_messages):
+            if analyses_:
+                debug_message.add(('OK', 'OK'))
+        return list(zip(analyses, debug_messages))
+
+    def _complete_feats(self, feats, debug_message):
+        # Validates the requested features and sets the default values of the
+        # clitics. Returns None if nothing can be generated for them.
         for feat in feats:
             if feat not in self._db.defines:
                 raise InvalidGeneratorFeature(feat)
@@ -113,30 +211,206 @@ class Generator(object):
         if not feat_set.issubset(default_feat_set):
             debug_message.add(
                 ('Requested features are not a subset of the default features', 'FD0'))
-            return ([], debug_message) if debug else []
+            return None
 
         # Set default values for undefined feats
         for feat in ['prc0', 'prc1', 'prc1.5', 'prc2', 'prc3', 'enc0', 'enc1', 'enc2']:
             if feat not in feats and feat in default:
                 feats[feat] = default[feat]
 
-        stem_feats_list = self._db.lemma_hash[lemma]
-        analyses = collections.deque()
+        return feats
+
+    def _merge_feats(self, bundles):
+        # Requested features are also merged since the generated analyses are
+        # checked against them
+        if self._feats is None:
+            return None
+        merge_feats = dict.fromkeys(self._feats)
+        for feats in bundles:
+            merge_feats.update(dict.fromkeys(feats))
+        return tuple(merge_feats)
+
+    def _project(self, merged, merge_feats):
+        if merge_feats is None:
+            return merged
+        return {feat: merged[feat] for feat in self._feats if feat in merged}
+
+    def _generate(self, lemma, feats, merge_feats):
+        # Requested features are checked before the full merge, except for the
+        # clitics which the filters already guarantee, and for the diac-only
+        # merge which doesn't compute most of them
+        check_feats = ()
+        if not self._diac_only:
+            check_feats = tuple(feat for feat in feats
+                                if feat not in PROCLITIC_FEATS and
+                                feat not in ENCLITIC_FEATS)
+        stems = [stem_feats.copy() for stem_feats in self._db.lemma_hash[lemma]]
+        analyses = []
+
+        for (_, stem_feats, _, prefix_feats, _,
+             suffix_feats) in self._combinations(stems, feats):
+            if not self._check_feats(prefix_feats, stem_feats, suffix_feats,
+                                     feats, check_feats):
+                continue
 
-        for stem_feats in stem_feats_list:
+            merged = merge_features(self._db,
+                                    prefix_feats, stem_feats, suffix_feats,
+                                    variant=self._variant,
+                                    diac_only=self._diac_only,
+                                    feats=merge_feats)
+
+            ignore_analysis = False
+            for feat in feats.keys():
+                if (feat in merged and
+                        merged[feat] != feats[feat]):
+                    ignore_analysis = True
+                    break
 
+            if not ignore_analysis:
+                analyses.append(self._project(merged, merge_feats))
+
+        return analyses
+
+    def _check_feats(self, prefix_feats, stem_feats, suffix_feats, feats,
+                     check_feats):
+        # Rejects combinations whose requested features don't match before
+        # computing the rest of the merged analysis
+        for feat in check_feats:
+            try:
+                value = merge_feature(self._db,
+                                      prefix_feats, stem_feats, suffix_feats,
+                                      feat, variant=self._variant)
+            except KeyError:
+                continue
+            if value != feats[feat]:
+                return False
+        return True
+
+    def _generate_paradigm(self, lemma, bundles, analyses, debug_messages,
+                           debug):
+        # Feature sets which select the same stems and affixes are generated
+        # together: each of their combinations is merged once and its values
+        # of the requested features are looked up in an index of the sets.
+        groups = {}
+        for i, feats in enumerate(bundles):
+            if feats is None:
+                continue
+            names = tuple(sorted(feats))
+            key = (feats.get('vox'), feats.get('rat'), feats['pos'],
+                   tuple(feats.get(feat) for feat in PROCLITIC_FEATS),
+                   tuple(feats.get(feat) for feat in ENCLITIC_FEATS), names)
+            groups.setdefault(key, []).append(i)
+
+        merge_feats = self._merge_feats(
+            feats for feats in bundles if feats is not None)
+        stems = [stem_feats.copy() for stem_feats in self._db.lemma_hash[lemma]]
+        merged_cache = {}
+
+        for (_, _, _, _, _, names), indexes in groups.items():
+            feats = bundles[indexes[0]]
+            index = {}
+            for i in indexes:
+                index.setdefault(tuple(bundles[i][feat] for feat in names),
+                                 []).append(i)
+            # Features requested with the same value by all the sets of the
+            # group are checked before the full merge
+            check_feats = ()
+            if not self._diac_only:
+                check_feats = tuple(
+                    feat for feat in names
+                    if feat not in PROCLITIC_FEATS and
+                    feat not in ENCLITIC_FEATS and
+                    all(bundles[i][feat] == feats[feat] for i in indexes))
+            debug_message = set() if debug else None
+            count = 0
+            accepted = [0] * len(bundles)
+
+            for (stem_index, stem_feats, prefix_cat, prefix_feats, suffix_cat,
+                 suffix_feats) in self._combinations(stems, feats,
+                                                     debug_message):
+                count += 1
+                # The affix analyses are kept with their merged analysis so
+                # that their ids can't be reused
+                merged_key = (stem_index, id(prefix_feats), id(suffix_feats))
+                cached = merged_cache.get(merged_key)
+                if cached is None:
+                    if not self._check_feats(prefix_feats, stem_feats,
+                                             suffix_feats, feats,
+                                             check_feats):
+                        continue
+                    merged = merge_features(self._db,
+                                            prefix_feats, stem_feats,
+                                            suffix_feats,
+                                            variant=self._variant,
+                                            diac_only=self._diac_only,
+                                            feats=merge_feats)
+                    merged_cache[merged_key] = (prefix_feats, suffix_feats,
+                                                merged)
+                else:
+                    merged = cached[2]
+
+                values = tuple(merged.get(feat, _MISSING) for feat in names)
+                if _MISSING not in values:
+                    matches = index.get(values, ())
+                else:
+                    # Features missing from the merged analysis match any
+                    # requested value
+                    matches = [
+                        i for i in indexes
+                        if all(value is _MISSING or value == bundles[i][feat]
+                               for feat, value in zip(names, values))]
+
+                for i in matches:
+                    accepted[i] += 1
+                    analysis = self._project(merged, merge_feats)
+                    if analysis is merged:
+                        analysis = dict(merged)
+                    if not debug:
+                        analyses[i].append(analysis)
+                    else:
+                        analyses[i].append(
+                            (analysis,
+                             prefix_cat, stem_feats['stemcat'], suffix_cat,
+                             prefix_feats, stem_feats, suffix_feats))
+
+            if debug:
+                for i in indexes:
+                    debug_messages[i].update(debug_message)
+                    if accepted[i] < count:
+                        debug_messages[i].add(
+                            ('Merged features do not adhere to requested features', 'M0'))
+
+    def _combinations(self, stems, feats, debug_message=None):
+        # Yields the combinations of the stems with the prefixes and suffixes
+        # of compatible categories whose clitic values agree with the
+        # requested ones, in the order of the database. If debug_message is
+        # set, the reasons for which combinations were rejected are added to
+        # it.
+        db = self._db
+        debug = debug_message is not None
+        proclitics = tuple(feats.get(feat) for feat in PROCLITIC_FEATS)
+        enclitics = tuple(feats.get(feat) for feat in ENCLITIC_FEATS)
+        affix_cache = self._affix_cache
+        if len(affix_cache) > _AFFIX_CACHE_SIZE:
+            affix_cache.clear()
+        accepted_prefixes, accepted_suffixes = {}, {}
+
+        for stem_index, stem_feats in enumerate(stems):
             if 'vox' in feats and stem_feats['vox'] != feats['vox']:
-                debug_message.add(('No stem with same voice', 'XVox0'))
+                if debug:
+                    debug_message.add(('No stem with same voice', 'XVox0'))
                 continue
             if 'rat' in feats and stem_feats['rat'] != feats['rat']:
-                debug_message.add(('No stem with same rationality', 'XRat0'))
+                if debug:
+                    debug_message.add(('No stem with same rationality', 'XRat0'))
                 continue
             if 'pos' in feats and stem_feats['pos'] != feats['pos']:
-                debug_message.add(('No stem with same POS', 'XPos0'))
+                if debug:
+                    debug_message.add(('No stem with same POS', 'XPos0'))
                 continue
 
             ignore_stem = False
-            for feat in ['prc0', 'prc1', 'prc1.5', 'prc2', 'prc3', 'enc0', 'enc1', 'enc2']:
+            for feat in PROCLITIC_FEATS + ENCLITIC_FEATS:
                 if feat not in feats:
                     continue
                 if (feat in stem_feats and
@@ -146,101 +420,76 @@ class Generator(object):
                     break
 
             if ignore_stem:
-                debug_message.add(
-                    ('No stem clitic value(s) match(es) requested clitic value(s)', 'FXC0'))
+                if debug:
+                    debug_message.add(
+                        ('No stem clitic value(s) match(es) requested clitic value(s)', 'FXC0'))
                 continue
 
-            prefix_cats = self._db.stem_prefix_compat[stem_feats['stemcat']]
-            suffix_cats = self._db.stem_suffix_compat[stem_feats['stemcat']]
+            stem_cat = stem_feats['stemcat']
+            stem_proclitics = tuple(stem_feats.get(feat, '0')
+                                    for feat in PROCLITIC_FEATS)
+            stem_enclitics = tuple(stem_feats.get(feat, '0')
+                                   for feat in ENCLITIC_FEATS)
 
-            for prefix_cat in prefix_cats:
-                if prefix_cat not in self._db.prefix_cat_hash:
+            if debug:
+                stem_suffix_cats = db.stem_suffix_compat[stem_cat]
+                if any(prefix_cat not in db.prefix_cat_hash
+                       for prefix_cat in db.stem_prefix_compat[stem_cat]):
                     debug_message.add(
                         ('No prefix matches with any of matching stems', 'XP0'))
-                    continue
 
-                prefix_feats_list = self._db.prefix_cat_hash[prefix_cat]
-                for prefix_feats in prefix_feats_list:
-                    ignore_prefix = False
-
-                    for feat in ['prc0', 'prc1', 'prc1.5', 'prc2', 'prc3']:
-                        if feat not in feats:
-                            continue
-                        if ((feats[feat] != '0' and
-                             feat not in prefix_feats and
-                             stem_feats.get(feat, '0') != feats[feat]) or
-                            (feat in prefix_feats and
-                             feats[feat] != prefix_feats[feat])):
-                            ignore_prefix = True
-                            break
-
-                    if ignore_prefix:
-                        debug_message.add(
-                            ('No prefix proclitic value(s) match(es) requested proclitic value(s)', 'PP0'))
-                        continue
+            for prefix_cat, suffix_cats in db.stem_affix_cats[stem_cat]:
+                prefix_key = (True, prefix_cat, proclitics, stem_proclitics)
+                prefix_feats_list = affix_cache.get(prefix_key)
+                if prefix_feats_list is None:
+                    prefix_feats_list = _filter_clitics(
+                        db.prefix_cat_hash[prefix_cat],
+                        db.prefix_cat_clitics[prefix_cat],
+                        proclitics, stem_proclitics, accepted_prefixes)
+                    affix_cache[prefix_key] = prefix_feats_list
+
+                if debug and (len(prefix_feats_list) <
+                              len(db.prefix_cat_hash[prefix_cat])):
+                    debug_message.add(
+                        ('No prefix proclitic value(s) match(es) requested proclitic value(s)', 'PP0'))
+
+                if not prefix_feats_list:
+                    continue
 
-                    for suffix_cat in suffix_cats:
-                        if suffix_cat not in self._db.suffix_cat_hash:
+                if debug:
+                    prefix_suffix_cats = db.prefix_suffix_compat.get(
+                        prefix_cat, ())
+                    for suffix_cat in stem_suffix_cats:
+                        if suffix_cat not in db.suffix_cat_hash:
                             debug_message.add(
                                 ('No suffix matches with any of matching stems', 'XS0'))
-                            continue
-                        suffix_feats_list = (
-                            self._db.suffix_cat_hash[suffix_cat])
+                        elif suffix_cat not in prefix_suffix_cats:
+                            debug_message.add(
+                                ('No prefix/suffix match with each other', 'PS0'))
+
+                suffix_feats_lists = []
+                for suffix_cat in suffix_cats:
+                    suffix_key = (False, suffix_cat, enclitics, stem_enclitics)
+                    suffix_feats_list = affix_cache.get(suffix_key)
+                    if suffix_feats_list is None:
+                        suffix_feats_list = _filter_clitics(
+                            db.suffix_cat_hash[suffix_cat],
+                            db.suffix_cat_clitics[suffix_cat],
+                            enclitics, stem_enclitics, accepted_suffixes)
+                        affix_cache[suffix_key] = suffix_feats_list
+                    if debug and (len(suffix_feats_list) <
+                                  len(db.suffix_cat_hash[suffix_cat])):
+                        debug_message.add(
+                            ('No suffix enclitic value(s) match(es) requested enclitic value(s)', 'FSE0'))
+                    if suffix_feats_list:
+                        suffix_feats_lists.append(
+                            (suffix_cat, suffix_feats_list))
+
+                for prefix_feats in prefix_feats_list:
+                    for suffix_cat, suffix_feats_list in suffix_feats_lists:
                         for suffix_feats in suffix_feats_list:
-                            if ((prefix_cat not in
-                                 self._db.prefix_suffix_compat) or
-                                (suffix_cat not in
-                                 self._db.prefix_suffix_compat[prefix_cat])):
-                                debug_message.add(
-                                    ('No prefix/suffix match with each other', 'PS0'))
-                                continue
-
-                            ignore_suffix = False
-
-                            for feat in ['enc0', 'enc1', 'enc2']:
-                                if feat not in feats:
-                                    continue
-                                if ((feats[feat] != '0' and
-                                     feat not in suffix_feats and
-                                     stem_feats.get(feat, '0') != feats[feat])
-                                    or (feat in suffix_feats and
-                                        feats[feat] != suffix_feats[feat])):
-                                    ignore_suffix = True
-                                    break
-
-                            if ignore_suffix:
-                                debug_message.add(
-                                    ('No suffix enclitic value(s) match(es) requested enclitic value(s)', 'FSE0'))
-                                continue
-
-                            merged = merge_features(self._db,
-                                                    prefix_feats, stem_feats, suffix_feats,
-                                                    variant=self._variant,
-                                                    diac_only=self._diac_only)
-
-                            ignore_analysis = False
-                            for feat in feats.keys():
-                                if (feat in merged and
-                                        merged[feat] != feats[feat]):
-                                    ignore_analysis = True
-                                    break
-
-                            if not ignore_analysis:
-                                if not debug:
-                                    analyses.append(merged)
-                                else:
-                                    analyses.append(
-                                        (merged,
-                                         prefix_cat, stem_feats['stemcat'], suffix_cat,
-                                         prefix_feats, stem_feats, suffix_feats))
-                            else:
-                                debug_message.add(
-                                    ('Merged features do not adhere to requested features', 'M0'))
-        analyses = list(analyses)
-        if analyses:
-            debug_message.add(('OK', 'OK'))
-
-        return (analyses, debug_message) if debug else analyses
+                            yield (stem_index, stem_feats, prefix_cat,
+                                   prefix_feats, suffix_cat, suffix_feats)
 
     def all_feats(self):
         """Return a set of all features provided by the database used in this
@@ -27,9 +27,10 @@
 
 from __future__ import absolute_import
 
-from collections import deque
-
 import re
+from threading import RLock
+
+from cachetools import LFUCache, cached
 
 from camel_tools.morphology.database import MorphologyDB
 from camel_tools.morphology.analyzer import Analyzer
@@ -56,6 +57,10 @@ _ANY_FEATS = frozenset(['per', 'gen', 'num', 'cas', 'stt', 'vox', 'mod',
 _LEMMA_SPLIT_RE = re.compile(u'-|_')
 
 
+def _cache_key(word, feats):
+    return (word, tuple(sorted(feats.items())))
+
+
 class Reinflector(object):
     """Morphological reinflector component.
 
@@ -63,15 +68,26 @@ class Reinflector(object):
         db (:obj:`~camel_tools.morphology.database.MorphologyDB`): Database to
             use for generation. Must be opened in reinflection mode or both
             analysis and generation modes.
+        feats (:obj:`list` of :obj:`str`, optional): If set, reinflected
+            analyses only contain these features (see
+            :obj:`~camel_tools.morphology.generator.Generator`). Defaults to
+            None.
+        cache_size (:obj:`int`, optional): If greater than zero, then the
+            reinflector will cache the reinflections of the **cache_size**
+            most frequent pairs of words and features, as well as the
+            analyses generated for the **cache_size** most frequent
+            generation requests, otherwise nothing will be cached.
+            Defaults to 0.
 
     Raises:
         :obj:`~camel_tools.morphology.errors.ReinflectorError`: If **db** is
             not an instance of
-            :obj:`~camel_tools.morphology.database.MorphologyDB` or if **db**
-            does not support reinflection.
+            :obj:`~camel_tools.morphology.database.MorphologyDB`, if **db**
+            does not support reinflection, or if **cache_size** is not an
+            integer.
     """
 
-    def __init__(self, db):
+    def __init__(self, db, feats=None, cache_size=0):
         if not isinstance(db, MorphologyDB):
             raise ReinflectorError('DB is not an instance of MorphologyDB')
         if not db.flags.generation:
@@ -79,8 +95,35 @@ class Reinflector(object):
 
         self._db = db
 
-        self._analyzer = Analyzer(db)
-        self._generator = Generator(db)
+        # Words are only analyzed for the features which are passed on to
+        # the generator
+        analyzer_feats = ['diac', 'lex'] + [feat for feat in db.defines
+                                            if feat not in _IGNORED_FEATS]
+        self._analyzer = Analyzer(db, feats=analyzer_feats)
+        self._generator = Generator(db, feats=feats)
+        self._cache = None
+        self._generation_cache = None
+        self._cache_lock = None
+
+        if isinstance(cache_size, int):
+            if cache_size > 0:
+                self._cache = LFUCache(cache_size)
+                self._generation_cache = LFUCache(cache_size)
+                self._cache_lock = RLock()
+                self.reinflect = cached(self._cache, key=_cache_key,
+                                        lock=self._cache_lock)(self.reinflect)
+        else:
+            raise ReinflectorError('Invalid cache size {}'.format(
+                                   repr(cache_size)))
+
+    def __getstate__(self):
+        # The cache is not pickled
+        state = self.__dict__.copy()
+        state.pop('reinflect', None)
+        state['_cache'] = None
+        state['_generation_cache'] = None
+        state['_cache_lock'] = None
+        return state
 
     def reinflect(self, word, feats):
         """Generate surface forms and their associated analyses for a given 
@@ -126,7 +169,9 @@ class Reinflector(object):
                 has_clitics = True
                 break
 
-        results = deque()
+        # Analyses which lead to the same generation request are only
+        # generated once, and the requests of a lemma are generated together
+        requests = {}
 
         for analysis in analyses:
             if dediac_ar(analysis['diac']) != dediac_ar(word):
@@ -163,14 +208,39 @@ class Reinflector(object):
                         generate_feats[feat] = analysis[feat]
 
             if is_valid:
-                generated = self._generator.generate(lemma, generate_feats)
-                if generated is not None:
-                    results.extend(generated)
-        
-        # TODO: Temporary fix to get unique analyses
-        results  = [dict(y) for y in set(tuple(x.items()) for x in results)]
-
-        return list(results)
+                lemma_requests = requests.setdefault(lemma, {})
+                lemma_requests.setdefault(
+                    tuple(sorted(generate_feats.items())), generate_feats)
+
+        # Generated analyses are deduplicated by their features, keeping the
+        # first occurrence
+        results = {}
+        for lemma, lemma_requests in requests.items():
+            for generated in self._generate(lemma, lemma_requests):
+                for analysis in generated:
+                    results.setdefault(tuple(analysis.items()), analysis)
+
+        return list(results.values())
+
+    def _generate(self, lemma, requests):
+        if self._generation_cache is None:
+            return self._generator.generate_paradigm(lemma, requests.values())
+
+        keys = [(lemma, request_key) for request_key in requests]
+        with self._cache_lock:
+            generations = [self._generation_cache.get(key) for key in keys]
+
+        missing = [i for i, generated in enumerate(generations)
+                   if generated is None]
+        if missing:
+            generated = self._generator.generate_paradigm(
+                lemma, [requests[keys[i][1]] for i in missing])
+            with self._cache_lock:
+                for i, generated_ in zip(missing, generated):
+                    generations[i] = generated_
+                    self._generation_cache[keys[i]] = generated_
+
+        return generations
 
     def all_feats(self):
         """Return a set of all features provided by the database used in this
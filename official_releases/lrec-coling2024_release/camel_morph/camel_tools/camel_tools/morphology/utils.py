@@ -25,8 +25,11 @@
 """Utility functions used by the various morphology components.
 """
 
-import copy
 import re
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:
+    import sre_constants, sre_parse
 import sys
 
 
@@ -37,6 +40,20 @@ _CONCAT_FEATS_NONE = frozenset(['d3tok', 'd3seg', 'atbseg', 'd2seg', 'd1seg',
                                 'd1tok', 'd2tok', 'atbtok', 'bwtok'])
 _LOGPROB_FEATS = frozenset(['pos_logprob', 'lex_logprob', 'pos_lex_logprob'])
 
+# Features of the prefix, stem, and suffix analyses (other than the feature
+# itself) read by merge_features to compute a feature
+_MERGE_DEPENDENCIES = {
+    'diac': ('diac',),
+    'stem': ('diac',),
+    'stemgloss': ('gloss',),
+    'source': ('diac',),
+    'pattern': ('diac', 'pattern'),
+    'gen': ('form_gen',),
+    'num': ('form_num',),
+    'form_gen': ('gen',),
+    'form_num': ('num',),
+}
+
 # Tokenization and segmentation schemes to which Sun letters and Fatha after 
 # Alif rewrite rules apply
 _TOK_SCHEMES_1 = frozenset(['d1tok', 'd2tok', 'atbtok', 'd1seg', 'd2seg',
@@ -143,6 +160,129 @@ _AR2CAPHI = {
 }
 
 
+def _required_chars(parsed):
+    # Characters which every match of a parsed regular expression contains
+    required = set()
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            required.add(chr(av))
+        elif op is sre_constants.SUBPATTERN:
+            # Case-insensitive groups (?i:...) may match other characters
+            if not av[1] & sre_constants.SRE_FLAG_IGNORECASE:
+                required |= _required_chars(av[-1])
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            if av[0] > 0:
+                required |= _required_chars(av[2])
+        elif op is sre_constants.BRANCH:
+            required |= set.intersection(*[_required_chars(branch)
+                                           for branch in av[1]])
+    return required
+
+
+def required_chars(pattern):
+    """Return the characters which every match of a regular expression
+    contains.
+    Args:
+        pattern (:obj:`re.Pattern`): Compiled regular expression.
+    Returns:
+        :obj:`frozenset` of :obj:`str`: The characters (possibly none) every
+        match of **pattern** contains. None are returned for case-insensitive
+        patterns since their matches may contain the other case instead.
+    """
+
+    if pattern.flags & re.IGNORECASE:
+        return frozenset()
+
+    return frozenset(_required_chars(sre_parse.parse(pattern.pattern,
+                                                     pattern.flags)))
+
+
+def _has_groupref(parsed):
+    for op, av in parsed:
+        if op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+            return True
+        if op is sre_constants.SUBPATTERN and _has_groupref(av[-1]):
+            return True
+        if (op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and
+                _has_groupref(av[2])):
+            return True
+        if op is sre_constants.BRANCH and any(map(_has_groupref, av[1])):
+            return True
+        if (op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT) and
+                _has_groupref(av[1])):
+            return True
+    return False
+
+
+class PostRegex(list):
+    """List of the POSTREGEX rewrites of a database (dictionaries with a
+    compiled 'match' pattern and a 'replace' string) which are applied in
+    order to merged diacritizations by :meth:`apply`.
+
+    Rewrites are only applied to strings which contain the characters
+    every match of their pattern contains, and the whole list is skipped
+    for strings which none of the patterns match (checked with a single
+    pattern combining all of them).
+
+    Args:
+        rewrites (:obj:`list` of :obj:`dict`): Rewrites to apply.
+    """
+
+    def __init__(self, rewrites=()):
+        super().__init__(rewrites)
+
+        self._rules = []
+        has_groupref = False
+        for rewrite in self:
+            parsed = sre_parse.parse(rewrite['match'].pattern,
+                                     rewrite['match'].flags)
+            has_groupref = has_groupref or _has_groupref(parsed)
+            required = tuple(sorted(required_chars(rewrite['match'])))
+            self._rules.append((rewrite['match'], rewrite['replace'],
+                                required))
+
+        # The patterns can't be combined if they refer to their groups
+        # by number since these change in the combined pattern, or if they
+        # were compiled with different flags.
+        flags = {rewrite['match'].flags for rewrite in self}
+        self._prefilter = None
+        if self and not has_groupref and len(flags) == 1:
+            try:
+                self._prefilter = re.compile(u'|'.join(
+                    u'(?:{})'.format(rewrite['match'].pattern)
+                    for rewrite in self), flags.pop())
+            except re.error:
+                self._prefilter = None
+
+    def apply(self, word):
+        """Apply the rewrites to a string.
+
+        Args:
+            word (:obj:`str`): String to rewrite.
+
+        Returns:
+            :obj:`str`: The rewritten string.
+        """
+
+        if self._prefilter is not None and self._prefilter.search(word) is None:
+            return word
+
+        for match, replace, required in self._rules:
+            if all(map(word.__contains__, required)):
+                word = match.sub(replace, word)
+
+        return word
+
+
+def _apply_rewrites(word, rewrites):
+    if isinstance(rewrites, PostRegex):
+        return rewrites.apply(word)
+
+    for rewrite in rewrites:
+        word = rewrite['match'].sub(rewrite['replace'], word)
+    return word
+
+
 def strip_lex(lex):
     return _STRIP_LEX_RE.split(lex)[0]
 
@@ -171,37 +311,53 @@ def normalize_tanwyn(word, mode='AF'):
     return word
 
 
+# The rewrites below are only applied to strings containing the characters
+# their patterns need to match.
+
 def rewrite_diac_camel_morph_egy(word, rewrites):
-    word = _REWRITE_DIAC_RE_CM_1.sub(u'\\1\u0651', word)
-    word = _REWRITE_DIAC_RE_CM_2.sub(u'', word)
-    word = _REWRITE_DIAC_RE_5.sub(u'', word)
-    for rewrite in rewrites:
-        word = rewrite['match'].sub(rewrite['replace'], word)
-    word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
-    word = _REWRITE_DIAC_RE_4.sub(u'\u0627', word)
-    word = _REWRITE_DIAC_RE_6.sub(u'\u0651', word)
+    if u'@' in word:
+        word = _REWRITE_DIAC_RE_CM_1.sub(u'\\1\u0651', word)
+        word = _REWRITE_DIAC_RE_CM_2.sub(u'', word)
+    if u'+' in word:
+        word = _REWRITE_DIAC_RE_5.sub(u'', word)
+    word = _apply_rewrites(word, rewrites)
+    if u'\u064e' in word:
+        word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
+    if u'\u0671' in word:
+        word = _REWRITE_DIAC_RE_4.sub(u'\u0627', word)
+    if u'\u0651\u0651' in word:
+        word = _REWRITE_DIAC_RE_6.sub(u'\u0651', word)
     return word
 
 
 def rewrite_diac_camel_morph_pal(word, rewrites):
-    word = _REWRITE_DIAC_RE_CM_1.sub(u'\\1\u0651', word)
-    word = _REWRITE_DIAC_RE_CM_2.sub(u'', word)
-    word = _REWRITE_DIAC_RE_5.sub(u'', word)
-    for rewrite in rewrites:
-        word = rewrite['match'].sub(rewrite['replace'], word)
-    word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
-    word = _REWRITE_DIAC_RE_4.sub(u'\u0627', word)
-    word = _REWRITE_DIAC_RE_6.sub(u'\u0651', word)
+    if u'@' in word:
+        word = _REWRITE_DIAC_RE_CM_1.sub(u'\\1\u0651', word)
+        word = _REWRITE_DIAC_RE_CM_2.sub(u'', word)
+    if u'+' in word:
+        word = _REWRITE_DIAC_RE_5.sub(u'', word)
+    word = _apply_rewrites(word, rewrites)
+    if u'\u064e' in word:
+        word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
+    if u'\u0671' in word:
+        word = _REWRITE_DIAC_RE_4.sub(u'\u0627', word)
+    if u'\u0651\u0651' in word:
+        word = _REWRITE_DIAC_RE_6.sub(u'\u0651', word)
     return word
 
 
 def rewrite_diac_camel_morph_msa(word, rewrites):
-    word = _REWRITE_DIAC_RE_1.sub(u'\\1\u0651', word)
-    word = _REWRITE_DIAC_RE_2.sub(u'', word)
-    word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
-    word = _REWRITE_DIAC_RE_4.sub(u'\u0627', word)
-    word = _REWRITE_DIAC_RE_5.sub(u'', word)
-    word = _REWRITE_DIAC_RE_6.sub(u'\u0651', word)
+    if u'#' in word:
+        word = _REWRITE_DIAC_RE_1.sub(u'\\1\u0651', word)
+        word = _REWRITE_DIAC_RE_2.sub(u'', word)
+    if u'\u064e' in word:
+        word = _REWRITE_DIAC_RE_3.sub(u'\u0627\\1', word)
+    if u'\u0671' in word:
+        word = _REWRITE_DIAC_RE_4.sub(u'\u0627', word)
+    if u'+' in word:
+        word = _REWRITE_DIAC_RE_5.sub(u'', word)
+    if u'\u0651\u0651' in word:
+        word = _REWRITE_DIAC_RE_6.sub(u'\u0651', word)
 
     return word
 
@@ -243,12 +399,49 @@ def rewrite_pattern(word):
     return word
 
 
+def merge_dependencies(feats):
+    """Return the features which the prefix, stem, and suffix analyses
+    must provide for :func:`merge_features` to compute a given set of
+    features.
+    Args:
+        feats (iterable of :obj:`str`): Features to compute.
+    Returns:
+        :obj:`frozenset` of :obj:`str`: The features in **feats** and the
+        features they are computed from.
+    """
+
+    deps = set(feats)
+    for feat in feats:
+        deps.update(_MERGE_DEPENDENCIES.get(feat, ()))
+        if feat in _CONCAT_FEATS_NONE:
+            deps.add('diac')
+    return frozenset(deps)
+
+
 def merge_features(db,
                    prefix_feats, stem_feats, suffix_feats,
                    diac_mode="AF",
                    variant='msa',
-                   diac_only=False):
-    result = copy.copy(stem_feats)
+                   diac_only=False,
+                   feats=None):
+    # Only the requested features are computed, skipping the joins and
+    # rewrites of the others
+    if feats is not None:
+        result = {}
+        for feat in feats:
+            try:
+                result[feat] = merge_feature(db,
+                                             prefix_feats, stem_feats,
+                                             suffix_feats, feat,
+                                             diac_mode=diac_mode,
+                                             variant=variant)
+            except KeyError:
+                continue
+        return result
+
+    # Stem analyses stored as AnalysisRecord objects are materialized here
+    stem_feats = stem_feats.copy()
+    result = stem_feats.copy()
     
     if diac_only:
         for stem_feat in stem_feats:
@@ -350,6 +543,130 @@ def merge_features(db,
     return result
 
 
+def _merge_base_feature(prefix_feats, stem_feats, suffix_feats, feat):
+    value = stem_feats[feat]
+
+    suffix_feat_val = suffix_feats.get(feat, '')
+    if suffix_feat_val != '-' and suffix_feat_val != '':
+        value = suffix_feat_val
+
+    prefix_feat_val = prefix_feats.get(feat, '')
+    if prefix_feat_val != '-' and prefix_feat_val != '':
+        value = prefix_feat_val
+
+    return value
+
+
+def _merge_concat_feature(prefix_feats, stem_feats, suffix_feats, feat):
+    return u'+'.join([x for x in [
+        prefix_feats.get(feat, ''),
+        stem_feats.get(feat, ''),
+        suffix_feats.get(feat, '')] if len(x) > 0])
+
+
+def _merge_concat_none_feature(prefix_feats, stem_feats, suffix_feats, feat):
+    return u'{}{}{}'.format(
+        prefix_feats.get(feat, ''),
+        stem_feats.get(feat, stem_feats.get('diac', '')),
+        suffix_feats.get(feat, ''))
+
+
+def merge_feature(db,
+                  prefix_feats, stem_feats, suffix_feats,
+                  feat,
+                  diac_mode="AF",
+                  variant='msa'):
+    """Compute a single feature of the analysis that :func:`merge_features`
+    would return for the same arguments, without computing the others.
+    Args:
+        db (:obj:`~camel_tools.morphology.database.MorphologyDB`): Database
+            the analyses are from.
+        prefix_feats (:obj:`dict`): Prefix analysis.
+        stem_feats (:obj:`dict`): Stem analysis.
+        suffix_feats (:obj:`dict`): Suffix analysis.
+        feat (:obj:`str`): Feature to compute.
+        diac_mode (:obj:`str`, optional): Tanwyn normalization mode.
+            Defaults to 'AF'.
+        variant (:obj:`str`, optional): Variant of the diac rewrite rules.
+            Defaults to 'msa'.
+    Returns:
+        The value of the feature.
+    Raises:
+        :obj:`KeyError`: If the merged analysis doesn't have the feature.
+    """
+
+    # Checked in the reverse order of the steps of merge_features since later
+    # steps override the values of earlier ones.
+    if feat in _LOGPROB_FEATS and feat in db.defines:
+        if feat in stem_feats:
+            return float(_merge_base_feature(prefix_feats, stem_feats,
+                                             suffix_feats, feat))
+        return float(-99.0)
+
+    if feat == 'pattern' and 'pattern' in db.compute_feats:
+        return rewrite_pattern(u'{}{}{}'.format(
+            prefix_feats.get('diac', ''),
+            stem_feats.get('pattern', stem_feats.get('diac', '')),
+            suffix_feats.get('diac', '')))
+
+    if feat in ('gen', 'num') and 'form_{}'.format(feat) in db.defines:
+        value = _merge_base_feature(prefix_feats, stem_feats, suffix_feats,
+                                    feat)
+        if value == '-':
+            value = _merge_base_feature(prefix_feats, stem_feats,
+                                        suffix_feats, 'form_{}'.format(feat))
+        return value
+
+    if feat == 'caphi' and 'caphi' in db.defines:
+        return rewrite_caphi(_merge_concat_feature(prefix_feats, stem_feats,
+                                                   suffix_feats, 'caphi'))
+
+    if ((feat in _TOK_SCHEMES_1 or feat in _TOK_SCHEMES_2) and
+            feat in db.defines):
+        value = _merge_concat_none_feature(prefix_feats, stem_feats,
+                                           suffix_feats, feat)
+        if feat in _TOK_SCHEMES_1:
+            value = rewrite_tok_1(value)
+        if feat in _TOK_SCHEMES_2:
+            value = rewrite_tok_2(value)
+        return value
+
+    if feat == 'diac':
+        if 'diac' in db.defines:
+            value = _merge_concat_feature(prefix_feats, stem_feats,
+                                          suffix_feats, 'diac')
+        else:
+            value = _merge_base_feature(prefix_feats, stem_feats,
+                                        suffix_feats, 'diac')
+        rewrite_fn = globals()[f'rewrite_diac_camel_morph_{variant}']
+        return normalize_tanwyn(rewrite_fn(value, db.postregex), diac_mode)
+
+    if feat == 'stem':
+        return stem_feats.get('diac')
+
+    if feat == 'stemgloss':
+        return stem_feats.get('gloss', '')
+
+    if feat in _CONCAT_FEATS_NONE and feat in db.defines:
+        return _merge_concat_none_feature(prefix_feats, stem_feats,
+                                          suffix_feats, feat)
+
+    if feat in _CONCAT_FEATS and feat in db.defines:
+        return _merge_concat_feature(prefix_feats, stem_feats, suffix_feats,
+                                     feat)
+
+    if feat in _JOIN_FEATS and feat in db.defines:
+        feat_vals = [
+            prefix_feats.get(feat, None),
+            stem_feats.get(feat, None),
+            suffix_feats.get(feat, None)
+        ]
+        return u'+'.join([fv for fv in feat_vals
+                          if fv is not None and fv != ''])
+
+    return _merge_base_feature(prefix_feats, stem_feats, suffix_feats, feat)
+
+
 def feat_prettyprint(feats, order, default='', file=sys.stdout):
     for feat in order:
         feat_value = repr(feats.get(feat, default))
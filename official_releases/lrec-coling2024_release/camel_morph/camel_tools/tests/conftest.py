@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# MIT License
+#
+# Copyright 2018-2021 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Fixtures shared by the tests of camel_tools.morphology, on the test databases
+of the release.
+"""
+
+from __future__ import absolute_import
+
+import os
+
+import pytest
+
+from camel_tools.morphology.database import MorphologyDB
+from camel_tools.morphology.analyzer import Analyzer
+from camel_tools.morphology.generator import Generator
+from camel_tools.utils.dediac import dediac_ar
+
+
+DB_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))),
+    'databases', 'camel-morph-msa')
+# A verb, a noun and a preposition database with one lemma each
+DB_NAMES = ['XYZ_msa_ramaY_v1.0.db', 'XYZ_msa_safiyr_v1.0.db',
+            'XYZ_msa_EalaY_v1.0.db']
+# Feature lists to project analyses on, including features merged from others
+# and features which are missing from the analyses
+PROJECTED_FEATS = [['diac', 'lex', 'pos'],
+                   ['bw', 'gen', 'num', 'stemgloss', 'stt'],
+                   ['d3tok', 'atbtok', 'caphi', 'enc0', 'prc1'],
+                   ['pos_lex_logprob', 'ud', 'catib6', 'stem', 'diac']]
+
+
+@pytest.fixture(scope='session')
+def verb_db_fpath():
+    """Path of the verb test database.
+    """
+
+    return os.path.join(DB_DIR, DB_NAMES[0])
+
+
+@pytest.fixture(scope='module', params=DB_NAMES)
+def db_fpath(request):
+    """Path of each of the test databases.
+    """
+
+    return os.path.join(DB_DIR, request.param)
+
+
+@pytest.fixture(params=PROJECTED_FEATS)
+def projected_feats(request):
+    """Each of the feature lists to project analyses on.
+    """
+
+    return request.param
+
+
+@pytest.fixture(scope='module')
+def db_words(db_fpath):
+    """Test database, and the words with analyses among the forms of its
+    lemmas with the prefixes or suffixes of the database.
+    """
+
+    db = MorphologyDB(db_fpath, 'r', use_compiled=False)
+    generator = Generator(db)
+    forms = set()
+    for lemma, analyses in db.lemma_hash.items():
+        for analysis in generator.generate(lemma, {'pos': analyses[0]['pos']}):
+            forms.add(dediac_ar(analysis['diac']))
+    words = ({prefix + form for form in forms for prefix in db.prefix_hash} |
+             {form + suffix for form in forms for suffix in db.suffix_hash})
+    analyzer = Analyzer(db)
+    return db, [word for word in sorted(words) if analyzer.analyze(word)]
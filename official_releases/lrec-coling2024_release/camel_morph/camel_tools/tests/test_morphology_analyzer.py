@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+# MIT License
+#
+# Copyright 2018-2021 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Tests for camel_tools.morphology.analyzer
+"""
+
+from __future__ import absolute_import
+
+import pickle
+
+import pytest
+
+from camel_tools.morphology.database import MorphologyDB
+from camel_tools.morphology.analyzer import Analyzer, LazyAnalysis
+
+
+
+
+@pytest.fixture(scope='module')
+def db(verb_db_fpath):
+    return MorphologyDB(verb_db_fpath, 'a', use_compiled=False)
+
+
+@pytest.fixture(scope='module')
+def words(db):
+    # Combinations of some prefixes, stems and suffixes of the database, some
+    # of which are repeated or only differ in their diacritics
+    prefixes = sorted(db.prefix_hash)[:4]
+    stems = sorted(db.stem_hash)[:25]
+    suffixes = sorted(db.suffix_hash)[:8]
+    words = [prefix + stem + suffix for prefix in prefixes for stem in stems
+             for suffix in suffixes]
+    return words + words[:50] + [word + u'َ' for word in words[:50]]
+
+
+def _project(analysis, feats):
+    return {feat: analysis[feat] for feat in feats if feat in analysis}
+
+
+class TestAnalyzeBatch(object):
+    """Test class for testing Analyzer.analyze_batch.
+    """
+
+    def test_in_process(self, db, words):
+        """Test that batch analysis gives the same analyses as analyzing each
+        word.
+        """
+
+        analyzer = Analyzer(db)
+
+        assert analyzer.analyze_batch(words) == list(map(analyzer.analyze,
+                                                         words))
+        stats = analyzer.batch_stats()
+        assert stats.tokens == len(words)
+        assert stats.types == stats.misses
+        assert stats.types <= len(words) - 100
+
+    @pytest.mark.parametrize('processes', [2, None])
+    def test_workers(self, db, words, processes):
+        """Test that batch analysis by worker processes gives the same
+        analyses as analyzing each word.
+        """
+
+        analyzer = Analyzer(db)
+
+        assert (analyzer.analyze_batch(words, processes=processes) ==
+                list(map(analyzer.analyze, words)))
+
+    def test_cache(self, db, words):
+        """Test that the words analyzed in a batch are cached.
+        """
+
+        analyzer = Analyzer(db, cache_size=100000)
+        analyzer.analyze_batch(words, processes=2)
+        analyzer.reset_batch_stats()
+
+        assert (analyzer.analyze_batch(words, processes=2) ==
+                list(map(analyzer.analyze, words)))
+        assert analyzer.batch_stats().misses == 0
+
+
+class TestLazyAnalysis(object):
+    """Test class for testing the analyses of the lazy mode of Analyzer.
+    """
+
+    def test_features(self, db_words):
+        """Test that the features of lazy analyses, accessed one at a time,
+        have the same values as in the full analyses.
+        """
+
+        db, words = db_words
+        analyzer = Analyzer(db)
+        lazy_analyzer = Analyzer(db, lazy=True)
+
+        for word in words:
+            analyses = analyzer.analyze(word)
+            lazy_analyses = lazy_analyzer.analyze(word)
+            assert len(lazy_analyses) == len(analyses)
+            for lazy_analysis, analysis in zip(lazy_analyses, analyses):
+                assert isinstance(lazy_analysis, LazyAnalysis)
+                assert 'nofeat' not in lazy_analysis
+                for feat in reversed(list(analysis)):
+                    assert feat in lazy_analysis
+                    assert lazy_analysis[feat] == analysis[feat]
+
+    def test_complete(self, db_words):
+        """Test that complete lazy analyses are the same dictionaries, with
+        features in the same order, as the full analyses.
+        """
+
+        db, words = db_words
+        analyzer = Analyzer(db)
+        lazy_analyzer = Analyzer(db, lazy=True)
+
+        for word in words:
+            analyses = analyzer.analyze(word)
+            lazy_analyses = lazy_analyzer.analyze(word)
+            assert pickle.loads(pickle.dumps(lazy_analyses)) == analyses
+            for lazy_analysis, analysis in zip(lazy_analyses, analyses):
+                assert lazy_analysis.copy() == analysis
+                assert list(lazy_analysis) == list(analysis)
+                assert len(lazy_analysis) == len(analysis)
+
+    def test_update(self, db_words):
+        """Test that features set or deleted before or after the analysis is
+        complete are updated as in the full analyses.
+        """
+
+        db, words = db_words
+        word = words[0]
+        analysis = Analyzer(db).analyze(word)[0]
+        analysis['diac'] = u'x'
+        analysis['nofeat'] = u'y'
+        del analysis['pos']
+
+        lazy_analysis = Analyzer(db, lazy=True).analyze(word)[0]
+        lazy_analysis['diac'] = u'x'
+        lazy_analysis['nofeat'] = u'y'
+        assert lazy_analysis['diac'] == u'x'
+        del lazy_analysis['pos']
+        assert 'pos' not in lazy_analysis
+        assert lazy_analysis.copy() == analysis
+
+
+class TestProjection(object):
+    """Test class for testing the analyses of Analyzer projected on a list of
+    features.
+    """
+
+    @pytest.mark.parametrize('lazy', [False, True])
+    def test_analyze(self, db_words, projected_feats, lazy):
+        """Test that projected analyses have the same values, in the same
+        order, as the full analyses for the projected features.
+        """
+
+        db, words = db_words
+        analyzer = Analyzer(db)
+        projected_analyzer = Analyzer(db, feats=projected_feats, lazy=lazy)
+
+        for word in words:
+            analyses = [_project(analysis, projected_feats)
+                        for analysis in analyzer.analyze(word)]
+            projected_analyses = projected_analyzer.analyze(word)
+            assert ([dict(analysis) for analysis in projected_analyses] ==
+                    analyses)
+            assert ([list(analysis) for analysis in projected_analyses] ==
+                    [list(analysis) for analysis in analyses])
+
+    def test_restricted_db(self, db_fpath, db_words, projected_feats):
+        """Test that projected analyses of a database restricted to the
+        projected features are the same as the projected analyses of the full
+        database.
+        """
+
+        db, words = db_words
+        restricted_db = MorphologyDB(db_fpath, 'a', use_compiled=False,
+                                     feats=projected_feats)
+        analyzer = Analyzer(db, feats=projected_feats)
+        restricted_analyzer = Analyzer(restricted_db, feats=projected_feats)
+
+        for word in words:
+            assert restricted_analyzer.analyze(word) == analyzer.analyze(word)
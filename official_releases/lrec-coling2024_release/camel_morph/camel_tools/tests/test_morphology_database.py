@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+# MIT License
+#
+# Copyright 2018-2021 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Tests for camel_tools.morphology.database
+"""
+
+from __future__ import absolute_import
+
+import os
+import pickle
+import shutil
+
+import pytest
+
+from camel_tools.morphology import database
+from camel_tools.morphology.database import MorphologyDB, SharedMapping
+from camel_tools.morphology.database import AnalysisRecord
+from camel_tools.morphology.database import SmartBackoffBucket
+from camel_tools.morphology.database import SmartBackoffPattern
+from camel_tools.morphology.analyzer import Analyzer
+from camel_tools.morphology.utils import strip_lex
+
+
+@pytest.fixture
+def db_path(tmp_path, verb_db_fpath):
+    """Copy of the test database, next to which compiled and shared files can
+    be written.
+    """
+
+    db_path = str(tmp_path / os.path.basename(verb_db_fpath))
+    shutil.copy(verb_db_fpath, db_path)
+    return db_path
+
+
+def _words(db):
+    # Combinations of some prefixes, stems and suffixes of the database
+    prefixes = sorted(db.prefix_hash)[:4]
+    stems = sorted(db.stem_hash)[:25]
+    suffixes = sorted(db.suffix_hash)[:8]
+    return [prefix + stem + suffix for prefix in prefixes for stem in stems
+            for suffix in suffixes]
+
+
+def _pattern(match_re):
+    return SmartBackoffPattern(match_re, [('N', {'diac': u'\\1a',
+                                                 'bw': u'\\1/NOUN',
+                                                 'lex': u'\\1',
+                                                 'root': u'\\1'})])
+
+
+class TestSmartBackoffBucket(object):
+    """Test class for testing SmartBackoffBucket.
+    """
+
+    def test_candidates(self):
+        """Test that only the patterns which may match a stem are returned,
+        in database order.
+        """
+
+        patterns = [_pattern(u'^a(b)$'), _pattern(u'^c(d)$'),
+                    _pattern(u'^(.)$')]
+        bucket = SmartBackoffBucket(patterns)
+
+        assert bucket.candidates(u'ab') == [patterns[0], patterns[2]]
+        assert bucket.candidates(u'cd') == [patterns[1], patterns[2]]
+
+    def test_candidates_ignorecase(self):
+        """Test that case-insensitive patterns are returned for stems in the
+        other case.
+        """
+
+        patterns = [_pattern(u'(?i)^a(b)$'), _pattern(u'^c(d)$')]
+        bucket = SmartBackoffBucket(patterns)
+
+        assert bucket.candidates(u'AB') == [patterns[0]]
+        assert patterns[0].concrete_analyses(u'AB') == [
+            ('N', {'diac': u'Ba', 'bw': u'B/NOUN', 'lex': u'B', 'root': u'B'})]
+
+
+class TestCompiledDB(object):
+    """Test class for testing compiled databases.
+    """
+
+    def test_compiled_analyses(self, db_path):
+        """Test that a compiled database is loaded through shared mappings and
+        gives the same analyses as the text database.
+        """
+
+        db = MorphologyDB(db_path, 'a', use_compiled=False)
+        compiled_path = MorphologyDB.compile(db_path)
+        compiled_db = MorphologyDB(db_path, 'a')
+
+        assert os.path.exists(compiled_path)
+        assert isinstance(compiled_db.stem_hash, SharedMapping)
+        assert len(compiled_db.stem_hash) == len(db.stem_hash)
+        analyzer = Analyzer(db)
+        compiled_analyzer = Analyzer(compiled_db)
+        for word in _words(db):
+            assert compiled_analyzer.analyze(word) == analyzer.analyze(word)
+
+    def test_compiled_outdated(self, db_path):
+        """Test that a compiled database which is out of date with the text
+        database is not loaded.
+        """
+
+        MorphologyDB.compile(db_path)
+        # Repeating a compatibility line changes the file but not the database
+        with open(db_path, encoding='utf-8') as f:
+            last_line = f.read().rstrip('\n').split('\n')[-1]
+        with open(db_path, 'a', encoding='utf-8') as f:
+            f.write(last_line + '\n')
+
+        assert isinstance(MorphologyDB(db_path, 'a').stem_hash, dict)
+
+    def test_compiled_flags(self, db_path):
+        """Test that databases are only loaded from the compiled file if it
+        was compiled for their flags.
+        """
+
+        MorphologyDB.compile(db_path, flags_list=('a',))
+
+        assert isinstance(MorphologyDB(db_path, 'a').stem_hash, SharedMapping)
+        assert isinstance(MorphologyDB(db_path, 'g').lemma_hash, dict)
+
+
+class TestSharedDB(object):
+    """Test class for testing shared databases.
+    """
+
+    def test_shared_files(self, db_path):
+        """Test that the shared file is written without leaving temporary
+        files behind.
+        """
+
+        with MorphologyDB(db_path, 'a', shared=True) as db:
+            assert isinstance(db.stem_hash, SharedMapping)
+
+        assert sorted(os.listdir(os.path.dirname(db_path))) == [
+            os.path.basename(db_path), os.path.basename(db_path) + '.a.shm']
+
+    def test_close(self, db_path):
+        """Test that closing a database unmaps its files, once they are not
+        used by another database.
+        """
+
+        MorphologyDB.compile(db_path)
+        db = MorphologyDB(db_path, 'a')
+        other_db = MorphologyDB(db_path, 'a')
+        mapped = [key for key in database._SHARED_DB_FILES
+                  if key[0] == MorphologyDB.compiled_path(db_path)]
+        assert len(mapped) == 1
+
+        db.close()
+        db.close()
+        assert mapped[0] in database._SHARED_DB_FILES
+        with pytest.raises(ValueError):
+            db.stem_hash[next(iter(other_db.stem_hash))]
+
+        other_db.close()
+        assert mapped[0] not in database._SHARED_DB_FILES
+
+    def test_close_parsed(self, db_path):
+        """Test that closing a database parsed from its text file has no
+        effect.
+        """
+
+        with MorphologyDB(db_path, 'a') as db:
+            pass
+
+        assert Analyzer(db).analyze(sorted(db.stem_hash)[0])
+
+
+def _stem_entries(db_path):
+    # (stem, category, analysis) of the lines of the STEMS section of a
+    # database file
+    with open(db_path, encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    start = lines.index('###STEMS###') + 1
+    end = min(lines.index(section) for section in ('###SMARTBACKOFF###',
+                                                   '###TABLE AB###')
+              if section in lines)
+    for line in lines[start:end]:
+        stem, category, analysis = line.split(u'\t')
+        yield stem, category, dict(tok.split(u':', 1)
+                                   for tok in analysis.split(u' ') if tok)
+
+
+class TestAnalysisRecord(object):
+    """Test class for testing the AnalysisRecord objects of databases.
+    """
+
+    def test_stem_records(self, db_fpath):
+        """Test that the stem records of a database give the same features,
+        in the same order, as the analyses of its STEMS section.
+        """
+
+        db = MorphologyDB(db_fpath, 'r', use_compiled=False)
+        stem_records = {stem: iter(analyses)
+                        for stem, analyses in db.stem_hash.items()}
+        lemma_records = {lemma: iter(analyses)
+                         for lemma, analyses in db.lemma_hash.items()}
+
+        count = 0
+        for stem, category, analysis in _stem_entries(db_fpath):
+            analysis['lex'] = strip_lex(analysis['lex'])
+            analysis['stemcat'] = category
+            stem_category, record = next(stem_records[stem])
+
+            assert isinstance(record, AnalysisRecord)
+            assert stem_category == category
+            assert list(record.items()) == list(analysis.items())
+            assert record.copy() == analysis
+            assert len(record) == len(analysis)
+            assert all(record[feat] == value and record.get(feat) == value
+                       for feat, value in analysis.items())
+            assert record.get('nofeat') is None and 'nofeat' not in record
+            assert pickle.loads(pickle.dumps(record)).copy() == analysis
+            assert next(lemma_records[analysis['lex']]) is record
+            count += 1
+
+        assert count > 0
+        assert all(next(records, None) is None
+                   for records in stem_records.values())
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+# MIT License
+#
+# Copyright 2018-2021 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Tests for camel_tools.morphology.generator
+"""
+
+from __future__ import absolute_import
+
+import pytest
+
+from camel_tools.morphology.database import MorphologyDB
+from camel_tools.morphology.database import PROCLITIC_FEATS, ENCLITIC_FEATS
+from camel_tools.morphology.generator import Generator
+from camel_tools.morphology.utils import merge_features
+
+
+# Features of the generated analyses which are requested
+BUNDLE_FEATS = ('pos', 'asp', 'per', 'gen', 'num', 'vox', 'mod', 'stt', 'cas')
+
+
+def _generate_unfiltered(db, lemma, feats):
+    # Generation by trying every combination of the stems of the lemma with
+    # the affixes of compatible categories, as done before the generator
+    # indexed the clitic values of the affix categories
+    feats = dict(feats)
+    default = db.defaults[feats['pos']]
+    if not frozenset(feats).issubset(frozenset(default)):
+        return []
+    for feat in PROCLITIC_FEATS + ENCLITIC_FEATS:
+        if feat not in feats and feat in default:
+            feats[feat] = default[feat]
+
+    analyses = []
+    for stem_feats in db.lemma_hash[lemma]:
+        if any(feat in feats and stem_feats[feat] != feats[feat]
+               for feat in ('vox', 'rat', 'pos')):
+            continue
+        if any(feat in feats and feat in stem_feats and
+               stem_feats[feat] != '0' and feats[feat] != stem_feats[feat]
+               for feat in PROCLITIC_FEATS + ENCLITIC_FEATS):
+            continue
+
+        stem_cat = stem_feats['stemcat']
+        for prefix_cat in db.stem_prefix_compat[stem_cat]:
+            for prefix_feats in db.prefix_cat_hash.get(prefix_cat, []):
+                if any((feats[feat] != '0' and feat not in prefix_feats and
+                        stem_feats.get(feat, '0') != feats[feat]) or
+                       (feat in prefix_feats and
+                        feats[feat] != prefix_feats[feat])
+                       for feat in PROCLITIC_FEATS if feat in feats):
+                    continue
+                for suffix_cat in db.stem_suffix_compat[stem_cat]:
+                    if suffix_cat not in db.prefix_suffix_compat.get(
+                            prefix_cat, ()):
+                        continue
+                    for suffix_feats in db.suffix_cat_hash.get(suffix_cat,
+                                                               []):
+                        if any((feats[feat] != '0' and
+                                feat not in suffix_feats and
+                                stem_feats.get(feat, '0') != feats[feat]) or
+                               (feat in suffix_feats and
+                                feats[feat] != suffix_feats[feat])
+                               for feat in ENCLITIC_FEATS if feat in feats):
+                            continue
+                        merged = merge_features(db, prefix_feats, stem_feats,
+                                                suffix_feats)
+                        if all(feat not in merged or merged[feat] == value
+                               for feat, value in feats.items()):
+                            analyses.append(merged)
+
+    return analyses
+
+
+def _valid(db, feats):
+    return all(db.defines[feat] is None or value in db.defines[feat]
+               for feat, value in feats.items())
+
+
+@pytest.fixture(scope='module')
+def db_bundles(db_fpath):
+    """Test database, and feature sets to generate for each of its lemmas:
+    the features of the analyses generated for the POS of the lemma, alone and
+    with the clitics of the affixes of the database or other clitic values.
+    """
+
+    db = MorphologyDB(db_fpath, 'g', use_compiled=False)
+    generator = Generator(db)
+
+    proclitics, enclitics = {}, {}
+    for cat_hash, clitic_feats, clitics in (
+            (db.prefix_cat_hash, PROCLITIC_FEATS, proclitics),
+            (db.suffix_cat_hash, ENCLITIC_FEATS, enclitics)):
+        for analyses in cat_hash.values():
+            for analysis in analyses:
+                clitic_values = {feat: analysis[feat] for feat in clitic_feats
+                                 if feat in analysis}
+                clitics.setdefault(tuple(sorted(clitic_values.items())),
+                                   clitic_values)
+    # Clitic values which no affix may have
+    for feat in ('prc1', 'enc0'):
+        for value in sorted(db.defines[feat])[:4]:
+            clitics = proclitics if feat in PROCLITIC_FEATS else enclitics
+            clitics.setdefault(((feat, value),), {feat: value})
+
+    lemma_bundles = {}
+    for lemma, analyses in db.lemma_hash.items():
+        bases = {}
+        pos = analyses[0]['pos']
+        for analysis in generator.generate(lemma, {'pos': pos}):
+            base = {feat: analysis[feat] for feat in BUNDLE_FEATS
+                    if feat in analysis}
+            bases.setdefault(tuple(sorted(base.items())), base)
+        bundles = [{'pos': pos}]
+        for base in list(bases.values())[:3]:
+            bundles.append(base)
+            for clitics in (list(proclitics.values()) +
+                            list(enclitics.values())):
+                bundles.append(dict(base, **clitics))
+        lemma_bundles[lemma] = [bundle for bundle in bundles
+                                if _valid(db, bundle)]
+
+    return db, lemma_bundles
+
+
+class TestGenerate(object):
+    """Test class for testing Generator.generate.
+    """
+
+    def test_clitic_filters(self, db_bundles):
+        """Test that generation from the affixes filtered on their clitic
+        values gives the same analyses, in the same order, as trying every
+        affix of the compatible categories.
+        """
+
+        db, lemma_bundles = db_bundles
+        generator = Generator(db)
+
+        count = 0
+        for lemma, bundles in lemma_bundles.items():
+            for feats in bundles:
+                analyses = _generate_unfiltered(db, lemma, feats)
+                assert generator.generate(lemma, feats) == analyses
+                count += len(analyses)
+        assert count > 0
+
+    def test_debug(self, db_bundles):
+        """Test that generation with debug messages gives the same analyses.
+        """
+
+        db, lemma_bundles = db_bundles
+        generator = Generator(db)
+
+        for lemma, bundles in lemma_bundles.items():
+            for feats in bundles:
+                analyses, debug_message = generator.generate(lemma, feats,
+                                                             debug=True)
+                assert ([analysis[0] for analysis in analyses] ==
+                        generator.generate(lemma, feats))
+                assert (('OK', 'OK') in debug_message) == bool(analyses)
+
+    def test_projected(self, db_bundles, projected_feats):
+        """Test that generation projected on a list of features gives the
+        values, in the same order, of the full analyses for these features.
+        """
+
+        db, lemma_bundles = db_bundles
+        generator = Generator(db)
+        projected_generator = Generator(db, feats=projected_feats)
+
+        for lemma, bundles in lemma_bundles.items():
+            for feats in bundles:
+                analyses = [{feat: analysis[feat] for feat in projected_feats
+                             if feat in analysis}
+                            for analysis in generator.generate(lemma, feats)]
+                projected_analyses = projected_generator.generate(lemma, feats)
+                assert projected_analyses == analyses
+                assert ([list(analysis) for analysis in projected_analyses] ==
+                        [list(analysis) for analysis in analyses])
+
+
+class TestGenerateParadigm(object):
+    """Test class for testing Generator.generate_paradigm.
+    """
+
+    def test_per_slot(self, db_bundles):
+        """Test that generating all the feature sets of a lemma at once gives
+        the same analyses as generating each of them.
+        """
+
+        db, lemma_bundles = db_bundles
+        generator = Generator(db)
+
+        for lemma, bundles in lemma_bundles.items():
+            assert generator.generate_paradigm(lemma, bundles) == [
+                generator.generate(lemma, feats) for feats in bundles]
+
+    def test_per_slot_projected(self, db_bundles):
+        """Test that generating all the feature sets of a lemma at once with
+        projected features gives the same analyses as generating each of them.
+        """
+
+        db, lemma_bundles = db_bundles
+        generator = Generator(db, feats=['diac', 'lex', 'asp', 'enc0'])
+
+        for lemma, bundles in lemma_bundles.items():
+            assert generator.generate_paradigm(lemma, bundles) == [
+                generator.generate(lemma, feats) for feats in bundles]
+
+    def test_debug(self, db_bundles):
+        """Test that generating all the feature sets of a lemma at once with
+        debug messages gives the same analyses and messages as generating
+        each of them.
+        """
+
+        db, lemma_bundles = db_bundles
+        generator = Generator(db)
+
+        for lemma, bundles in lemma_bundles.items():
+            assert generator.generate_paradigm(lemma, bundles, debug=True) == [
+                generator.generate(lemma, feats, debug=True)
+                for feats in bundles]
+
+    def test_unknown_lemma(self, db_bundles):
+        """Test that nothing is generated for unknown lemmas.
+        """
+
+        db, lemma_bundles = db_bundles
+        bundles = next(iter(lemma_bundles.values()))[:3]
+
+        assert Generator(db).generate_paradigm(u'x', bundles) == [[], [], []]
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+# MIT License
+#
+# Copyright 2018-2021 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Tests for camel_tools.morphology.reinflector
+"""
+
+from __future__ import absolute_import
+
+import pytest
+
+from camel_tools.morphology.analyzer import Analyzer
+from camel_tools.morphology.generator import Generator
+from camel_tools.morphology import reinflector as reinflector_module
+from camel_tools.morphology.reinflector import Reinflector
+from camel_tools.utils.dediac import dediac_ar
+
+
+REINFLECTION_FEATS = [{}, {'num': 'p'}, {'gen': 'f', 'num': 'd'},
+                      {'asp': 'i', 'per': '1'}, {'per': 'ANY'},
+                      {'stt': 'd'}, {'cas': 'g'}, {'enc0': '3ms_dobj'},
+                      {'enc0': '3ms_poss'}, {'prc2': 'wa_conj'},
+                      {'prc1': 'bi_prep', 'num': 'p'}, {'mod': 'j'}]
+
+
+def _reinflect_ungrouped(db, word, feats):
+    # Reinflection generating each analysis of the word separately, as done
+    # before the reinflector grouped the generation requests of a lemma
+    module = reinflector_module
+    generator = Generator(db)
+    has_clitics = any(feat in feats for feat in module._CLITIC_FEATS)
+    results = {}
+
+    for analysis in Analyzer(db).analyze(word):
+        if dediac_ar(analysis['diac']) != dediac_ar(word):
+            continue
+        if 'pos' in feats and feats['pos'] != analysis['pos']:
+            continue
+        lemma = module._LEMMA_SPLIT_RE.split(analysis['lex'])[0]
+        if 'lex' in feats and feats['lex'] != lemma:
+            continue
+
+        is_valid = True
+        generate_feats = {}
+        for feat, value in analysis.items():
+            if (feat in module._IGNORED_FEATS or
+                    (feat in module._SPECIFIED_FEATS and feat not in feats) or
+                    (has_clitics and feat in module._CLITIC_IGNORED_FEATS)):
+                continue
+            if feat in feats:
+                if feats[feat] == 'ANY':
+                    continue
+                elif value != 'na':
+                    generate_feats[feat] = feats[feat]
+                else:
+                    is_valid = False
+                    break
+            elif value != 'na':
+                generate_feats[feat] = value
+
+        if is_valid:
+            for generated in generator.generate(lemma, generate_feats):
+                results.setdefault(tuple(generated.items()), generated)
+
+    return list(results.values())
+
+
+@pytest.fixture(scope='module')
+def db_some_words(db_words):
+    """Test database, and every fourth of its words, which keeps forms with
+    and without clitics.
+    """
+
+    db, words = db_words
+    return db, words[::4]
+
+
+def _feats(db):
+    return [feats for feats in REINFLECTION_FEATS
+            if all(value == 'ANY' or value in db.defines[feat]
+                   for feat, value in feats.items())]
+
+
+class TestReinflect(object):
+    """Test class for testing Reinflector.reinflect.
+    """
+
+    def test_ungrouped(self, db_some_words):
+        """Test that reinflection gives the same analyses, in the same order,
+        as generating each analysis of the word separately.
+        """
+
+        db, words = db_some_words
+        reinflector = Reinflector(db)
+
+        count = 0
+        for word in words:
+            for feats in _feats(db):
+                analyses = _reinflect_ungrouped(db, word, feats)
+                assert reinflector.reinflect(word, feats) == analyses
+                count += len(analyses)
+        assert count > 0
+
+    def test_cache(self, db_some_words):
+        """Test that reinflection with cached generation requests gives the
+        same analyses, including for requests cached by other words.
+        """
+
+        db, words = db_some_words
+        reinflector = Reinflector(db)
+        cached_reinflector = Reinflector(db, cache_size=10000)
+
+        for _ in range(2):
+            for word in words:
+                for feats in _feats(db):
+                    assert (cached_reinflector.reinflect(word, feats) ==
+                            reinflector.reinflect(word, feats))
+
+    def test_projected(self, db_some_words, projected_feats):
+        """Test that reinflection projected on a list of features gives the
+        full reinflections projected on these features, without duplicates.
+        """
+
+        db, words = db_some_words
+        reinflector = Reinflector(db)
+        projected_reinflector = Reinflector(db, feats=projected_feats)
+
+        for word in words:
+            for feats in _feats(db):
+                analyses = {}
+                for analysis in reinflector.reinflect(word, feats):
+                    projected = {feat: analysis[feat]
+                                 for feat in projected_feats
+                                 if feat in analysis}
+                    analyses.setdefault(tuple(projected.items()), projected)
+                assert (projected_reinflector.reinflect(word, feats) ==
+                        list(analyses.values()))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+# MIT License
+#
+# Copyright 2018-2021 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Tests for camel_tools.morphology.utils
+"""
+
+from __future__ import absolute_import
+
+import re
+
+from camel_tools.morphology.utils import PostRegex, required_chars
+
+
+class TestRequiredChars(object):
+    """Test class for testing required_chars.
+    """
+
+    def test_literals(self):
+        """Test that the literals of a pattern are required.
+        """
+
+        assert required_chars(re.compile(u'a(b|bc)d*e+')) == {u'a', u'b',
+                                                               u'e'}
+
+    def test_ignorecase(self):
+        """Test that case-insensitive patterns require no characters.
+        """
+
+        assert required_chars(re.compile(u'(?i)ab')) == frozenset()
+        assert required_chars(re.compile(u'ab', re.IGNORECASE)) == frozenset()
+
+    def test_ignorecase_group(self):
+        """Test that case-insensitive groups require no characters.
+        """
+
+        assert required_chars(re.compile(u'a(?i:b)c')) == {u'a', u'c'}
+
+
+class TestPostRegex(object):
+    """Test class for testing PostRegex.
+    """
+
+    def test_apply(self):
+        """Test that the rewrites are applied in order.
+        """
+
+        postregex = PostRegex([{'match': re.compile(u'ab'), 'replace': u'c'},
+                               {'match': re.compile(u'cd'), 'replace': u'e'}])
+
+        assert postregex.apply(u'abd') == u'e'
+        assert postregex.apply(u'xyz') == u'xyz'
+
+    def test_apply_ignorecase(self):
+        """Test that case-insensitive rewrites are applied to strings in the
+        other case.
+        """
+
+        postregex = PostRegex([{'match': re.compile(u'(?i)ab'),
+                                'replace': u'X'}])
+        assert postregex.apply(u'AB') == u'X'
+
+        postregex = PostRegex([{'match': re.compile(u'ab', re.IGNORECASE),
+                                'replace': u'X'},
+                               {'match': re.compile(u'c'), 'replace': u'Y'}])
+        assert postregex.apply(u'aBc') == u'XY'
@@ -0,0 +1,229 @@
+# MIT License
+#
+# Copyright 2022 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Tests for the build options of camel_morph.db_maker, which should all output
+the same DB as the plain build.
+"""
+
+import json
+import os
+import pickle
+import random
+import shutil
+import subprocess
+import sys
+from itertools import combinations
+
+import pandas as pd
+import pytest
+
+from camel_morph import db_maker_utils
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMEL_TOOLS_DIR = os.path.join(ROOT_DIR, 'official_releases', 'lrec-coling2024_release',
+                               'camel_morph', 'camel_tools')
+CONFIG_NAME = 'msa_example'
+DB_NAME = 'XYZ_msa_pv_v1.0.db'
+
+
+@pytest.fixture(scope='module')
+def build_dir(tmp_path_factory):
+    """Copy of the bundled msa_example sheets and a configuration to build them.
+    `construct_almor_db()` currently only compiles the backoff lexicon, so the lexicon
+    entries are turned into backoff entries. Categories are mapped to IDs such that the
+    DB can be loaded by `MorphologyDB` (-compile_db)."""
+    build_dir = tmp_path_factory.mktemp('db_maker')
+    data_dir = build_dir / 'data'
+    shutil.copytree(os.path.join(ROOT_DIR, 'data', 'camel-morph-msa'),
+                    data_dir / 'camel-morph-msa')
+    lexicon_path = data_dir / 'camel-morph-msa' / CONFIG_NAME / 'MSA-Verb-LEX-PV.csv'
+    lexicon = pd.read_csv(lexicon_path, dtype=object, na_filter=False)
+    lexicon['DEFINE'] = 'BACKOFF'
+    lexicon.to_csv(lexicon_path, index=False)
+
+    with open(os.path.join(ROOT_DIR, 'camel_morph', 'configs', 'config_default.json')) as f:
+        config = json.load(f)
+    config['global'].update(data_dir=str(data_dir), db_dir=str(build_dir / 'databases'),
+                            camel_tools=CAMEL_TOOLS_DIR)
+    config['global']['specs'] = {'about': {'c': 'About'}, 'header': {'c': 'Header-v2'}}
+    config['local'] = {CONFIG_NAME: dict(config['local'][CONFIG_NAME],
+                                         reindex=False, cat2id=True)}
+    with open(build_dir / 'config.json', 'w') as f:
+        json.dump(config, f)
+
+    return build_dir
+
+
+def _build(build_dir, output_name, *options):
+    output_dir = build_dir / output_name
+    # The categories of backoff stems are collected in sets, the order of which depends
+    # on the hash seed
+    env = dict(os.environ, PYTHONHASHSEED='0')
+    subprocess.run([sys.executable, '-m', 'camel_morph.db_maker',
+                    '-config_file', str(build_dir / 'config.json'),
+                    '-config_name', CONFIG_NAME, '-output_dir', str(output_dir), *options],
+                   cwd=ROOT_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    with open(output_dir / DB_NAME) as f:
+        return f.read()
+
+
+@pytest.fixture(scope='module')
+def plain_db(build_dir):
+    return _build(build_dir, 'plain')
+
+
+class TestDBMaker(object):
+    """Test class for testing that the build options of the DB maker do not change
+    the output DB.
+    """
+
+    def test_plain(self, plain_db):
+        """Test that the plain build outputs all the DB sections.
+        """
+
+        for section in ['###STEMBACKOFF###', '###PREFIXES###', '###SUFFIXES###',
+                        '###TABLE AB###', '###TABLE BC###', '###TABLE AC###']:
+            assert section in plain_db
+
+    @pytest.mark.parametrize('options', [['-workers', '2'],
+                                         ['-stream_stems'],
+                                         ['-batched_validation']])
+    def test_options(self, build_dir, plain_db, options):
+        """Test that parallel compilation, streaming of the stems and batched
+        validation output the same DB as the plain build.
+        """
+
+        output_name = ''.join(option.strip('-') for option in options)
+        assert _build(build_dir, output_name, *options) == plain_db
+        # No intermediate files (e.g. the spool file of the stems) are left behind
+        assert os.listdir(build_dir / output_name) == [DB_NAME]
+
+    def test_build_cache(self, build_dir, plain_db):
+        """Test that a build which reuses all the order lines of the build cache
+        outputs the same DB as the plain build.
+        """
+
+        assert _build(build_dir, 'build_cache_1', '-build_cache') == plain_db
+        assert _build(build_dir, 'build_cache_2', '-build_cache',
+                      '-build_report') == plain_db
+
+        with open(build_dir / 'build_cache_2' / f'{DB_NAME}.report.json') as f:
+            report = json.load(f)
+        assert report['totals']['order_lines'] > 0
+        assert report['totals']['cached'] == report['totals']['order_lines']
+
+    def test_build_cache_truncated(self, build_dir, plain_db):
+        """Test that a build cache which can't be read is rebuilt.
+        """
+
+        assert _build(build_dir, 'build_cache_truncated_1', '-build_cache') == plain_db
+        build_cache_path = (build_dir / 'databases' / 'camel-morph-msa' / 'build_cache' /
+                            f'{CONFIG_NAME}.pkl')
+        with open(build_cache_path, 'r+b') as f:
+            f.truncate(os.path.getsize(build_cache_path) // 2)
+
+        assert _build(build_dir, 'build_cache_truncated_2', '-build_cache',
+                      '-build_report') == plain_db
+        with open(build_dir / 'build_cache_truncated_2' / f'{DB_NAME}.report.json') as f:
+            report = json.load(f)
+        assert report['totals']['cached'] == 0
+        assert [path for path in os.listdir(build_cache_path.parent)
+                if path.endswith('.tmp')] == []
+
+    def test_build_report(self, build_dir, plain_db):
+        """Test that the build report is output and does not change the DB.
+        """
+
+        assert _build(build_dir, 'build_report', '-build_report') == plain_db
+
+        report = db_maker_utils.BuildReport.load(
+            str(build_dir / 'build_report' / f'{DB_NAME}.report.json'))
+        assert {'load_sheets', 'validation', 'writing', 'total'} <= set(report['phases'])
+        assert report['totals']['cached'] == 0
+        assert all(order_line['entries'] > 0 for order_line in report['order_lines'])
+
+    def test_compile_db(self, build_dir, plain_db):
+        """Test that compiling the DB does not change it.
+        """
+
+        assert _build(build_dir, 'compile_db', '-compile_db') == plain_db
+        assert os.path.exists(build_dir / 'compile_db' / f'{DB_NAME}.bin')
+
+
+def _compat_table(cats_x, cats_y, patterns):
+    # Categories of type X share a few compatibility sets, such that many of them are
+    # equivalent, and each category of type Y is compatible with some category of type X
+    compat = {cat_x: set(random.choice(patterns)) for cat_x in cats_x}
+    for cat_y in cats_y:
+        if not any(cat_y in cats for cats in compat.values()):
+            compat[random.choice(cats_x)].add(cat_y)
+    return compat
+
+
+def _pairwise_equivalences(X_Y_compat, X_Z_compat, equivalences):
+    for cat_1, cat_2 in combinations(X_Y_compat, 2):
+        if X_Y_compat[cat_1] == X_Y_compat[cat_2]:
+            if X_Z_compat[cat_1] == X_Z_compat[cat_2]:
+                equivalences.setdefault(cat_1, set()).add(cat_2)
+
+
+class TestFactorizeCategories(object):
+    """Test class for testing factorize_categories.
+    """
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_pairwise(self, tmp_path, seed):
+        """Test that categories grouped by compatibility signature are mapped as
+        with the pairwise comparison of all categories.
+        """
+
+        random.seed(seed)
+        prefix_cats = [f'P{i}' for i in range(40)]
+        stem_cats = [f'X{i}' for i in range(60)]
+        suffix_cats = [f'S{i}' for i in range(40)]
+        stem_patterns = [random.sample(stem_cats, 5) for _ in range(3)]
+        suffix_patterns = [random.sample(suffix_cats, 5) for _ in range(3)]
+        prefix_stem_compat = _compat_table(prefix_cats, stem_cats, stem_patterns)
+        stem_suffix_compat = _compat_table(stem_cats, suffix_cats, suffix_patterns)
+        prefix_suffix_compat = _compat_table(prefix_cats, suffix_cats, suffix_patterns)
+
+        equivalences = {}
+        stem_prefix_compat = db_maker_utils._reverse_compat_table(prefix_stem_compat)
+        suffix_stem_compat = db_maker_utils._reverse_compat_table(stem_suffix_compat)
+        suffix_prefix_compat = db_maker_utils._reverse_compat_table(prefix_suffix_compat)
+        _pairwise_equivalences(prefix_stem_compat, prefix_suffix_compat, equivalences)
+        _pairwise_equivalences(stem_suffix_compat, stem_prefix_compat, equivalences)
+        _pairwise_equivalences(suffix_stem_compat, suffix_prefix_compat, equivalences)
+        assert equivalences
+        # The test path of factorize_categories() closes pairwise equivalences
+        with open(tmp_path / 'equivalences.pkl', 'wb') as f:
+            pickle.dump(equivalences, f)
+
+        expected = db_maker_utils.factorize_categories(
+            prefix_stem_compat, stem_suffix_compat, prefix_suffix_compat,
+            test=str(tmp_path / 'equivalences.pkl'))
+        actual = db_maker_utils.factorize_categories(
+            prefix_stem_compat, stem_suffix_compat, prefix_suffix_compat)
+        assert list(actual.items()) == list(expected.items())
@@ -0,0 +1,285 @@
+# MIT License
+#
+# Copyright 2022 New York University Abu Dhabi
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Tests for the sheet normalization of camel_morph.db_maker_utils.read_morph_specs,
+which should output the same sheets as the row-wise normalization it replaced.
+"""
+
+import json
+import os
+import re
+import shutil
+from itertools import product
+
+import pandas as pd
+import pytest
+
+from camel_morph import db_maker_utils
+from camel_morph.utils.utils import Config
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMEL_TOOLS_DIR = os.path.join(ROOT_DIR, 'official_releases', 'lrec-coling2024_release',
+                               'camel_morph', 'camel_tools')
+CONFIG_NAME = 'default_config'
+LEXICON_SHEETS = ['MSA-Verb-LEX-PV', 'MSA-Verb-LEX-IV', 'MSA-Verb-LEX-CV']
+
+
+def _add_class_label(classes, label):
+    return classes.apply(lambda cls: re.sub(r'\]', f'-{label}]', cls))
+
+
+def _normalize_morph_sheet(MORPH):
+    MORPH = MORPH.astype(str)
+    MORPH = MORPH.apply(lambda x: x.str.strip()
+                        if x.dtype == 'object' and x.dtype not in [float, int] else x)
+    MORPH = MORPH.replace(r'\s+', ' ', regex=True)
+
+    MORPH['COND-S'] = MORPH['COND-S'].replace(r'[\[\]]', '', regex=True)
+    MORPH.loc[MORPH['COND-S'] == '', 'COND-S'] = '_'
+    MORPH.loc[MORPH['COND-T'] == '', 'COND-T'] = '_'
+    MORPH['BW'] = MORPH['BW'].replace(r'\s+', '#', regex=True)
+    MORPH.loc[MORPH['BW'] == '', 'BW'] = '_'
+    MORPH.loc[MORPH['FORM'] == '', 'FORM'] = '_'
+    MORPH['GLOSS'] = MORPH['GLOSS'].replace(r'\s+', '#', regex=True)
+    return MORPH
+
+
+def _normalize_lexicon_sheet(LEXICON, lexicon_cond_f):
+    LEXICON = LEXICON.replace(r'\s+', ' ', regex=True)
+    LEXICON['GLOSS'] = LEXICON['GLOSS'].replace(r'\s+', '#', regex=True)
+    if lexicon_cond_f and any('!' in cond_t for cond_t in LEXICON['COND-T'].values.tolist()):
+        for i, row in LEXICON.iterrows():
+            cond_t_, cond_f_ = [], []
+            for ct in row['COND-T'].split():
+                if ct.startswith('!'):
+                    cond_f_.append(ct[1:])
+                else:
+                    cond_t_.append(ct)
+            LEXICON.at[i, 'COND-T'] = ' '.join(cond_t_)
+            LEXICON.at[i, 'COND-F'] = ' '.join(cond_f_)
+    return LEXICON
+
+
+def _split_or_sheet(LEXICON):
+    LEXICON_ = []
+    for _, row in LEXICON.iterrows():
+        terms = {'disj': [], 'other': []}
+        for term in row['COND-T'].split():
+            terms['disj' if '||' in term else 'other'].append(term)
+
+        if terms['disj']:
+            terms_other = ' '.join(terms['other'])
+            for disj_terms in product(*[t.split('||') for t in terms['disj']]):
+                row_ = row.to_dict()
+                row_['COND-T'] = f"{' '.join(disj_terms)} {terms_other}".strip()
+                LEXICON_.append(row_)
+        else:
+            LEXICON_.append(row.to_dict())
+    return pd.DataFrame(LEXICON_)
+
+
+def _delete_conditions(conditions, conditions_unused):
+    conditions_unused = '^(' + conditions_unused + ')$'
+    return conditions.apply(lambda ct: ' '.join(re.sub(conditions_unused, '', cond)
+                                                for cond in ct.split()))
+
+
+ROW_WISE = dict(_add_class_label=_add_class_label,
+                _normalize_morph_sheet=_normalize_morph_sheet,
+                _normalize_lexicon_sheet=_normalize_lexicon_sheet,
+                _split_or_sheet=_split_or_sheet,
+                _delete_conditions=_delete_conditions)
+
+
+@pytest.fixture
+def camel_tools_path(monkeypatch):
+    # read_morph_specs() imports the camel_tools fork, like db_maker does
+    monkeypatch.syspath_prepend(CAMEL_TOOLS_DIR)
+
+
+def _config(tmp_path, label='', data_dir=os.path.join(ROOT_DIR, 'data'), **options):
+    """Configuration reading the bundled default_config sheets, with all three
+    lexicon sheets."""
+    with open(os.path.join(ROOT_DIR, 'camel_morph', 'configs', 'config_default.json')) as f:
+        config = json.load(f)
+    config['global'].update(data_dir=str(data_dir),
+                            db_dir=str(tmp_path / 'databases'), camel_tools=CAMEL_TOOLS_DIR)
+    config['global']['specs'] = {'about': {'c': 'About'}, 'header': {'c': 'Header-v2'}}
+    config_local = dict(config['local'][CONFIG_NAME], **options)
+    specs = config_local['specs'] = dict(config_local['specs'])
+    if label:
+        specs['order'] = {'c': {'MSA-Verb-ORDER': label}}
+        specs['morph'] = {'c': {'MSA-Verb-MORPH': label}}
+        specs['lexicon'] = {'c': {sheet: label for sheet in LEXICON_SHEETS}}
+    else:
+        specs['lexicon'] = {'c': LEXICON_SHEETS}
+    config['local'] = {CONFIG_NAME: config_local}
+    with open(tmp_path / 'config.json', 'w') as f:
+        json.dump(config, f)
+    return Config(str(tmp_path / 'config.json'), CONFIG_NAME)
+
+
+def _assert_sheets_equal(sheets, expected_sheets):
+    assert sheets.keys() == expected_sheets.keys()
+    for name, sheet in sheets.items():
+        if sheet is None:
+            assert expected_sheets[name] is None
+        else:
+            pd.testing.assert_frame_equal(sheet, expected_sheets[name])
+
+
+class TestReadMorphSpecs(object):
+    """Test class for testing that read_morph_specs outputs the same sheets as with
+    the row-wise normalization.
+    """
+
+    @pytest.mark.parametrize('label, options', [
+        ('', {}),
+        ('', {'split_or': True}),
+        ('V', {'clean_conditions': True}),
+    ])
+    @pytest.mark.parametrize('lexicon_cond_f', [True, False])
+    def test_row_wise(self, tmp_path, monkeypatch, camel_tools_path, label, options,
+                      lexicon_cond_f):
+        """Test that the sheets and condition classes are the same as with the row-wise
+        normalization.
+        """
+
+        config = _config(tmp_path, label, **options)
+        sheets, cond2class = db_maker_utils.read_morph_specs(
+            config, lexicon_cond_f=lexicon_cond_f, use_cache=False)
+        for name, function in ROW_WISE.items():
+            monkeypatch.setattr(db_maker_utils, name, function)
+        expected_sheets, expected_cond2class = db_maker_utils.read_morph_specs(
+            config, lexicon_cond_f=lexicon_cond_f, use_cache=False)
+
+        assert sheets['lexicon'] is not None and sheets['morph'] is not None
+        _assert_sheets_equal(sheets, expected_sheets)
+        assert cond2class == expected_cond2class
+
+    def test_split_or(self, tmp_path, camel_tools_path):
+        """Test that lexicon rows with disjunctive COND-T terms are split as with
+        the row-wise expansion. The bundled lexicon sheets have no such terms, so
+        the COND-T expressions of the MORPH sheet are used instead.
+        """
+
+        sheets, _ = db_maker_utils.read_morph_specs(_config(tmp_path), use_cache=False)
+        lexicon = sheets['lexicon'].iloc[:len(sheets['morph'].index)].copy()
+        lexicon['COND-T'] = sheets['morph']['COND-T'].values[:len(lexicon.index)]
+        assert lexicon['COND-T'].str.contains('||', regex=False).any()
+
+        pd.testing.assert_frame_equal(db_maker_utils._split_or_sheet(lexicon),
+                                      _split_or_sheet(lexicon))
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Copy of the bundled default_config sheets, which can be edited."""
+    data_dir = tmp_path / 'data'
+    shutil.copytree(os.path.join(ROOT_DIR, 'data', 'camel-morph-msa', CONFIG_NAME),
+                    data_dir / 'camel-morph-msa' / CONFIG_NAME)
+    return data_dir
+
+
+@pytest.fixture
+def read_count(monkeypatch):
+    """Number of times the sheets were read (and not loaded from the cache)."""
+    read_count = []
+    _read_morph_specs = db_maker_utils._read_morph_specs
+
+    def _read_morph_specs_counted(*args):
+        read_count.append(1)
+        return _read_morph_specs(*args)
+
+    monkeypatch.setattr(db_maker_utils, '_read_morph_specs', _read_morph_specs_counted)
+    return read_count
+
+
+class TestSpecsCache(object):
+    """Test class for testing the cache of the sheets processed by read_morph_specs.
+    """
+
+    def test_cached(self, tmp_path, camel_tools_path, data_dir, read_count):
+        """Test that the cached sheets and condition classes are the same as the
+        processed ones.
+        """
+
+        config = _config(tmp_path, data_dir=data_dir)
+        sheets, cond2class = db_maker_utils.read_morph_specs(config)
+        cached_sheets, cached_cond2class = db_maker_utils.read_morph_specs(config)
+
+        assert len(read_count) == 1
+        _assert_sheets_equal(cached_sheets, sheets)
+        assert cached_cond2class == cond2class
+
+    def test_invalidated(self, tmp_path, camel_tools_path, data_dir, read_count):
+        """Test that editing a sheet or changing an option invalidates the cache.
+        """
+
+        db_maker_utils.read_morph_specs(_config(tmp_path, data_dir=data_dir))
+        lexicon_path = data_dir / 'camel-morph-msa' / CONFIG_NAME / 'MSA-Verb-LEX-PV.csv'
+        lexicon = pd.read_csv(lexicon_path, dtype=object, na_filter=False)
+        lexicon.drop(index=0).to_csv(lexicon_path, index=False)
+        sheets, _ = db_maker_utils.read_morph_specs(_config(tmp_path, data_dir=data_dir))
+        assert len(read_count) == 2
+
+        db_maker_utils.read_morph_specs(
+            _config(tmp_path, data_dir=data_dir, split_or=True))
+        assert len(read_count) == 3
+        expected_sheets, _ = db_maker_utils.read_morph_specs(
+            _config(tmp_path, data_dir=data_dir), use_cache=False)
+        _assert_sheets_equal(sheets, expected_sheets)
+
+    def test_truncated(self, tmp_path, camel_tools_path, data_dir, read_count):
+        """Test that a cache which can't be read is rebuilt.
+        """
+
+        config = _config(tmp_path, data_dir=data_dir)
+        sheets, cond2class = db_maker_utils.read_morph_specs(config)
+        specs_cache_path = config.get_specs_cache_path('_11')
+        with open(specs_cache_path, 'r+b') as f:
+            f.truncate(os.path.getsize(specs_cache_path) // 2)
+
+        rebuilt_sheets, rebuilt_cond2class = db_maker_utils.read_morph_specs(config)
+        assert len(read_count) == 2
+        _assert_sheets_equal(rebuilt_sheets, sheets)
+        assert rebuilt_cond2class == cond2class
+        assert db_maker_utils.read_morph_specs(config)
+        assert len(read_count) == 2
+        assert [path for path in os.listdir(os.path.dirname(specs_cache_path))
+                if path.endswith('.tmp')] == []
+
+    def test_not_writable(self, tmp_path, camel_tools_path, data_dir, read_count):
+        """Test that the sheets are still returned if the cache can't be written.
+        """
+
+        config = _config(tmp_path, data_dir=data_dir)
+        # The DB directory is a file, so the cache directory can't be created
+        config.db_dir = str(tmp_path / 'config.json')
+        sheets, _ = db_maker_utils.read_morph_specs(config)
+
+        expected_sheets, _ = db_maker_utils.read_morph_specs(config, use_cache=False)
+        _assert_sheets_equal(sheets, expected_sheets)
+        assert sorted(os.listdir(tmp_path)) == ['config.json', 'data']